@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+""" Large area rendering benchmark
+
+Builds a synthetic large-area map (default 2000 x 2000 with 5,000 fields and 100,000 finds)
+and times the svg map rendering path. No database is needed.
+
+Usage:
+	python benchmarks/benchLargeArea.py [maxXY] [numFields] [numFinds]
+"""
+
+import sys
+import time
+
+from syntheticData import buildMapArea
+
+
+def main():
+	"""Run the benchmark and print timings"""
+
+	maxXY = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+	numFields = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+	numFinds = int(sys.argv[3]) if len(sys.argv) > 3 else 100000
+
+	start = time.perf_counter()
+	area = buildMapArea(maxXY,numFields,numFinds)
+	buildTime = time.perf_counter() - start
+
+	start = time.perf_counter()
+	svgMap = area.renderMap('100%','100%')
+	renderTime = time.perf_counter() - start
+
+	print('Area %d x %d, %d fields, %d finds' % (maxXY,maxXY,numFields,numFinds))
+	print('Build objects: %.3fs' % buildTime)
+	print('renderMap:     %.3fs (%d bytes, %.1f bytes/object)' % (renderTime,len(svgMap),len(svgMap)/float(numFields+numFinds)))
+
+if __name__ == '__main__':
+	main()
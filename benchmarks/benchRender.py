@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+""" Rendering and data access microbenchmarks
+
+Times the data access, svg rendering, html helper and full page paths against the SQLite
+stand-in loaded with a synthetic area of N fields and M finds. Each timing is the best of
+several repeats. Output bytes and peak traced memory are recorded for each case and the
+results are saved as json so runs can be compared.
+
+Usage:
+	python benchmarks/benchRender.py [--sizes small,medium,large] [--repeat 3]
+									[--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+
+from syntheticData import loadArea
+import fieldsFindsLibrary as ffLib
+
+#Synthetic area cases: name -> (side size, fields, finds)
+SIZES = {
+		'small':(50,50,200),
+		'medium':(200,500,2000),
+		'large':(1000,2000,20000)
+		}
+
+#Calls per helper microbenchmark
+HELPER_CALLS = 10000
+
+
+def measure(func,repeat):
+	"""Return best time, output bytes and peak traced memory of func
+
+	Output bytes are None when func returns None.
+
+	Keyword arguments:
+	func -- function returning a string, list or None when there is no output to size
+	repeat -- number of timed runs
+	"""
+
+	best = None
+	for i in range(repeat):
+		start = time.perf_counter()
+		result = func()
+		elapsed = time.perf_counter() - start
+		best = elapsed if best == None else min(best,elapsed)
+
+	#Memory is traced in a separate run as tracing slows the code down
+	tracemalloc.start()
+	func()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	if result == None:
+		size = None
+	elif isinstance(result,str):
+		size = len(result)
+	else:
+		size = sum([len(str(r)) for r in result])
+	return {'seconds':best,'bytes':size,'peakBytes':peak}
+
+def runCase(name,maxXY,numFields,numFinds,repeat):
+	"""Run all benchmarks for one synthetic area size and return results by benchmark name"""
+
+	areaName = 'Bench ' + name
+	db = ffLib.DbFieldsFindsSqlite()
+	db.openConnection()
+	loadArea(db,10,areaName,maxXY,numFields,numFinds)
+	area = db.getMapArea(areaName)
+
+	results = {}
+	results['getFields'] = measure(lambda: db.getFields(area.areaId),repeat)
+	results['getFinds'] = measure(lambda: db.getFinds(area.areaId),repeat)
+
+	area.addFields(db.getFields(area.areaId),'field')
+	area.addFinds(db.getFinds(area.areaId),'find')
+	results['renderMap'] = measure(lambda: area.renderMap('100%','100%'),repeat)
+	results['renderInfo'] = measure(lambda: area.renderInfo(300,500),repeat)
+
+	#The website opens and closes the connection itself
+	db.closeConnection()
+	def runPage():
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=' + areaName),db)
+		website.run()
+		return website
+	def timePage():
+		#Running the page has no output of its own, its size is that of websiteStr
+		runPage()
+	website = runPage()
+	results['websiteRun'] = measure(timePage,repeat)
+	results['websiteStr'] = measure(lambda: str(website),repeat)
+	return results
+
+def runHelpers(repeat):
+	"""Run the html helper microbenchmarks"""
+
+	names = ['class','id','cx','cy','r','fill','stroke','stroke-width']
+	values = ['find','Find1',10,20,0.25,'red','black','0.02']
+	headers = ['X Coordinate','Y Coordinate','Depth','Type','Period','Use']
+	cells = [10,20,1.5,'Coin','Roman','Currency']
+	return {
+			'genHTMLElement':measure(lambda: [ffLib.genHTMLElement('circle',names,values,'<title>Find 1</title>') for i in range(HELPER_CALLS)],repeat),
+			'genTableElements':measure(lambda: [ffLib.genTableElements(headers,cells,5,100,55,25,'#428bca','grey') for i in range(HELPER_CALLS)],repeat)
+			}
+
+def compare(results,previous):
+	"""Print time and size changes against a previous results file"""
+
+	print('')
+	print('%-28s %10s %10s %8s %12s' % ('Benchmark','Previous','Current','Ratio','Bytes ratio'))
+	for key in sorted(results):
+		if key not in previous:
+			continue
+		old = previous[key]
+		new = results[key]
+		ratio = new['seconds'] / old['seconds'] if old['seconds'] > 0 else float('nan')
+		sizeRatio = float(new['bytes']) / old['bytes'] if new['bytes'] != None and old['bytes'] else float('nan')
+		print('%-28s %9.4fs %9.4fs %7.2fx %11.2fx' % (key,old['seconds'],new['seconds'],ratio,sizeRatio))
+
+def main():
+	"""Run the benchmarks, print and save the results"""
+
+	parser = argparse.ArgumentParser(description='Rendering and data access benchmarks')
+	parser.add_argument('--sizes',default='small,medium,large',help='comma separated cases from ' + ','.join(sorted(SIZES)))
+	parser.add_argument('--repeat',type=int,default=3,help='timed runs per benchmark, best is kept')
+	parser.add_argument('--output',default='bench_results.json',help='json file to save results to')
+	parser.add_argument('--compare',default=None,help='previous results json to compare against')
+	args = parser.parse_args()
+
+	results = {}
+	for key,value in runHelpers(args.repeat).items():
+		results['helpers.' + key] = value
+	for name in args.sizes.split(','):
+		maxXY,numFields,numFinds = SIZES[name]
+		for key,value in runCase(name,maxXY,numFields,numFinds,args.repeat).items():
+			results[name + '.' + key] = value
+
+	print('%-28s %10s %12s %12s' % ('Benchmark','Seconds','Bytes','Peak bytes'))
+	for key in sorted(results):
+		size = results[key]['bytes']
+		print('%-28s %10.4f %12s %12d' % (key,results[key]['seconds'],'-' if size == None else str(size),results[key]['peakBytes']))
+
+	output = {
+			'timestamp':datetime.now().isoformat(),
+			'python':platform.python_version(),
+			'platform':platform.platform(),
+			'repeat':args.repeat,
+			'sizes':dict([(name,SIZES[name]) for name in args.sizes.split(',')]),
+			'results':results
+			}
+	with open(args.output,'w') as outFile:
+		json.dump(output,outFile,indent=1,sort_keys=True)
+	print('Results saved to ' + args.output)
+
+	if args.compare != None:
+		with open(args.compare,'r') as prevFile:
+			compare(results,json.load(prevFile)['results'])
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+
+""" Load test replaying a mix of website requests with concurrent clients
+
+Each client repeatedly picks a query string from a weighted mix of area views, filtered views
+and the AddFind, AddField, DelFind and DelField actions as the template's JS functions send
+them, and runs it against a local SQLite stand-in database, either in-process or through the
+main.py CGI script in a new process per request. Throughput and p50/p95/p99 latency are
+reported overall and per request kind.
+
+Action errors the site reports for bad input, e.g. overlapping fields, are counted as
+rejected. Errors that only concurrent requests cause are flagged as races: locked database
+and constraint errors, requests that crash, and overlapping fields, duplicate find
+coordinates or denormalized table differences that were not there before the run.
+
+Usage:
+	python benchmarks/loadTest.py [--clients 8] [--requests 50] [--mode inprocess|cgi]
+								[--database load.db] [--area name] [--synthetic fields,finds]
+								[--mix mix.json] [--seed 1] [--output results.json]
+
+A mix file is a json object of name to [weight, query], queries may use {area}, {x}, {y},
+{lowX}, {hiX}, {lowY}, {hiY}, {depth}, {findClass}, {crop}, {owner}, {fieldId} and {findId}.
+Ids are those of fields and finds added by the load test.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from syntheticData import loadArea
+import fieldsFindsLibrary as ffLib
+
+#Default request mix: name -> (weight, query string)
+MIX = {
+		'view':(35,'MapArea={area}'),
+		'filter':(20,'MapArea={area}&FilterClass={findClass}&Format=fragment'),
+		'addFind':(18,'Action=AddFind&MapArea={area}&X={x}&Y={y}&Type={findClass}&Depth={depth}&Notes=load+test&ImgPath=&Format=fragment'),
+		'addField':(12,'Action=AddField&MapArea={area}&LowX={lowX}&HiX={hiX}&LowY={lowY}&HiY={hiY}&Owner={owner}&Crop={crop}&Format=fragment'),
+		'delFind':(9,'Action=DelFind&MapArea={area}&Id={findId}&Format=fragment'),
+		'delField':(6,'Action=DelField&MapArea={area}&Id={fieldId}&Format=fragment')
+		}
+
+#Area id of a --synthetic area
+SYNTHETIC_AREA_ID = 50
+
+#Error messages only concurrent requests should cause
+RACE_ERRORS = ['database is locked','database table is locked','constraint failed','ORA-00001','ORA-00060','ORA-08177']
+
+_mainScript = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'main.py')
+_statusPattern = re.compile(r'<strong>([^<]*)</strong> (.*?)(<br>|</div>)',re.S)
+_crashPattern = re.compile(r'<font color="red">\s*(.*?)\s*</font>',re.S)
+
+
+class LoadState(object):
+	"""Values shared by the clients: area, dropdown names and the ids added by the test"""
+
+	def __init__(self,mapArea,classes,crops,owners):
+		self.mapArea = mapArea
+		self.classes = classes
+		self.crops = crops
+		self.owners = owners
+		self._ids = {'fieldId':[],'findId':[]}
+		self._lock = threading.Lock()
+
+	def add(self,kind,ids):
+		with self._lock:
+			self._ids[kind].extend(ids)
+
+	def take(self,kind,rng):
+		"""Remove and return a random added id, None if there are none"""
+
+		with self._lock:
+			ids = self._ids[kind]
+			if len(ids) == 0:
+				return None
+			return ids.pop(rng.randrange(len(ids)))
+
+
+def fillQuery(query,state,rng):
+	"""Return the query with its placeholders replaced, None if an id it needs is not available
+
+	Keyword arguments:
+	query -- query string template
+	state -- LoadState
+	rng -- random.Random of the client
+	"""
+
+	maxX = state.mapArea.maxX
+	maxY = state.mapArea.maxY
+	lowX = rng.randrange(max(maxX - 2,1))
+	lowY = rng.randrange(max(maxY - 2,1))
+	values = {
+			'area':state.mapArea.areaName,
+			'x':rng.randint(0,maxX),
+			'y':rng.randint(0,maxY),
+			'lowX':lowX,
+			'hiX':min(lowX + rng.randint(1,3),maxX),
+			'lowY':lowY,
+			'hiY':min(lowY + rng.randint(1,3),maxY),
+			'depth':round(rng.uniform(0.1,3),1),
+			'findClass':rng.choice(state.classes),
+			'crop':rng.choice(state.crops),
+			'owner':rng.choice(state.owners)
+			}
+	for kind in ['fieldId','findId']:
+		if '{' + kind + '}' in query:
+			values[kind] = state.take(kind,rng)
+			if values[kind] == None:
+				return None
+	return query.format(**dict([(key,quote(str(value))) for key,value in values.items()]))
+
+def runInProcess(query,database):
+	"""Run one request in this process and return the response body"""
+
+	db = ffLib.DbFieldsFindsSqlite(database)
+	website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery(query),db)
+	website.run()
+	if website.binary:
+		return ''
+	return str(website).split('\n\n',1)[-1]
+
+def runCgi(query,database):
+	"""Run one request through main.py in a new process and return the response body"""
+
+	env = dict(os.environ)
+	env.update({'QUERY_STRING':query,'REQUEST_METHOD':'GET','FF_SQLITE':database})
+	env.pop('FF_SNAPSHOT_DIR',None)
+	result = subprocess.run([sys.executable,_mainScript],env=env,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+	if result.returncode != 0:
+		raise Exception('main.py exited with ' + str(result.returncode) + ': ' + result.stderr.decode('utf-8','replace').strip()[-300:])
+	return result.stdout.decode('utf-8','replace').split('\n\n',1)[-1]
+
+def classify(body):
+	"""Return (outcome, message, response json or None) for a response body
+
+	Outcome is ok, rejected for an action error the site reports, race for an error only
+	concurrent requests cause or error when the site crashed.
+	"""
+
+	data = None
+	html = body
+	if body.lstrip().startswith('{'):
+		data = json.loads(body)
+		html = data.get('status','')
+	elif '<div id="status">' in body:
+		#The template scripts hold error messages of their own before the status
+		html = body.split('<div id="status">',1)[1]
+	crash = _crashPattern.search(body)
+	if crash and 'Something went wrong' in body:
+		return _outcome('error',crash.group(1)),crash.group(1),data
+	match = _statusPattern.search(html)
+	if match == None or match.group(1) != 'Error':
+		return 'ok','',data
+	message = match.group(2).strip()
+	return _outcome('rejected',message),message,data
+
+def _outcome(outcome,message):
+	"""Private function returning race for messages of RACE_ERRORS, otherwise outcome"""
+
+	for raceError in RACE_ERRORS:
+		if raceError in message:
+			return 'race'
+	return outcome
+
+def client(index,state,mix,requests,database,runRequest,seed,results):
+	"""Run one client's requests, appending (name, seconds, outcome, message) to results"""
+
+	rng = random.Random(seed * 1000 + index)
+	names = sorted(mix)
+	for i in range(requests):
+		query = None
+		while query == None:
+			name = rng.choices(names,[mix[key][0] for key in names])[0]
+			query = fillQuery(mix[name][1],state,rng)
+		start = time.perf_counter()
+		try:
+			outcome,message,data = classify(runRequest(query,database))
+		except Exception as e:
+			outcome,message,data = _outcome('error',str(e)),str(e),None
+		elapsed = time.perf_counter() - start
+		if outcome == 'ok' and data != None:
+			state.add('fieldId',data.get('fieldIds',[]))
+			state.add('findId',data.get('findIds',[]))
+		results.append((name,elapsed,outcome,message))
+
+def integrity(database,areaName):
+	"""Return the integrity report of the area and the denormalized table differences"""
+
+	db = ffLib.DbFieldsFindsSqlite(database)
+	db.openConnection()
+	try:
+		report = ffLib.scanDatabase(db,[areaName])['areas'][0]
+		materialized = db.checkMaterialized()
+	finally:
+		db.closeConnection()
+	return {
+			'overlappingFields':len(report['overlappingFields']),
+			'duplicateFinds':len(report['duplicateFinds']),
+			'materializedDifferences':sum([len(ids) for problems in materialized.values() for ids in problems.values()])
+			}
+
+def latency(seconds):
+	"""Return count and p50, p95, p99 and max latency in milliseconds"""
+
+	if len(seconds) == 0:
+		return {'count':0}
+	ms = np.array(seconds) * 1000
+	return {
+			'count':len(ms),
+			'p50':round(float(np.percentile(ms,50)),2),
+			'p95':round(float(np.percentile(ms,95)),2),
+			'p99':round(float(np.percentile(ms,99)),2),
+			'max':round(float(ms.max()),2)
+			}
+
+def prepare(database,areaName,synthetic,seed):
+	"""Create or migrate the stand-in before the clients start and return the LoadState"""
+
+	db = ffLib.DbFieldsFindsSqlite(database)
+	db.openConnection()
+	if synthetic != None and areaName not in db.getMapAreaList():
+		numFields,numFinds = [int(value) for value in synthetic.split(',')]
+		maxXY = max(50,int((numFields * 100) ** 0.5))
+		loadArea(db,SYNTHETIC_AREA_ID,areaName,maxXY,numFields,numFinds,seed)
+	state = LoadState(db.getMapArea(areaName),db.getClassList(),db.getCropList(),db.getOwnerList())
+	db.closeConnection()
+	return state
+
+def main():
+	"""Run the load test, print and save the results"""
+
+	parser = argparse.ArgumentParser(description='Replay a request mix against the site with concurrent clients')
+	parser.add_argument('--clients',type=int,default=8,help='concurrent clients')
+	parser.add_argument('--requests',type=int,default=50,help='requests per client')
+	parser.add_argument('--mode',default='inprocess',choices=['inprocess','cgi'],help='run requests in threads of this process or through main.py')
+	parser.add_argument('--database',default=None,help='SQLite stand-in file, a new demo database in a temporary folder if not given')
+	parser.add_argument('--area',default='Demo Large',help='area the requests view and change')
+	parser.add_argument('--synthetic',default=None,help='fields,finds of a synthetic area added as --area first')
+	parser.add_argument('--mix',default=None,help='json file of name to [weight, query] replacing the default mix')
+	parser.add_argument('--seed',type=int,default=1,help='random seed of the clients')
+	parser.add_argument('--output',default=None,help='json file to save results to')
+	args = parser.parse_args()
+
+	mix = MIX
+	if args.mix != None:
+		with open(args.mix,'r') as mixFile:
+			mix = dict([(name,tuple(value)) for name,value in json.load(mixFile).items()])
+	tempDir = None
+	database = args.database
+	if database == None:
+		tempDir = tempfile.mkdtemp(prefix='ffload_')
+		database = os.path.join(tempDir,'load.db')
+
+	state = prepare(database,args.area,args.synthetic,args.seed)
+	before = integrity(database,args.area)
+	runRequest = runInProcess if args.mode == 'inprocess' else runCgi
+	results = []
+	threads = [threading.Thread(target=client,args=(i,state,mix,args.requests,database,runRequest,args.seed,results)) for i in range(args.clients)]
+	start = time.perf_counter()
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	elapsed = time.perf_counter() - start
+	after = integrity(database,args.area)
+
+	outcomes = {}
+	for name,seconds,outcome,message in results:
+		outcomes[outcome] = outcomes.get(outcome,0) + 1
+	races = [{'request':name,'outcome':outcome,'message':message} for name,seconds,outcome,message in results if outcome in ['race','error']]
+	for key in sorted(after):
+		if after[key] > before[key]:
+			races.append({'request':'integrity','outcome':'race','message':'%d new %s after the run' % (after[key] - before[key],key)})
+
+	output = {
+			'mode':args.mode,
+			'clients':args.clients,
+			'area':args.area,
+			'seconds':round(elapsed,3),
+			'throughput':round(len(results) / elapsed,2),
+			'latency':latency([seconds for name,seconds,outcome,message in results]),
+			'requests':dict([(name,latency([s for n,s,o,m in results if n == name])) for name in sorted(mix)]),
+			'outcomes':outcomes,
+			'integrityBefore':before,
+			'integrityAfter':after,
+			'races':races
+			}
+
+	print('%d clients, %d requests in %.2fs (%s): %.1f requests/s' % (args.clients,len(results),elapsed,args.mode,output['throughput']))
+	print('%-10s %7s %9s %9s %9s %9s' % ('Request','Count','p50 ms','p95 ms','p99 ms','Max ms'))
+	for name,stats in sorted(output['requests'].items()) + [('all',output['latency'])]:
+		if stats['count'] > 0:
+			print('%-10s %7d %9.2f %9.2f %9.2f %9.2f' % (name,stats['count'],stats['p50'],stats['p95'],stats['p99'],stats['max']))
+	print('Outcomes: ' + ', '.join(['%s %d' % (key,outcomes[key]) for key in sorted(outcomes)]))
+	for race in races[:20]:
+		print('RACE %s (%s): %s' % (race['request'],race['outcome'],race['message']))
+	if len(races) > 20:
+		print('... %d more' % (len(races) - 20))
+
+	if args.output != None:
+		with open(args.output,'w') as outFile:
+			json.dump(output,outFile,indent=1)
+	sys.exit(1 if len(races) > 0 else 0)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+""" Before and after report for the schema migrations
+
+Builds two SQLite stand-in databases with the same synthetic areas, one with only the base
+schema reading the combined views and one with the sql/migrations/sqlite migrations applied
+reading the denormalized tables, then records the query plan and best time of each hot query
+the website runs. Writes a markdown report.
+
+Usage:
+	python benchmarks/migrationReport.py [--areas 8] [--fields 2000] [--finds 25000]
+										[--repeat 5] [--output report.md]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from syntheticData import loadArea
+import fieldsFindsLibrary as ffLib
+
+
+class _RecordingConnection(object):
+	"""Connection wrapper keeping the last statement and binds run so its plan can be explained"""
+
+	def __init__(self,conn):
+		self._conn = conn
+		self.last = None
+
+	def cursor(self):
+		return _RecordingCursor(self._conn.cursor(),self)
+
+	def commit(self):
+		self._conn.commit()
+
+	def rollback(self):
+		self._conn.rollback()
+
+	def close(self):
+		self._conn.close()
+
+
+class _RecordingCursor(object):
+	"""Cursor wrapper for _RecordingConnection"""
+
+	def __init__(self,cursor,recorder):
+		self._cursor = cursor
+		self._recorder = recorder
+
+	def execute(self,sql,**binds):
+		self._recorder.last = (sql,binds)
+		self._cursor.execute(sql,**binds)
+
+	def fetchone(self):
+		return self._cursor.fetchone()
+
+	def fetchall(self):
+		return self._cursor.fetchall()
+
+	def __iter__(self):
+		return iter(self._cursor)
+
+	@property
+	def rowcount(self):
+		return self._cursor.rowcount
+
+	@property
+	def description(self):
+		return self._cursor.description
+
+
+def hotQueries(areaId,areaName):
+	"""Return list of (label, function of db) for the queries run by a page view and the add checks
+
+	Keyword arguments:
+	areaId -- id of a synthetic area
+	areaName -- name of the same area
+	"""
+
+	coin = ffLib.FindFilter(classes=['COIN'])
+	box = ffLib.FindFilter(bbox=(100,100,300,300))
+	return [
+			('getMapArea',lambda db: db.getMapArea(areaName)),
+			('getFields',lambda db: db.getFields(areaId)),
+			('getFinds',lambda db: db.getFinds(areaId)),
+			('getFinds class filter',lambda db: db.getFinds(areaId,None,coin)),
+			('getFinds box filter',lambda db: db.getFinds(areaId,None,box)),
+			('getFieldIdList',lambda db: db.getFieldIdList(areaId)),
+			('getFindIdList',lambda db: db.getFindIdList(areaId)),
+			('find coordinate check',lambda db: _runCheck(db._checkFindCoord,areaId,10,10)),
+			('field intersect check',lambda db: _runCheck(db._checkIntersect,areaId,10,10,20,20)),
+			]
+
+def _runCheck(check,*args):
+	"""Private function running an add check, a conflict it finds is the same single statement"""
+
+	try:
+		check(*args)
+	except Exception:
+		pass
+
+def buildDatabase(path,migrate,areas,fields,finds):
+	"""Create a stand-in database file with synthetic areas and return it open
+
+	Keyword arguments:
+	path -- database file
+	migrate -- apply the migrations
+	areas -- number of synthetic areas
+	fields -- fields per area
+	finds -- finds per area
+	"""
+
+	db = ffLib.DbFieldsFindsSqlite(path,demoData=True,migrate=migrate)
+	db.setMaterialized(migrate)
+	db.openConnection()
+	for i in range(areas):
+		loadArea(db,10+i,'Synthetic ' + str(i),1000,fields,finds,seed=i+1)
+	db._sqlite.execute('ANALYZE')
+	db._sqlite.commit()
+	return db
+
+def measure(db,queries,repeat):
+	"""Return dictionary of label to (plan lines, best seconds, rows)
+
+	Keyword arguments:
+	db -- open DbFieldsFindsSqlite
+	queries -- list from hotQueries
+	repeat -- runs per query, the best is kept
+	"""
+
+	recorder = _RecordingConnection(db._conn)
+	db._conn = recorder
+	results = {}
+	for label,query in queries:
+		best = None
+		for i in range(repeat):
+			start = time.perf_counter()
+			result = query(db)
+			seconds = time.perf_counter() - start
+			best = seconds if best == None or seconds < best else best
+		sql,binds = recorder.last
+		plan = db._sqlite.execute('EXPLAIN QUERY PLAN ' + sql.replace('s1783947.',''),binds).fetchall()
+		rows = len(result) if isinstance(result,list) else 1
+		results[label] = ([row[-1] for row in plan],best,rows)
+	db._conn = recorder._conn
+	return results
+
+def writeReport(outFile,args,before,after,queries):
+	"""Write the markdown report"""
+
+	outFile.write('# Schema migration report\n\n')
+	outFile.write('SQLite stand-in, %d synthetic areas of 1000 x 1000 with %d fields and %d finds each plus the demo data. ' % (args.areas,args.fields,args.finds))
+	outFile.write('Before reads the combined views of the base schema, after has every migration applied and reads the denormalized tables. ')
+	outFile.write('Best of %d runs. Generated by benchmarks/migrationReport.py, Oracle plans will differ but use the same indexes.\n\n' % args.repeat)
+	outFile.write('| Query | Rows | Before (ms) | After (ms) | Speed up |\n')
+	outFile.write('|---|---:|---:|---:|---:|\n')
+	for label,query in queries:
+		plansBefore,secondsBefore,rows = before[label]
+		plansAfter,secondsAfter,rows = after[label]
+		outFile.write('| %s | %d | %.2f | %.2f | %.1fx |\n' % (label,rows,secondsBefore*1000,secondsAfter*1000,secondsBefore/max(secondsAfter,1e-9)))
+	outFile.write('\n## Query plans\n')
+	for label,query in queries:
+		outFile.write('\n### ' + label + '\n\nBefore:\n\n```\n' + '\n'.join(before[label][0]) + '\n```\n\nAfter:\n\n```\n' + '\n'.join(after[label][0]) + '\n```\n')
+
+def main():
+	"""Build both databases and write the report"""
+
+	parser = argparse.ArgumentParser(description='Query plans and timings before and after the schema migrations')
+	parser.add_argument('--areas',type=int,default=8,help='synthetic areas')
+	parser.add_argument('--fields',type=int,default=2000,help='fields per area')
+	parser.add_argument('--finds',type=int,default=25000,help='finds per area')
+	parser.add_argument('--repeat',type=int,default=5,help='runs per query, the best is reported')
+	parser.add_argument('--output',default=None,help='markdown file to write, printed if not given')
+	args = parser.parse_args()
+
+	folder = tempfile.mkdtemp()
+	try:
+		queries = hotQueries(10 + args.areas // 2,'Synthetic ' + str(args.areas // 2))
+		results = []
+		for name,migrate in [('before.db',False),('after.db',True)]:
+			db = buildDatabase(os.path.join(folder,name),migrate,args.areas,args.fields,args.finds)
+			results.append(measure(db,queries,args.repeat))
+			db.closeConnection()
+	finally:
+		shutil.rmtree(folder)
+
+	if args.output != None:
+		with open(args.output,'w') as outFile:
+			writeReport(outFile,args,results[0],results[1],queries)
+	else:
+		writeReport(sys.stdout,args,results[0],results[1],queries)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+""" Synthetic fields and finds for the benchmarks
+
+A thin wrapper over fieldsFindsLibrary.generateArea so the benchmarks measure the same packed
+fields and clustered finds as generateArea.py. Crops, classes and owners are those of the
+SQLite stand-in demo data.
+"""
+
+import os
+import sys
+from datetime import date
+
+#Allow running from the repository root or the benchmarks folder
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),'..'))
+import fieldsFindsLibrary as ffLib
+
+#Colours of the demo data classes, not part of the reference rows
+CLASS_COLOURS = {'SHERD':'red','COIN':'gold','FLINT':'grey','BROOCH':'blue'}
+
+
+def buildMapArea(maxXY,numFields,numFinds,seed=1):
+	"""Create a MapArea with synthetic fields and finds without a database
+
+	Keyword arguments:
+	maxXY -- size of each side of the area
+	numFields -- number of fields
+	numFinds -- number of finds
+	seed -- random seed
+	"""
+
+	reference = ffLib.DEMO_REFERENCE
+	tables = dict([(table,rows) for table,columns,rows in ffLib.generateArea(1,'Benchmark',maxXY,maxXY,numFields,numFinds,reference,seed,1)])
+	crops = dict(reference['crops'])
+	classes = dict([(c[0],c) for c in reference['classes']])
+	area = ffLib.MapArea(1,'Benchmark',maxXY,maxXY,'')
+	fields = []
+	for row in tables['FF_FIELDS_NEW']:
+		fields.append(ffLib.Field(row[0],row[1],row[2],row[3],row[4],row[5],crops[row[7]],
+									date(2018,3,1),date(2018,9,1),row[6],row[8],'',''))
+	finds = []
+	for row in tables['FF_FINDS_NEW']:
+		cls = classes[row[3]]
+		finds.append(ffLib.Find(row[0],row[1],row[2],row[4],row[5],cls[1],cls[2],cls[3],row[6],CLASS_COLOURS.get(cls[1],'grey'),row[7]))
+	area.addFields(fields,'field')
+	area.addFinds(finds,'find')
+	return area
+
+def loadArea(db,areaId,areaName,maxXY,numFields,numFinds,seed=1):
+	"""Add a synthetic area to an open SQLite stand-in database
+
+	Keyword arguments:
+	db -- open DbFieldsFindsSqlite
+	areaId -- new area id
+	areaName -- new area name
+	maxXY -- size of each side of the area
+	numFields -- number of fields
+	numFinds -- number of finds
+	seed -- random seed
+	"""
+
+	ffLib.loadArea(db,ffLib.generateArea(areaId,areaName,maxXY,maxXY,numFields,numFinds,None,seed))
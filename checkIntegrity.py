@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+""" Scan areas for overlapping fields, objects out of bounds and duplicate find coordinates
+
+Prints a summary per area and optionally writes the full json report. Exits with status 1
+when any problem is found.
+
+Usage:
+	python checkIntegrity.py [--source oracle|sqlite:<file>|snapshot:<folder>] [--area name ...] [--output report.json]
+"""
+
+import argparse
+import json
+import sys
+
+#FieldsFindsLibrary is the main library for generating the website
+import fieldsFindsLibrary as ffLib
+
+
+def main():
+	"""Scan the areas and report the problems"""
+
+	parser = argparse.ArgumentParser(description='Scan areas for overlapping fields, objects out of bounds and duplicate find coordinates')
+	parser.add_argument('--source',default='oracle',help='oracle, sqlite:<database file> or snapshot:<snapshot folder>')
+	parser.add_argument('--area',action='append',default=None,help='area name to scan, repeat for more, all areas if not given')
+	parser.add_argument('--output',default=None,help='write the json report to this file, - for stdout')
+	args = parser.parse_args()
+
+	db = ffLib.dbFromSource(args.source)
+	db.openConnection()
+	try:
+		report = ffLib.scanDatabase(db,args.area)
+	finally:
+		db.closeConnection()
+
+	if args.output == '-':
+		json.dump(report,sys.stdout,indent=1)
+		print('')
+	else:
+		for area in report['areas']:
+			print('%s: %d fields, %d finds, %d overlapping pairs, %d fields and %d finds out of bounds, %d duplicate find coordinates (%.2fs)' % (
+					area['areaName'],area['fields'],area['finds'],len(area['overlappingFields']),
+					len(area['fieldBounds']),len(area['findBounds']),len(area['duplicateFinds']),area['seconds']))
+		if args.output != None:
+			with open(args.output,'w') as outFile:
+				json.dump(report,outFile,indent=1)
+	sys.exit(0 if report['problems'] == 0 else 1)
+
+if __name__ == '__main__':
+	main()
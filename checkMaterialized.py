@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+""" Check the denormalized fields and finds tables
+
+Compares FF_FIELDS_MAT and FF_FINDS_MAT with the combined views they copy and prints the ids
+that differ. Exits with status 1 when they are inconsistent.
+
+Usage:
+	python checkMaterialized.py [--sqlite database.db] [--refresh]
+"""
+
+import argparse
+import sys
+
+#FieldsFindsLibrary is the main library for generating the website
+import fieldsFindsLibrary as ffLib
+
+
+def main():
+	"""Check and optionally rebuild the tables"""
+
+	parser = argparse.ArgumentParser(description='Check the denormalized fields and finds tables against the combined views')
+	parser.add_argument('--sqlite',default=None,help='check this SQLite stand-in database rather than Oracle')
+	parser.add_argument('--refresh',action='store_true',help='rebuild the tables from the views when they differ')
+	args = parser.parse_args()
+
+	db = ffLib.DbFieldsFindsSqlite(args.sqlite) if args.sqlite != None else ffLib.DbFieldsFinds()
+	db.openConnection()
+	report = db.checkMaterialized()
+	consistent = True
+	for kind in sorted(report):
+		for problem in ['missing','extra','different']:
+			ids = report[kind][problem]
+			if len(ids) > 0:
+				consistent = False
+				print('%s %s: %d %s' % (kind,problem,len(ids),', '.join([str(id) for id in ids[:20]]) + (' ...' if len(ids) > 20 else '')))
+	if consistent:
+		print('Denormalized tables match the views')
+	elif args.refresh:
+		counts = db.refreshMaterialized()
+		print('Rebuilt ' + str(counts['field']) + ' fields and ' + str(counts['find']) + ' finds')
+		consistent = True
+	db.closeConnection()
+	sys.exit(0 if consistent else 1)
+
+if __name__ == '__main__':
+	main()
@@ -2,6 +2,8 @@
 Library of Classes:
 	WebsiteFieldsFinds
 	DbFieldsFinds
+	DbFieldsFindsSqlite
+	DbFieldsFindsSnapshot
 	MapArea
 	Field
 	Find
@@ -9,10 +11,41 @@ Library of Classes:
 	FormList
 	Status
 	HTMLHelper
+	RequestTimer
+	QueryLog
+	AreaSnapshot
+	FindFilter
+	RasterCache
+	ImageCache
+	FindIndex
+	FindIndexCache
+	SpatialQuery
+	MetricsRegistry
+	SingleFlight
+	AreaStatisticsCache
 """
 
 from .database import *
+from .sqliteDatabase import *
+from .snapshotDatabase import *
+from .snapshot import *
 from .website import *
 from .geoObjects import *
 from .webObjects import *
-from .htmlHelper import *
\ No newline at end of file
+from .htmlHelper import *
+from .timing import *
+from .queryLog import *
+from .concurrentFetch import *
+from .dbSource import *
+from .thumbnails import *
+from .staticSite import *
+from .findFilter import *
+from .migrations import *
+from .raster import *
+from .imageCache import *
+from .spatialIndex import *
+from .integrity import *
+from .metrics import *
+from .singleFlight import *
+from .areaStatistics import *
+from .syntheticArea import *
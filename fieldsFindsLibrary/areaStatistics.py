@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import threading
+from collections import OrderedDict
+import numpy as np
+from .metrics import getMetrics
+__all__ = ['AreaStatisticsCache','summarizeArea']
+
+#Most bars of the depth histogram
+_DEPTH_BINS = 10
+
+
+def summarizeArea(areaId,maxX,maxY,version,findGroups,fieldGroups):
+	"""Return the statistics dictionary of an area from its grouped counts
+
+	Finds are counted by class, period and use with the mean depth of each class, depths are
+	summarised by quartiles and a histogram, and field counts and areas are totalled by crop and
+	owner with the share of the map area the fields cover. Finds are grouped by depth as well
+	as class so the depth summary is exact without a row per find.
+
+	Keyword arguments:
+	areaId -- Id of MapArea
+	maxX,maxY -- map area size
+	version -- area data version the statistics were computed at
+	findGroups -- list of (class, period, use, depth, count) per find class and depth, depth None when missing
+	fieldGroups -- list of (crop, owner, count, area sum) per crop and owner
+	"""
+
+	classes = {}
+	depthValues = []
+	depthCounts = []
+	#Sorted so totals add up in the same order whichever database grouped them
+	for className,period,use,depth,count in sorted(findGroups,key=_groupKey):
+		key = (_name(className),_name(period),_name(use))
+		total = classes.setdefault(key,[0,0,0.0])
+		total[0] = total[0] + int(count)
+		if depth != None:
+			total[1] = total[1] + int(count)
+			total[2] = total[2] + float(depth) * int(count)
+			depthValues.append(float(depth))
+			depthCounts.append(int(count))
+
+	byClass = []
+	byPeriod = {}
+	byUse = {}
+	findCount = 0
+	for (className,period,use),(count,depthCount,depthSum) in sorted(classes.items()):
+		findCount = findCount + count
+		meanDepth = depthSum / depthCount if depthCount > 0 else None
+		byClass.append({'name':className,'period':period,'use':use,'count':count,'meanDepth':meanDepth})
+		byPeriod[period] = byPeriod.get(period,0) + count
+		byUse[use] = byUse.get(use,0) + count
+	depths = np.repeat(np.array(depthValues,dtype=np.float64),np.array(depthCounts,dtype=np.int64))
+
+	byCrop = {}
+	byOwner = {}
+	fieldCount = 0
+	fieldArea = 0.0
+	for crop,owner,count,area in sorted(fieldGroups,key=_groupKey):
+		count = int(count)
+		area = float(area or 0)
+		fieldCount = fieldCount + count
+		fieldArea = fieldArea + area
+		for totals,name in [(byCrop,_name(crop)),(byOwner,_name(owner))]:
+			total = totals.setdefault(name,[0,0.0])
+			total[0] = total[0] + count
+			total[1] = total[1] + area
+	mapSize = float(maxX) * float(maxY)
+
+	return {
+			'areaId':int(areaId),
+			'version':int(version),
+			'finds':{
+					'count':findCount,
+					'byClass':byClass,
+					'byPeriod':[{'name':name,'count':byPeriod[name]} for name in sorted(byPeriod)],
+					'byUse':[{'name':name,'count':byUse[name]} for name in sorted(byUse)],
+					'depth':_depthSummary(depths)
+					},
+			'fields':{
+					'count':fieldCount,
+					'area':fieldArea,
+					'coverage':fieldArea / mapSize if mapSize > 0 else 0.0,
+					'byCrop':[{'name':name,'count':byCrop[name][0],'area':byCrop[name][1]} for name in sorted(byCrop)],
+					'byOwner':[{'name':name,'count':byOwner[name][0],'area':byOwner[name][1]} for name in sorted(byOwner)]
+					}
+			}
+
+def _depthSummary(depths):
+	"""Private function returning the count, range, mean, quartiles and histogram of the depths"""
+
+	summary = {'count':int(len(depths)),'min':None,'max':None,'mean':None,'quartiles':[],'histogram':[]}
+	if len(depths) == 0:
+		return summary
+	low = float(np.floor(depths.min()))
+	high = float(np.ceil(depths.max()))
+	if high <= low:
+		high = low + 1
+	counts,edges = np.histogram(depths,bins=_DEPTH_BINS,range=(low,high))
+	summary.update({
+			'min':float(depths.min()),
+			'max':float(depths.max()),
+			'mean':float(depths.mean()),
+			'quartiles':[float(value) for value in np.percentile(depths,[25,50,75])],
+			'histogram':[{'low':float(edges[i]),'high':float(edges[i+1]),'count':int(counts[i])} for i in range(len(counts))]
+			})
+	return summary
+
+def _groupKey(group):
+	"""Private function returning a sort key of a group with missing values first"""
+
+	return [(value != None,value if value != None else 0) for value in group]
+
+def _name(value):
+	"""Private function returning a group name, blank for missing values"""
+
+	return '' if value == None else str(value)
+
+
+class AreaStatisticsCache(object):
+	"""Bounded in memory cache of area statistics keyed by area and data version
+
+	A write raises the area data version so the statistics are computed again and the older
+	versions of the area are dropped when they are stored.
+	"""
+
+	def __init__(self,maxEntries=16):
+		"""Initialise object
+
+		Keyword arguments:
+		maxEntries -- most areas kept (default 16)
+		"""
+
+		self._maxEntries = maxEntries
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self,areaId,version):
+		"""Return the cached statistics dictionary or None
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		version -- area data version
+		"""
+
+		key = (str(areaId),version)
+		with self._lock:
+			stats = self._entries.get(key)
+			if stats != None:
+				self._entries.move_to_end(key)
+		getMetrics().recordCache('areaStatistics',stats != None)
+		return stats
+
+	def put(self,areaId,version,stats):
+		"""Store statistics, removing those of older versions of the area
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		version -- area data version
+		stats -- statistics dictionary from summarizeArea
+		"""
+
+		with self._lock:
+			for key in [key for key in self._entries if key[0] == str(areaId) and key[1] != version]:
+				del self._entries[key]
+			self._entries[(str(areaId),version)] = stats
+			while len(self._entries) > self._maxEntries:
+				self._entries.popitem(last=False)
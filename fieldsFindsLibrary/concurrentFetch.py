@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+__all__ = ['fetchConcurrent','FETCH_THREADS']
+
+#Worker threads, also the most pooled sessions used at once
+FETCH_THREADS = 4
+
+#Pool shared by all requests in the process
+_executor = None
+_executorLock = threading.Lock()
+
+
+def fetchConcurrent(db,calls):
+	"""Run independent database queries in parallel, each on its own pooled session
+
+	All calls are waited for and their sessions released before returning. If any call fails
+	the exception of the first failing call in list order is raised, as the serial path would.
+
+	Keyword arguments:
+	db -- open DbFieldsFinds supporting openSession
+	calls -- list of (key, method name, argument tuple)
+	"""
+
+	futures = [(key,_getExecutor().submit(_runOnSession,db,method,args)) for key,method,args in calls]
+
+	#Wait for everything so no session is still in use when an error is raised
+	results = {}
+	error = None
+	for key,future in futures:
+		try:
+			results[key] = future.result()
+		except Exception as e:
+			if error == None:
+				error = e
+	if error != None:
+		raise error
+	return results
+
+def _runOnSession(db,method,args):
+	"""Private function calling method on a new session and always releasing it"""
+
+	session = db.openSession()
+	try:
+		return getattr(session,method)(*args)
+	finally:
+		session.closeSession()
+
+def _getExecutor():
+	"""Private function creating the shared thread pool on first use"""
+
+	global _executor
+	with _executorLock:
+		if _executor == None:
+			_executor = ThreadPoolExecutor(max_workers=FETCH_THREADS,thread_name_prefix='ffFetch')
+	return _executor
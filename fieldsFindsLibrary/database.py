@@ -1,8 +1,135 @@
 #!/usr/bin/env python3
-import cx_Oracle
-from .geoObjects import Field, Find, MapArea
+try:
+	import cx_Oracle
+except ImportError:
+	#Only needed to connect to Oracle. The SQLite stand-in runs without it
+	cx_Oracle = None
+import copy
+import os
+import threading
+import numpy as np
+from functools import wraps
+from .geoObjects import Field, Find, MapArea, MAX_AREA_SIZE, MAX_LARGE_AREA_SIZE
+from .timing import NULL_TIMER
+from .snapshot import writeAreaSnapshot, writeSnapshotIndex, snapshotPath
+from .migrations import applyMigrations, appliedMigrations
+from .spatialIndex import FindIndex, FindIndexCache
+from .areaStatistics import AreaStatisticsCache, summarizeArea
 __all__ = ['DbFieldsFinds']
 
+#Oracle session pool shared by concurrent fetches, created on first use
+_sessionPool = None
+_sessionPoolLock = threading.Lock()
+_SESSION_POOL_MAX = 8
+
+#Columns of the combined views and their denormalized FF_*_MAT copies
+_FIELD_COLUMNS = "FIELD_ID, LOW_X, HI_X, LOW_Y, HI_Y, FIELD_AREA, CROP_NAME, CROP_START, CROP_END, OWNER, AREA_ID, OWNER_IMAGE, CROP_IMAGE"
+_FIND_COLUMNS = "OBJECT_ID, X, Y, DEPTH, FIELD_NOTES, TYPE, PERIOD, USE, AREA_ID, COLOUR, FIND_IMAGE"
+
+#Kind of row to (denormalized table, logical view, id column, columns)
+_MATERIALIZED = {
+		'field':('s1783947.FF_FIELDS_MAT','s1783947.VIEW_FIELDS_COMB','FIELD_ID',_FIELD_COLUMNS),
+		'find':('s1783947.FF_FINDS_MAT','s1783947.VIEW_FINDS_COMB','OBJECT_ID',_FIND_COLUMNS)
+		}
+
+#Kind of id lookup to (table, column) searched, field and find ids are those that can be deleted
+#and delArea is the area names less the default and demo maps
+_LOOKUPS = {
+		'field':('s1783947.FF_FIELDS_NEW','FIELD_ID'),
+		'find':('s1783947.FF_FINDS_NEW','FIND_ID'),
+		'area':('s1783947.FF_AREA','AREA_NAME'),
+		'delArea':('s1783947.FF_AREA','AREA_NAME')
+		}
+
+#Default and demo maps that cannot be deleted
+_PROTECTED_AREAS = ['Default','Demo Kindrogan','Demo Large']
+
+#Most digits in a field or find id, NUMBER(10)
+_ID_DIGITS = 10
+
+def _lookupWhere(kind,column,prefix,after):
+	"""Return predicates and binds matching lookupIds prefix and after values
+	
+	A numeric id prefix such as 12 matches 12, 120 to 129, 1200 to 1299 and so on, one range
+	per id length, so the lookup stays an index range scan. Area names match case sensitively.
+	
+	Keyword arguments:
+	kind -- field, find, area or delArea
+	column -- column searched
+	prefix -- start of the id or area name
+	after -- last value of the previous page or None
+	"""
+	
+	predicates = []
+	binds = {}
+	if kind in ['area','delArea']:
+		if kind == 'delArea':
+			predicates.append(column + ' not in (' + ','.join([':Protected' + str(i) for i in range(len(_PROTECTED_AREAS))]) + ')')
+			for i,name in enumerate(_PROTECTED_AREAS):
+				binds['Protected' + str(i)] = name
+		if len(prefix) > 0:
+			#Names from the prefix up to the prefix with its last character incremented
+			predicates.append(column + '>=:Prefix and ' + column + '<:PrefixEnd')
+			binds['Prefix'] = prefix
+			binds['PrefixEnd'] = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+		if after != None:
+			predicates.append(column + '>:After')
+			binds['After'] = after
+		return predicates,binds
+	
+	ranges = _idRanges(prefix)
+	if ranges != None:
+		if len(ranges) == 0:
+			predicates.append('1=0')
+		else:
+			for i,(low,high) in enumerate(ranges):
+				binds['Low' + str(i)] = low
+				binds['High' + str(i)] = high
+			predicates.append('(' + ' or '.join([column + ' between :Low' + str(i) + ' and :High' + str(i) for i in range(len(ranges))]) + ')')
+	if after != None:
+		predicates.append(column + '>:After')
+		binds['After'] = _afterId(after)
+	return predicates,binds
+
+def _afterId(after):
+	"""Return the last id of the previous page as an int, checked like an id prefix
+	
+	Keyword arguments:
+	after -- last id of the previous page
+	"""
+	
+	after = str(after)
+	if not after.isdigit() or len(after) > _ID_DIGITS:
+		raise Exception('After must be an id')
+	return int(after)
+
+def _idRanges(prefix):
+	"""Return list of inclusive (low, high) id ranges starting with the digits of prefix, None if blank
+	
+	Keyword arguments:
+	prefix -- start of the id
+	"""
+	
+	if len(prefix) == 0:
+		return None
+	if not prefix.isdigit():
+		raise Exception('Id must be a number')
+	if prefix[0] == '0':
+		#Only zero itself starts with 0
+		return [(0,0)] if prefix == '0' else []
+	value = int(prefix)
+	return [(value * 10**k,(value + 1) * 10**k - 1) for k in range(_ID_DIGITS - len(prefix) + 1)]
+
+def _timed(method):
+	"""Decorator recording a timing span named after the database method"""
+	
+	name = method.__name__
+	@wraps(method)
+	def timedMethod(self,*args,**kwargs):
+		with self._timer.span(name):
+			return method(self,*args,**kwargs)
+	return timedMethod
+
 class DbFieldsFinds(object):
 	"""This object controls all interactions with the fields and finds database
 	
@@ -14,22 +141,100 @@ class DbFieldsFinds(object):
 	5) Delete maps, fields and finds
 	6) Add new find classes, crops and owners
 	7) Get lists of data from database
+	8) Apply the schema migrations in sql/migrations
+	9) Maintain and check the denormalized FF_FIELDS_MAT and FF_FINDS_MAT tables
+	10) Report the per area data version and the fields and finds changed since a version
+	11) Build KD-tree indexes of find coordinates for radius, nearest and box queries
+	12) Get field boxes and find points for the integrity scan
+	13) Summarise the finds and fields of an area for the statistics panel
+	14) Get the crop, owner and class ids synthetic areas reference
 	"""
 
+	#Folder of sql/migrations holding this database's scripts
+	dialect = 'oracle'
+
 	def __init__(self):
 		"""Initialise and set connection to None"""
 	
 		self._conn = None
+		self._lastInsertId = None
+		self._timer = NULL_TIMER
+		self._queryLog = None
+		self._snapshotDir = None
+		self._rawSession = None
+		self._materialized = True
+		self._findIndexes = FindIndexCache()
+		self._areaStatistics = AreaStatisticsCache()
+	
+	def setTimer(self,timer):
+		"""Record query timing spans to timer
+		
+		Keyword arguments:
+		timer -- RequestTimer
+		"""
+		
+		self._timer = timer
+	
+	def setQueryLog(self,queryLog):
+		"""Record every statement to queryLog, takes effect when the connection is opened
+		
+		Keyword arguments:
+		queryLog -- QueryLog, None to stop recording
+		"""
+		
+		self._queryLog = queryLog
+	
+	def setSnapshotDir(self,snapshotDir):
+		"""Rewrite the area snapshot files in snapshotDir after each write
+		
+		Keyword arguments:
+		snapshotDir -- snapshot folder, None to stop writing snapshots
+		"""
+		
+		self._snapshotDir = snapshotDir
+	
+	def setMaterialized(self,materialized):
+		"""Read fields and finds from the denormalized FF_*_MAT tables and keep them current
+		
+		When off the combined views are read and deletes do not maintain the tables, so run
+		refreshMaterialized before turning it back on. Adds always copy new rows into the
+		tables once migration 007 is applied.
+		
+		Keyword arguments:
+		materialized -- True to use the tables (the default), False for the views
+		"""
+		
+		self._materialized = materialized
 			
+	@_timed
 	def openConnection(self):
 		"""Open Connection"""
+		
+		if cx_Oracle == None:
+			raise Exception('cx_Oracle must be installed to connect to the database')
 	
 		pwdPath = "../../../oracle/mainpwd"
 		with open(pwdPath,'r') as pwdRaw:
 			pwd = pwdRaw.read().strip()
-		self._conn = cx_Oracle.connect(dsn="geosgen",user="s1783947",password=pwd)
+		self._conn = self._instrument(cx_Oracle.connect(dsn="geosgen",user="s1783947",password=pwd))
 		pwd = None #Keep Pwd in memory for a short as possible	
 		
+	def migrateSchema(self,target=None):
+		"""Apply pending schema migrations, returns list of (version, name) applied
+		
+		Keyword arguments:
+		target -- highest version to apply, all if None (default None)
+		"""
+		
+		assert self._conn != None #Check connection open
+		return applyMigrations(self._conn,self.dialect,target)
+	
+	def getSchemaVersions(self):
+		"""Get list of applied migration versions"""
+		
+		assert self._conn != None #Check connection open
+		return appliedMigrations(self._conn)
+	
 	def closeConnection(self):
 		"""Close Connection"""
 	
@@ -37,6 +242,55 @@ class DbFieldsFinds(object):
 		self._conn.close
 		self._conn = None
 	
+	@_timed
+	def openSession(self):
+		"""Return a copy of this object on its own pooled connection for use from another thread
+		
+		The copy shares the timer, query log and snapshot settings. Release it with closeSession.
+		"""
+		
+		assert self._conn != None #Check connection open
+		rawConn = self._acquireSession()
+		session = copy.copy(self)
+		session._rawSession = rawConn
+		session._conn = self._instrument(rawConn)
+		session._lastInsertId = None
+		return session
+	
+	def closeSession(self):
+		"""Release a connection from openSession back to the pool"""
+		
+		assert self._conn != None #Check connection open
+		self._releaseSession(self._rawSession)
+		self._rawSession = None
+		self._conn = None
+	
+	def _acquireSession(self):
+		"""Private method returning a connection from the Oracle session pool"""
+		
+		global _sessionPool
+		with _sessionPoolLock:
+			if _sessionPool == None:
+				pwdPath = "../../../oracle/mainpwd"
+				with open(pwdPath,'r') as pwdRaw:
+					pwd = pwdRaw.read().strip()
+				_sessionPool = cx_Oracle.SessionPool(user="s1783947",password=pwd,dsn="geosgen",min=1,max=_SESSION_POOL_MAX,increment=1,threaded=True)
+				pwd = None #Keep Pwd in memory for a short as possible
+		return _sessionPool.acquire()
+	
+	def _releaseSession(self,rawConn):
+		"""Private method returning a connection to the Oracle session pool"""
+		
+		_sessionPool.release(rawConn)
+	
+	def _instrument(self,conn):
+		"""Private method wrapping conn with the query log if one is set"""
+		
+		if self._queryLog == None:
+			return conn
+		return self._queryLog.wrap(conn)
+	
+	@_timed
 	def getMapArea(self,areaName):
 		"""Get Map Area
 		
@@ -58,91 +312,367 @@ class DbFieldsFinds(object):
 			
 		return area
 	
+	@_timed
 	def getFields(self,areaId):
 		"""Get Fields in Area
 		
 		Keyword arguments:
 		areaId -- Id of MapArea
 		"""	
+		
+		return self._loadFields("AREA_ID=:AreaId",AreaId=areaId)
 	
-		assert self._conn != None #Check connection open
-		cursor = self._conn.cursor()
+	@_timed
+	def getField(self,fieldId):
+		"""Get a single Field
 		
-		sql = "Select FIELD_ID, LOW_X, HI_X, LOW_Y, HI_Y, FIELD_AREA, CROP_NAME, CROP_START, CROP_END, OWNER, AREA_ID, OWNER_IMAGE, CROP_IMAGE from s1783947.VIEW_FIELDS_COMB where AREA_ID=:AreaId"
-		cursor.execute(sql,AreaId=areaId)
+		Keyword arguments:
+		fieldId -- Id of Field
+		"""
+		
+		fieldList = self._loadFields("FIELD_ID=:FieldId",FieldId=fieldId)
+		if len(fieldList) == 0:
+			raise Exception("Cannot Find Field " + str(fieldId))
+		return fieldList[0]
+	
+	@_timed
+	def getFinds(self,areaId,filterClass=None,findFilter=None):
+		"""Get Finds in Area
+		
+		Keyword arguments:
+		areaId -- Id of MapArea
+		filterClass -- only return finds of this class (default None)
+		findFilter -- FindFilter applied in the database (default None)
+		"""	
+		
+		#Apply Filter
+		where = "AREA_ID=:AreaId"
+		binds = {'AreaId':areaId}
+		if filterClass != None:
+			where = where + " and Type=:FilterClass"
+			binds['FilterClass'] = filterClass
+		if findFilter != None:
+			predicates,filterBinds = findFilter.where()
+			if len(predicates) > 0:
+				where = where + " and " + predicates
+				binds.update(filterBinds)
+		return self._loadFinds(where,**binds)
+	
+	@_timed
+	def getFind(self,findId):
+		"""Get a single Find
+		
+		Keyword arguments:
+		findId -- Id of Find
+		"""
+		
+		findList = self._loadFinds("OBJECT_ID=:FindId",FindId=findId)
+		if len(findList) == 0:
+			raise Exception("Cannot Find Find " + str(findId))
+		return findList[0]
+	
+	def _loadFields(self,where,**binds):
+		"""private field loader
+		
+		Keyword arguments:
+		where -- sql where clause
+		binds -- bind values used in where clause
+		"""
 		
 		fieldList = []
-		for row in cursor:
+		for row in self._selectFields(where,**binds):
 			field = Field(row[0],row[1],row[2],row[3],row[4],row[5],row[6],row[7],row[8],row[9],row[10],row[11],row[12])
 			fieldList.append(field)
-		cursor = None
 		
 		return fieldList
 	
-	def getFinds(self,areaId,filterClass=None):
-		"""Get Finds in Area
+	def _selectFields(self,where,**binds):
+		"""private field row loader
 		
 		Keyword arguments:
-		areaId -- Id of MapArea
-		"""	
+		where -- sql where clause
+		binds -- bind values used in where clause
+		"""
 		
 		assert self._conn != None #Check connection open
-			
 		cursor = self._conn.cursor()
-		sql = "Select OBJECT_ID, X, Y, DEPTH, FIELD_NOTES, TYPE, PERIOD, USE, AREA_ID, COLOUR, FIND_IMAGE from s1783947.VIEW_FINDS_COMB where AREA_ID=:AreaId"
 		
-		#Apply Filter
-		if filterClass == None:
-			cursor.execute(sql,AreaId=areaId)
-		else:
-			sql = sql + " and Type=:FilterClass"
-			cursor.execute(sql,AreaId=areaId,FilterClass=filterClass)
+		sql = "Select " + _FIELD_COLUMNS + " from " + self._source('field') + " where " + where + " Order By FIELD_ID"
+		cursor.execute(sql,**binds)
+		return cursor.fetchall()
+	
+	def _loadFinds(self,where,**binds):
+		"""private find loader
+		
+		Keyword arguments:
+		where -- sql where clause
+		binds -- bind values used in where clause
+		"""
 		
 		findList = []
-		for row in cursor:
+		for row in self._selectFinds(where,**binds):
 			find = Find(row[0],row[1],row[2],row[3],row[4],row[5],row[6],row[7],row[8],row[9],row[10])
 			findList.append(find)
-		cursor = None
 		
 		return findList
 	
+	def _selectFinds(self,where,**binds):
+		"""private find row loader
+		
+		Keyword arguments:
+		where -- sql where clause
+		binds -- bind values used in where clause
+		"""
+		
+		assert self._conn != None #Check connection open
+		cursor = self._conn.cursor()
+		
+		sql = "Select " + _FIND_COLUMNS + " from " + self._source('find') + " FC where " + where + " Order By OBJECT_ID"
+		cursor.execute(sql,**binds)
+		return cursor.fetchall()
+	
 	
+	@_timed
 	def getMapAreaList(self):
 		"""Get list of Map Areas"""
 	
 		sql = "Select Distinct AREA_NAME from s1783947.FF_AREA Order By AREA_NAME"
 		return self._getList(sql)
 		
+	@_timed
 	def getCropList(self):
 		"""Get list of Crops"""
 	
 		sql = "Select Distinct NAME from s1783947.VIEW_CROP_COMB Order By NAME"
 		return self._getList(sql)
 	
+	@_timed
 	def getClassList(self):
 		"""Get list of Classes"""
 	
 		sql = "Select Distinct NAME from s1783947.VIEW_CLASS_COMB Order By NAME"
 		return self._getList(sql)
 		
+	@_timed
 	def getOwnerList(self):
 		"""Get list of Owners"""
 	
 		sql = "Select Distinct FARMER_NAME from s1783947.FF_FARMERS Order By FARMER_NAME"
 		return self._getList(sql)
+	
+	@_timed
+	def getReferenceRows(self):
+		"""Get the crops, owners and find classes new fields and finds can reference
+		
+		Returns a dictionary of crops as (id, name), owner names and classes as (id, name, period, use).
+		"""
 		
+		assert self._conn != None #Check connection open
+		cursor = self._conn.cursor()
+		cursor.execute("Select Distinct CROP, NAME from s1783947.VIEW_CROP_COMB Order By CROP")
+		crops = [(int(row[0]),row[1]) for row in cursor.fetchall()]
+		cursor.execute("Select Distinct TYPE, NAME, PERIOD, USE from s1783947.VIEW_CLASS_COMB Order By TYPE")
+		classes = [(int(row[0]),row[1],row[2],row[3]) for row in cursor.fetchall()]
+		return {'crops':crops,'owners':self.getOwnerList(),'classes':classes}
+		
+	@_timed
 	def getFieldIdList(self,areaId):
 		"""Get list of Field Ids within area"""
 		
 		sql = "Select Distinct FIELD_ID from s1783947.FF_FIELDS_NEW where AREA_ID=:AreaId Order By FIELD_ID"
 		return self._getListForArea(sql,areaId)
 	
+	@_timed
 	def getFindIdList(self,areaId):
 		"""Get list of Find Ids within area"""
 	
 		sql = "Select Distinct FIND_ID from s1783947.FF_FINDS_NEW where AREA_ID=:AreaId Order By FIND_ID"
 		return self._getListForArea(sql,areaId)
 	
+	@_timed
+	def lookupIds(self,kind,areaId=None,prefix='',after=None,limit=50):
+		"""Get a page of field ids, find ids or area names starting with prefix
+		
+		Returns (values, more) where more is True when another page follows, which is fetched by
+		passing the last value as after. See _lookupWhere for how prefixes are matched.
+		
+		Keyword arguments:
+		kind -- field, find, area or delArea for the areas that can be deleted
+		areaId -- Id of MapArea searched for fields and finds (default None)
+		prefix -- start of the id or area name (default '')
+		after -- last value of the previous page, None for the first page (default None)
+		limit -- most values returned (default 50)
+		"""
+		
+		assert self._conn != None #Check connection open
+		table,column = _LOOKUPS[kind]
+		predicates,binds = _lookupWhere(kind,column,prefix,after)
+		if kind not in ['area','delArea']:
+			predicates.insert(0,'AREA_ID=:AreaId')
+			binds['AreaId'] = areaId
+		sql = "Select " + column + " from " + table
+		if len(predicates) > 0:
+			sql = sql + " where " + " and ".join(predicates)
+		cursor = self._conn.cursor()
+		cursor.execute(sql + " Order By " + column,**binds)
+		values = [row[0] for row in cursor.fetchmany(limit + 1)]
+		return values[:limit],len(values) > limit
+
+	@_timed
+	def getAreaVersion(self,areaId):
+		"""Get the data version of an area, raised by every field and find add and delete
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		"""
+
+		assert self._conn != None #Check connection open
+		cursor = self._conn.cursor()
+		cursor.execute("Select VERSION from s1783947.FF_AREA_VERSION where AREA_ID=:AreaId",AreaId=areaId)
+		row = cursor.fetchone()
+		return int(row[0]) if row != None else 0
+
+	@_timed
+	def getChangesSince(self,areaId,version,findFilter=None):
+		"""Get the fields and finds of an area added or deleted after a data version
+
+		Returns a dictionary with the current version, the fields and finds added since that are
+		still present, and the ids of those deleted since. An id deleted and added again is only
+		in the added list so applying the added list replaces by id. With a filter, changed finds
+		outside it are in the deleted list.
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		version -- version the caller already has
+		findFilter -- FindFilter applied to the added finds (default None)
+		"""
+
+		current = self.getAreaVersion(areaId)
+		if version > current:
+			raise Exception('Version ' + str(version) + ' is newer than the area version ' + str(current))
+
+		#Ids changed between the two versions, then which of them exist now
+		cursor = self._conn.cursor()
+		cursor.execute("Select Distinct KIND, OBJECT_ID from s1783947.FF_CHANGE_LOG where AREA_ID=:AreaId and VERSION>:Since and VERSION<=:Current",AreaId=areaId,Since=version,Current=current)
+		changed = {'field':set(),'find':set()}
+		for kind,objId in cursor.fetchall():
+			changed[kind].add(int(objId))
+		changes = {'version':current,'fields':[],'finds':[],'deletedFields':[],'deletedFinds':[]}
+		if len(changed['field']) + len(changed['find']) == 0:
+			return changes
+
+		logWhere = " in (Select OBJECT_ID from s1783947.FF_CHANGE_LOG where AREA_ID=:AreaId and KIND=:Kind and VERSION>:Since and VERSION<=:Current)"
+		binds = {'AreaId':areaId,'Since':version,'Current':current}
+		if len(changed['field']) > 0:
+			changes['fields'] = self._loadFields("AREA_ID=:AreaId and FIELD_ID" + logWhere,Kind='field',**binds)
+		if len(changed['find']) > 0:
+			where = "AREA_ID=:AreaId and OBJECT_ID" + logWhere
+			findBinds = dict(binds)
+			if findFilter != None:
+				predicates,filterBinds = findFilter.where()
+				if len(predicates) > 0:
+					where = where + " and " + predicates
+					findBinds.update(filterBinds)
+			changes['finds'] = self._loadFinds(where,Kind='find',**findBinds)
+		changes['deletedFields'] = sorted(changed['field'] - set([field.packValues()[0] for field in changes['fields']]))
+		changes['deletedFinds'] = sorted(changed['find'] - set([find.packValues()[0] for find in changes['finds']]))
+		return changes
+
+	@_timed
+	def getFindPoints(self,areaId,findFilter=None):
+		"""Get the ids and (n,2) x,y array of the finds in an area
+		
+		Keyword arguments:
+		areaId -- Id of MapArea
+		findFilter -- FindFilter applied in the database (default None)
+		"""
+		
+		assert self._conn != None #Check connection open
+		where = "AREA_ID=:AreaId"
+		binds = {'AreaId':areaId}
+		if findFilter != None:
+			predicates,filterBinds = findFilter.where()
+			if len(predicates) > 0:
+				where = where + " and " + predicates
+				binds.update(filterBinds)
+		cursor = self._conn.cursor()
+		cursor.execute("Select OBJECT_ID, X, Y from " + self._source('find') + " FC where " + where,**binds)
+		rows = np.array(cursor.fetchall(),dtype=np.int64).reshape(-1,3)
+		return rows[:,0],rows[:,1:]
+	
+	def getFieldBoxes(self,areaId):
+		"""Get the ids and (n,4) lowX,lowY,hiX,hiY array of the fields in an area
+		
+		Keyword arguments:
+		areaId -- Id of MapArea
+		"""
+		
+		assert self._conn != None #Check connection open
+		cursor = self._conn.cursor()
+		cursor.execute("Select FIELD_ID, LOW_X, LOW_Y, HI_X, HI_Y from " + self._source('field') + " where AREA_ID=:AreaId",AreaId=areaId)
+		rows = np.array(cursor.fetchall(),dtype=np.int64).reshape(-1,5)
+		return rows[:,0],rows[:,1:]
+	
+	def getFindIndex(self,areaId,findFilter=None):
+		"""Get the FindIndex of an area for radius, nearest and box queries
+		
+		Indexes are cached by area data version so any field or find write builds a new one.
+		
+		Keyword arguments:
+		areaId -- Id of MapArea
+		findFilter -- only index finds matching this FindFilter (default None)
+		"""
+		
+		version = self.getAreaVersion(areaId)
+		filterKey = findFilter.key() if findFilter != None else ''
+		index = self._findIndexes.get(areaId,version,filterKey)
+		if index == None:
+			ids,points = self.getFindPoints(areaId,findFilter)
+			index = FindIndex(ids,points)
+			self._findIndexes.put(areaId,version,filterKey,index)
+		return index
+	
+	def getAreaStatistics(self,areaId):
+		"""Get the find counts by class, period and use, depth distribution and field totals of an area
+		
+		Counts and totals are grouped in the database over the combined views and the depths
+		summarised with numpy. Results are cached by area data version. See summarizeArea.
+		
+		Keyword arguments:
+		areaId -- Id of MapArea
+		"""
+		
+		version = self.getAreaVersion(areaId)
+		stats = self._areaStatistics.get(areaId,version)
+		if stats == None:
+			stats = self._loadAreaStatistics(areaId,version)
+			self._areaStatistics.put(areaId,version,stats)
+		return stats
+	
+	@_timed
+	def _loadAreaStatistics(self,areaId,version):
+		"""Private method grouping the finds, fields and area size of an area in one statement"""
+		
+		assert self._conn != None #Check connection open
+		sql = ("Select 'find', TYPE, PERIOD, USE, DEPTH, count(*), null from " + self._source('find') + " where AREA_ID=:AreaId Group By TYPE, PERIOD, USE, DEPTH"
+				" Union All Select 'field', CROP_NAME, OWNER, null, null, count(*), sum(FIELD_AREA) from " + self._source('field') + " where AREA_ID=:AreaId Group By CROP_NAME, OWNER"
+				" Union All Select 'area', null, null, null, null, MAX_X, MAX_Y from s1783947.FF_AREA where AREA_ID=:AreaId")
+		cursor = self._conn.cursor()
+		cursor.execute(sql,AreaId=areaId)
+		findGroups = []
+		fieldGroups = []
+		size = None
+		for kind,name,second,third,depth,count,total in cursor.fetchall():
+			if kind == 'find':
+				findGroups.append((name,second,third,depth,count))
+			elif kind == 'field':
+				fieldGroups.append((name,second,count,total))
+			else:
+				size = (count,total)
+		if size == None:
+			raise Exception("Cannot Find Requested Map Area")
+		return summarizeArea(areaId,size[0],size[1],version,findGroups,fieldGroups)
+	
 	def _getList(self,sql):
 		"""private list retriever
 		
@@ -174,7 +704,8 @@ class DbFieldsFinds(object):
 			areaList.append(row[0])
 		return areaList
 	
-	def addNewArea(self,areaName,maxX,maxY,imgPath):
+	@_timed
+	def addNewArea(self,areaName,maxX,maxY,imgPath,largeArea=False):
 		"""Add new area
 		
 		Keyword arguments
@@ -182,6 +713,7 @@ class DbFieldsFinds(object):
 		maxX -- Max X value
 		maxY -- Max Y value
 		imgPath -- Path to background image
+		largeArea -- allow sides up to MAX_LARGE_AREA_SIZE rather than MAX_AREA_SIZE (default False)
 		
 		"""
 	
@@ -207,8 +739,9 @@ class DbFieldsFinds(object):
 		#Value checks
 		if fx <10: raise Exception('X size must be integer greater than 10')
 		if fy <10: raise Exception('Y size must be integer greater than 10')
-		if fx > 50: raise Exception('X size cannot be greater than 50')
-		if fy > 50: raise Exception('Y size cannot be greater than 50')
+		maxSize = MAX_LARGE_AREA_SIZE if largeArea else MAX_AREA_SIZE
+		if fx > maxSize: raise Exception('X size cannot be greater than ' + str(maxSize))
+		if fy > maxSize: raise Exception('Y size cannot be greater than ' + str(maxSize))
 		
 		#Get new Area Id
 		sql = "Select Max(AREA_ID) from s1783947.FF_AREA"
@@ -221,10 +754,13 @@ class DbFieldsFinds(object):
 		sql = "Insert Into s1783947.FF_Area (AREA_ID,AREA_NAME,MAX_X,MAX_Y,IMAGE_PATH) Values (:AreaId,:Name,:MaxX,:MaxY,:ImgPath)"
 		cursor.execute(sql,AreaId=newId,Name=areaName,MaxX=maxX,MaxY=maxY,ImgPath=imgPath)
 		self._conn.commit()
+		self._snapshotChanged(newId)
+		self._snapshotIndexChanged()
 		
 		#Return success message
 		return areaName + ' area created'
 
+	@_timed
 	def addField(self,areaName,lowX,hiX,lowY,hiY,owner,cropName):
 		"""Add new field
 		
@@ -235,9 +771,6 @@ class DbFieldsFinds(object):
 		assert self._conn != None #Check connection open
 		cursor = self._conn.cursor()
 		
-		#Load area to enable checks
-		mapArea = self.getMapArea(areaName)
-		
 		#Check are numbers not strings
 		try:
 			fLowX = float(lowX)
@@ -260,40 +793,36 @@ class DbFieldsFinds(object):
 		if fHiY <=0: raise Exception('Y Coordinates must be integer > 0')
 		if fHiX <= fLowX: raise Exception('High X must be greater than Low X')
 		if fHiY <= fLowY: raise Exception('High Y must be greater than Low Y')
-		if fHiX > mapArea.maxX: raise Exception('X coordinate must be within area bounds')
-		if fHiY > mapArea.maxY: raise Exception('X coordinate must be within area bounds')
 		if fArea <=0: raise Exception('Area must be greater than 0')
 		
-		#Intersect Check
-		self._checkIntersect(mapArea.areaId,fLowX,fLowY,fHiX,fHiY)
-		
-		#Get Crop Id
-		sql = "Select CROP from s1783947.VIEW_CROP_COMB where NAME=:Name"
-		cursor.execute(sql,Name=cropName)
-		i=0
-		for row in cursor:
-			cropId = row[0]
-			i=i+1
-		if i == 0:
-			raise Exception("Crop does not exist: " + cropName)
-		elif i > 1:
-			raise Exception("Duplicate crop in database: " + cropName)
-					
-		#Get new Field Id
-		sql = "Select Max(FIELD_ID) from s1783947.VIEW_FIELDS_COMB"
-		cursor.execute(sql)
-		newId = 0
-		for row in cursor:
-			newId = row[0]+1
-		
-		#Insert Field
-		sql = "Insert Into s1783947.FF_FIELDS_NEW (FIELD_ID,LOWX,HIX,LOWY,HIY,AREA,OWNER,CROP,AREA_ID) Values (:FieldId,:LowX,:HiX,:LowY,:HiY,:Area,:Owner,:CropId,:AreaId)"
-		cursor.execute(sql,FieldId=newId,LowX=lowX,HiX=hiX,LowY=lowY,HiY=hiY,Area=fArea,Owner=owner,CropId=cropId,AreaId=mapArea.areaId)
+		#Area bounds, intersect and crop checks, the insert and its denormalized copy in one statement
+		newId,areaId = self._insertField(cursor,areaName,int(round(fLowX)),int(round(fHiX)),int(round(fLowY)),int(round(fHiY)),fArea,owner,cropName)
 		self._conn.commit()
+		self._lastInsertId = newId
+		self._snapshotChanged(areaId)
 		
 		#Return success message
 		return 'Field ' + str(newId) + ' added'
 		
+	def _insertField(self,cursor,areaName,lowX,hiX,lowY,hiY,area,owner,cropName):
+		""" Private method adding a field with the FF_ADD_FIELD procedure in one round trip
+		
+		Returns (new field id, area id). Raises the procedure error, which names any
+		intersecting fields.
+		
+		Keyword arguments:
+		cursor,areaName,lowX,hiX,lowY,hiY,area,owner,cropName
+		"""
+		
+		fieldId = cursor.var(int)
+		areaId = cursor.var(int)
+		error = cursor.var(str)
+		sql = "Begin s1783947.FF_ADD_FIELD(:AreaName,:LowX,:HiX,:LowY,:HiY,:Area,:Owner,:CropName,:FieldId,:AreaId,:Error); End;"
+		cursor.execute(sql,AreaName=areaName,LowX=lowX,HiX=hiX,LowY=lowY,HiY=hiY,Area=area,Owner=owner,CropName=cropName,FieldId=fieldId,AreaId=areaId,Error=error)
+		if error.getvalue() != None:
+			raise Exception(error.getvalue())
+		return int(fieldId.getvalue()),int(areaId.getvalue())
+	
 	def _checkIntersect(self,areaId,lowX,lowY,hiX,hiY):
 		""" Private method to check if field intersects with existing fields
 		
@@ -303,7 +832,7 @@ class DbFieldsFinds(object):
 	
 		assert self._conn != None #Check connection open
 		cursor = self._conn.cursor()
-		sql = "select FIELD_ID from VIEW_FIELDS_COMB where AREA_ID=:AreaId and ((:LowX > LOW_X and :LowX < HI_X and :LowY > LOW_Y and :LowY < HI_Y) or (:HiX > LOW_X and :HiX < HI_X and :LowY > LOW_Y and :LowY < HI_Y) or (:LowX > LOW_X and :LowX < HI_X and :HiY > LOW_Y and :HiY < HI_Y) or (:HiX > LOW_X and :HiX < HI_X and :HiY > LOW_Y and :HiY < HI_Y))"
+		sql = "select FIELD_ID from " + self._source('field') + " where AREA_ID=:AreaId and ((:LowX > LOW_X and :LowX < HI_X and :LowY > LOW_Y and :LowY < HI_Y) or (:HiX > LOW_X and :HiX < HI_X and :LowY > LOW_Y and :LowY < HI_Y) or (:LowX > LOW_X and :LowX < HI_X and :HiY > LOW_Y and :HiY < HI_Y) or (:HiX > LOW_X and :HiX < HI_X and :HiY > LOW_Y and :HiY < HI_Y))"
 		cursor.execute(sql,AreaId=areaId,LowX=lowX+0.1,LowY=lowY+0.1,HiX=hiX-0.1,HiY=hiY-0.1)
 		result = ''
 		count = 0
@@ -318,6 +847,7 @@ class DbFieldsFinds(object):
 		if count > 0:
 			raise Exception('Cannot intersect with other fields. This field would intersect with' + result)
 		
+	@_timed
 	def addFind(self,areaName,x,y,typeName,depth,notes,imgPath):
 		"""Add new find
 		
@@ -328,9 +858,6 @@ class DbFieldsFinds(object):
 		assert self._conn != None #Check connection open
 		cursor = self._conn.cursor()
 			
-		#Load area to enable checks
-		mapArea = self.getMapArea(areaName)
-		
 		#Check are numbers not strings
 		try:
 			fx = float(x)
@@ -349,41 +876,37 @@ class DbFieldsFinds(object):
 		#Value checks
 		if fx <0: raise Exception('X Coordinates must be integer greater than 0')
 		if fy <0: raise Exception('Y Coordinates must be integer greater than 0')
-		if fx > mapArea.maxX: raise Exception('X coordinate must be within area bounds')
-		if fy > mapArea.maxY: raise Exception('Y coordinate must be within area bounds')
 		if fDepth <0: raise Exception('Depth must be >= 0')
 		if fDepth >20: raise Exception('Depth must be < 20m')
 		
-		#Existing Find Check
-		self._checkFindCoord(mapArea.areaId,x,y)
-		
-		#Get Type Id
-		sql = "Select TYPE from s1783947.VIEW_CLASS_COMB where NAME=:Name"
-		cursor.execute(sql,Name=typeName)
-		i=0
-		for row in cursor:
-			typeId = row[0]
-			i=i+1
-		if i == 0:
-			raise Exception("Type does not exist: " + typeName)
-		elif i > 1:
-			raise Exception("Duplicate Type in database: " + typeName)
-					
-		#Get new Find Id
-		sql = "Select Max(OBJECT_ID) from s1783947.VIEW_FINDS_COMB"
-		cursor.execute(sql)
-		newId = 0
-		for row in cursor:
-			newId = row[0]+1	
-		
-		#Insert Find
-		sql = "Insert Into s1783947.FF_FINDS_NEW (FIND_ID,XCOORD,YCOORD,TYPE,DEPTH,FIELD_NOTES,AREA_ID,IMAGE_PATH) Values (:FindId,:X,:Y,:TypeId,:Depth,:Notes,:AreaId,:ImgPath)"
-		cursor.execute(sql,FindId=newId,X=x,Y=y,TypeId=typeId,Depth=depth,Notes=notes,AreaId=mapArea.areaId,ImgPath=imgPath)
+		#Area bounds, coordinate and type checks, the insert and its denormalized copy in one statement
+		newId,areaId = self._insertFind(cursor,areaName,int(round(fx)),int(round(fy)),typeName,fDepth,notes,imgPath)
 		self._conn.commit()
+		self._lastInsertId = newId
+		self._snapshotChanged(areaId)
 		
 		#Return success message
 		return 'Find ' + str(newId) + ' added'
 			
+	def _insertFind(self,cursor,areaName,x,y,typeName,depth,notes,imgPath):
+		""" Private method adding a find with the FF_ADD_FIND procedure in one round trip
+		
+		Returns (new find id, area id). Raises the procedure error, which names any find
+		already at the coordinate.
+		
+		Keyword arguments:
+		cursor,areaName,x,y,typeName,depth,notes,imgPath
+		"""
+		
+		findId = cursor.var(int)
+		areaId = cursor.var(int)
+		error = cursor.var(str)
+		sql = "Begin s1783947.FF_ADD_FIND(:AreaName,:X,:Y,:TypeName,:Depth,:Notes,:ImgPath,:FindId,:AreaId,:Error); End;"
+		cursor.execute(sql,AreaName=areaName,X=x,Y=y,TypeName=typeName,Depth=depth,Notes=notes,ImgPath=imgPath,FindId=findId,AreaId=areaId,Error=error)
+		if error.getvalue() != None:
+			raise Exception(error.getvalue())
+		return int(findId.getvalue()),int(areaId.getvalue())
+	
 	def _checkFindCoord(self,areaId,x,y):
 		"""Private method to check if find already exists in location
 		
@@ -395,7 +918,7 @@ class DbFieldsFinds(object):
 	
 		assert self._conn != None #Check connection open
 		cursor = self._conn.cursor()
-		sql = "select OBJECT_ID from VIEW_FINDS_COMB where AREA_ID=:AreaId and X=:X and Y=:Y"
+		sql = "select OBJECT_ID from " + self._source('find') + " where AREA_ID=:AreaId and X=:X and Y=:Y"
 		cursor.execute(sql,AreaId=areaId,X=x,Y=y)
 		result = ''
 		count = 0
@@ -410,6 +933,7 @@ class DbFieldsFinds(object):
 		if count > 0:
 			raise Exception('Cannot have same coordinate as existing find. This find has the same as' + result)
 	
+	@_timed
 	def delFind(self,id):
 		"""Delete find
 		
@@ -419,14 +943,21 @@ class DbFieldsFinds(object):
 	
 		assert self._conn != None #Check connection open
 		cursor = self._conn.cursor()
+		areaIds = self._snapshotAreas("Select AREA_ID from s1783947.FF_FINDS_NEW where FIND_ID=:Id",id)
 			
 		#Delete Find
 		sql = "Delete from s1783947.FF_FINDS_NEW where FIND_ID=:Id"
 		cursor.execute(sql,Id=id)
+		#Only new finds can be deleted so legacy rows stay in the table
+		if cursor.rowcount > 0:
+			self._dematerializeRow(cursor,'find',id)
 		self._conn.commit()
+		for areaId in areaIds:
+			self._snapshotChanged(areaId)
 		
 		return 'Find ' + str(id) + ' deleted'
 	
+	@_timed
 	def delField(self,id):
 		"""Delete field
 		
@@ -436,13 +967,20 @@ class DbFieldsFinds(object):
 	
 		assert self._conn != None #Check connection open
 		cursor = self._conn.cursor()
+		areaIds = self._snapshotAreas("Select AREA_ID from s1783947.FF_FIELDS_NEW where FIELD_ID=:Id",id)
 		#Delete Field
 		sql = "Delete from s1783947.FF_FIELDS_NEW where FIELD_ID=:Id"
 		cursor.execute(sql,Id=id)
+		#Only new fields can be deleted so legacy rows stay in the table
+		if cursor.rowcount > 0:
+			self._dematerializeRow(cursor,'field',id)
 		self._conn.commit()
+		for areaId in areaIds:
+			self._snapshotChanged(areaId)
 		
 		return 'Field ' + str(id) + ' deleted'
 		
+	@_timed
 	def delArea(self,areaName):
 		"""Delete Map Area
 		
@@ -451,8 +989,7 @@ class DbFieldsFinds(object):
 		"""
 	
 		#Check not default or demo area
-		defaultList=['Default','Demo Kindrogan','Demo Large']
-		if areaName in defaultList:
+		if areaName in _PROTECTED_AREAS:
 			raise Exception("Cannot delete default or demo maps. If you create your own map, you'll be able to delete it.")
 				
 		#Load Area to get Id and ensure it exists
@@ -467,9 +1004,11 @@ class DbFieldsFinds(object):
 			self._conn.commit()
 		except:
 			raise Exception('You must remove Fields and Finds within map first due to the database foreign key requirement. This will be improved in next version')
+		self._snapshotRemoved(mapArea.areaId)
 		
 		return areaName + ' map deleted'
 		
+	@_timed
 	def addFindClass(self,className,period,use,colour):
 		"""Add new Class
 		
@@ -501,9 +1040,11 @@ class DbFieldsFinds(object):
 		sql = "Insert Into s1783947.FF_CLASS_NEW (TYPE,NAME,PERIOD,USE,COLOUR) Values (:Type,:Name,:Period,:Use,:Colour)"
 		cursor.execute(sql,Type=newId,Name=className,Period=period,Use=use,Colour=colour)
 		self._conn.commit()
+		self._snapshotIndexChanged()
 		
 		return className + ' class added'
 		
+	@_timed
 	def addCrop(self,cropName,start,end,imgPath):
 		"""Add new Crop
 		
@@ -535,9 +1076,11 @@ class DbFieldsFinds(object):
 		sql = "Insert Into s1783947.FF_CROPS_NEW (CROP,NAME,START_OF_SEASON,END_OF_SEASON,IMAGE_PATH) Values (:Crop,:Name,TO_DATE(:StartDate,'yyyy-mm-dd'),TO_DATE(:EndDate,'yyyy-mm-dd'),:ImgPath)"
 		cursor.execute(sql,Crop=newId,Name=cropName,StartDate=start,EndDate=end,ImgPath=imgPath)
 		self._conn.commit()
+		self._snapshotIndexChanged()
 		
 		return cropName + ' crop added'
 		
+	@_timed
 	def addOwner(self,ownerName,imgPath):
 		"""Add new owner
 		
@@ -562,5 +1105,145 @@ class DbFieldsFinds(object):
 		sql = "Insert Into s1783947.FF_FARMERS (FARMER_NAME,IMAGE_PATH) Values (:Name,:ImgPath)"
 		cursor.execute(sql,Name=ownerName,ImgPath=imgPath)
 		self._conn.commit()
+		self._snapshotIndexChanged()
 		
 		return ownerName + ' added'
+	
+	@_timed
+	def writeSnapshot(self,snapshotDir,areaId):
+		"""Write the snapshot file for one area
+		
+		Keyword arguments:
+		snapshotDir -- snapshot folder
+		areaId -- Id of MapArea
+		"""
+		
+		assert self._conn != None #Check connection open
+		cursor = self._conn.cursor()
+		cursor.execute("Select AREA_ID, AREA_NAME, MAX_X, MAX_Y, IMAGE_PATH from s1783947.FF_AREA where AREA_ID=:AreaId",AreaId=areaId)
+		areaRow = cursor.fetchone()
+		if areaRow == None:
+			raise Exception("Cannot Find Requested Map Area")
+		writeAreaSnapshot(
+						snapshotDir,
+						areaRow,
+						self._selectFields("AREA_ID=:AreaId",AreaId=areaId),
+						self._selectFinds("AREA_ID=:AreaId",AreaId=areaId),
+						self.getFieldIdList(areaId),
+						self.getFindIdList(areaId),
+						self.getAreaVersion(areaId))
+	
+	@_timed
+	def writeSnapshotIndex(self,snapshotDir):
+		"""Write the snapshot index of areas and drop down lists
+		
+		Keyword arguments:
+		snapshotDir -- snapshot folder
+		"""
+		
+		assert self._conn != None #Check connection open
+		cursor = self._conn.cursor()
+		cursor.execute("Select AREA_ID, AREA_NAME from s1783947.FF_AREA")
+		writeSnapshotIndex(snapshotDir,cursor.fetchall(),self.getCropList(),self.getClassList(),self.getOwnerList())
+	
+	def rebuildSnapshots(self,snapshotDir):
+		"""Write the snapshot files for all areas and the index, returns number of areas
+		
+		Keyword arguments:
+		snapshotDir -- snapshot folder
+		"""
+		
+		assert self._conn != None #Check connection open
+		cursor = self._conn.cursor()
+		cursor.execute("Select AREA_ID from s1783947.FF_AREA")
+		areaIds = [row[0] for row in cursor.fetchall()]
+		for areaId in areaIds:
+			self.writeSnapshot(snapshotDir,areaId)
+		self.writeSnapshotIndex(snapshotDir)
+		return len(areaIds)
+	
+	def _snapshotAreas(self,sql,id):
+		"""Private method returning the area ids a delete will change when snapshots are written"""
+		
+		if self._snapshotDir == None:
+			return []
+		cursor = self._conn.cursor()
+		cursor.execute(sql,Id=id)
+		return [row[0] for row in cursor.fetchall()]
+	
+	def _snapshotChanged(self,areaId):
+		"""Private method rewriting the area snapshot after a write"""
+		
+		if self._snapshotDir != None:
+			self.writeSnapshot(self._snapshotDir,areaId)
+	
+	def _snapshotIndexChanged(self):
+		"""Private method rewriting the snapshot index after an area or list change"""
+		
+		if self._snapshotDir != None:
+			self.writeSnapshotIndex(self._snapshotDir)
+	
+	def _snapshotRemoved(self,areaId):
+		"""Private method removing a deleted area snapshot"""
+		
+		if self._snapshotDir == None:
+			return
+		#Index first so readers never look up the removed file
+		self._snapshotIndexChanged()
+		path = snapshotPath(self._snapshotDir,areaId)
+		if os.path.exists(path):
+			os.remove(path)
+	
+	def refreshMaterialized(self):
+		"""Rebuild the denormalized tables from the combined views, returns dictionary of row counts"""
+		
+		assert self._conn != None #Check connection open
+		cursor = self._conn.cursor()
+		counts = {}
+		for kind,(table,view,idColumn,columns) in sorted(_MATERIALIZED.items()):
+			cursor.execute("Delete from " + table)
+			cursor.execute("Insert Into " + table + " (" + columns + ") Select " + columns + " from " + view)
+			counts[kind] = cursor.rowcount
+		self._conn.commit()
+		return counts
+	
+	def checkMaterialized(self):
+		"""Compare the denormalized tables with the combined views
+		
+		Returns a dictionary with field and find entries each holding lists of the ids missing
+		from the table, extra in the table and with different values. All lists are empty when
+		the tables are consistent.
+		"""
+		
+		assert self._conn != None #Check connection open
+		cursor = self._conn.cursor()
+		report = {}
+		for kind,(table,view,idColumn,columns) in sorted(_MATERIALIZED.items()):
+			cursor.execute("Select " + columns + " from " + view)
+			expected = dict([(row[0],tuple(row)) for row in cursor.fetchall()])
+			cursor.execute("Select " + columns + " from " + table)
+			actual = dict([(row[0],tuple(row)) for row in cursor.fetchall()])
+			report[kind] = {
+					'missing':sorted([id for id in expected if id not in actual]),
+					'extra':sorted([id for id in actual if id not in expected]),
+					'different':sorted([id for id in expected if id in actual and expected[id] != actual[id]])
+					}
+		return report
+	
+	def _source(self,kind):
+		"""Private method returning the table or view fields or finds are read from"""
+		
+		table,view,idColumn,columns = _MATERIALIZED[kind]
+		return table if self._materialized else view
+	
+	def _dematerializeRow(self,cursor,kind,id):
+		"""Private method removing a deleted row from its denormalized table"""
+		
+		if self._materialized:
+			table,view,idColumn,columns = _MATERIALIZED[kind]
+			cursor.execute("Delete from " + table + " where " + idColumn + "=:Id",Id=id)
+	
+	@property
+	def lastInsertId(self):
+		"""Id of the last field or find added on this connection"""
+		return self._lastInsertId
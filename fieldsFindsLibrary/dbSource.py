@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+from .database import DbFieldsFinds
+from .sqliteDatabase import DbFieldsFindsSqlite
+from .snapshotDatabase import DbFieldsFindsSnapshot
+__all__ = ['dbFromSource']
+
+def dbFromSource(source):
+	"""Return a new unopened database for a source string
+
+	Source strings are picklable so worker processes can each open their own connection.
+
+	Keyword arguments:
+	source -- oracle, sqlite:<database file> or snapshot:<snapshot folder>
+	"""
+
+	if source == 'oracle':
+		return DbFieldsFinds()
+	if source.startswith('sqlite:'):
+		return DbFieldsFindsSqlite(source[len('sqlite:'):])
+	if source.startswith('snapshot:'):
+		return DbFieldsFindsSnapshot(source[len('snapshot:'):])
+	raise Exception('Unknown database source: ' + source)
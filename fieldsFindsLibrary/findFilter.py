@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+import numpy as np
+__all__ = ['FindFilter','paramValues']
+
+class FindFilter(object):
+	"""Composable filter on finds
+
+	Each set attribute adds a predicate and all predicates must match. The filter compiles to
+	a where clause with bind values for VIEW_FINDS_COMB so the database does the filtering,
+	and to a numpy mask for the snapshot files.
+	"""
+
+	#Query string parameters read by fromParams
+	PARAMS = ['FilterClass','FilterPeriod','FilterUse','FilterColour','DepthMin','DepthMax','BBox','FieldId']
+
+	def __init__(self,classes=None,period=None,use=None,colour=None,depthMin=None,depthMax=None,bbox=None,fieldId=None):
+		"""Initialise object
+
+		Keyword arguments:
+		classes -- list of class names, any may match (default None)
+		period -- class period (default None)
+		use -- class use (default None)
+		colour -- class colour e.g. #ff0000 (default None)
+		depthMin -- minimum depth inclusive (default None)
+		depthMax -- maximum depth inclusive (default None)
+		bbox -- (minX,minY,maxX,maxY) inclusive (default None)
+		fieldId -- only finds within this field (default None)
+		"""
+
+		self._classes = list(classes) if classes != None else None
+		self._period = period
+		self._use = use
+		self._colour = colour
+		self._depthMin = _number('DepthMin',depthMin)
+		self._depthMax = _number('DepthMax',depthMax)
+		self._bbox = None
+		if bbox != None:
+			if len(bbox) != 4:
+				raise Exception('BBox must be minX,minY,maxX,maxY')
+			self._bbox = tuple([_number('BBox',value) for value in bbox])
+		self._fieldId = int(_number('FieldId',fieldId)) if fieldId != None else None
+
+	@classmethod
+	def fromParams(cls,params):
+		"""Create filter from website parameters, None if no filter parameters are set
+
+		FilterClass is an exact class name and is repeated for more than one class, e.g.
+		FilterClass=COIN&FilterClass=SHERD, as class names may contain commas. BBox is
+		minX,minY,maxX,maxY.
+
+		Keyword arguments:
+		params -- a dictonary of parameters submitted from browser
+		"""
+
+		values = {}
+		for key in cls.PARAMS:
+			found = paramValues(params,key)
+			if len(found) > 0:
+				#Only the class is a list, other repeated parameters take the last value
+				values[key] = found if key == 'FilterClass' else found[-1]
+		if len(values) == 0:
+			return None
+		return cls(
+				values.get('FilterClass'),
+				values.get('FilterPeriod'),
+				values.get('FilterUse'),
+				values.get('FilterColour'),
+				values.get('DepthMin'),
+				values.get('DepthMax'),
+				values['BBox'].split(',') if 'BBox' in values else None,
+				values.get('FieldId'))
+
+	def where(self):
+		"""Return the where clause predicates and bind dictionary, empty clause if no predicates
+
+		Predicates use the VIEW_FINDS_COMB column names and the field filter refers to the
+		finds view by the alias FC.
+		"""
+
+		predicates = []
+		binds = {}
+		if self._classes != None:
+			names = []
+			for i,className in enumerate(self._classes):
+				names.append(':Class' + str(i))
+				binds['Class' + str(i)] = className
+			predicates.append('TYPE in (' + ','.join(names) + ')')
+		if self._period != None:
+			predicates.append('PERIOD=:Period')
+			binds['Period'] = self._period
+		if self._use != None:
+			predicates.append('USE=:Use')
+			binds['Use'] = self._use
+		if self._colour != None:
+			predicates.append('COLOUR=:Colour')
+			binds['Colour'] = self._colour
+		if self._depthMin != None:
+			predicates.append('DEPTH>=:DepthMin')
+			binds['DepthMin'] = self._depthMin
+		if self._depthMax != None:
+			predicates.append('DEPTH<=:DepthMax')
+			binds['DepthMax'] = self._depthMax
+		if self._bbox != None:
+			predicates.append('X between :MinX and :MaxX and Y between :MinY and :MaxY')
+			binds['MinX'],binds['MinY'],binds['MaxX'],binds['MaxY'] = self._bbox
+		if self._fieldId != None:
+			predicates.append('exists (Select 1 from s1783947.VIEW_FIELDS_COMB FL where FL.FIELD_ID=:FieldId and FL.AREA_ID=FC.AREA_ID and FC.X between FL.LOW_X and FL.HI_X and FC.Y between FL.LOW_Y and FL.HI_Y)')
+			binds['FieldId'] = self._fieldId
+		return ' and '.join(predicates),binds
+
+	def mask(self,snapshot):
+		"""Return numpy boolean mask of the snapshot finds matching the filter
+
+		Keyword arguments:
+		snapshot -- AreaSnapshot
+		"""
+
+		x = snapshot.column('find.x')
+		y = snapshot.column('find.y')
+		depth = snapshot.column('find.depth')
+		mask = np.ones(len(x),dtype=bool)
+		if self._classes != None:
+			mask &= snapshot.stringMask('find.type',self._classes)
+		if self._period != None:
+			mask &= snapshot.stringMask('find.period',[self._period])
+		if self._use != None:
+			mask &= snapshot.stringMask('find.use',[self._use])
+		if self._colour != None:
+			mask &= snapshot.stringMask('find.colour',[self._colour])
+		if self._depthMin != None:
+			mask &= depth >= self._depthMin
+		if self._depthMax != None:
+			mask &= depth <= self._depthMax
+		if self._bbox != None:
+			minX,minY,maxX,maxY = self._bbox
+			mask &= (x >= minX) & (x <= maxX) & (y >= minY) & (y <= maxY)
+		if self._fieldId != None:
+			fieldIds = snapshot.column('field.fieldId')
+			match = np.nonzero(fieldIds == self._fieldId)[0]
+			if len(match) == 0:
+				mask[:] = False
+			else:
+				i = match[0]
+				mask &= (x >= snapshot.column('field.lowX')[i]) & (x <= snapshot.column('field.hiX')[i])
+				mask &= (y >= snapshot.column('field.lowY')[i]) & (y <= snapshot.column('field.hiY')[i])
+		return mask
+
+	def description(self):
+		"""Return text describing the filter for the status message"""
+
+		parts = []
+		if self._classes != None:
+			parts.append('Class = ' + ', '.join(self._classes))
+		if self._period != None:
+			parts.append('Period = ' + self._period)
+		if self._use != None:
+			parts.append('Use = ' + self._use)
+		if self._colour != None:
+			parts.append('Colour = ' + self._colour)
+		if self._depthMin != None:
+			parts.append('Depth >= ' + _format(self._depthMin))
+		if self._depthMax != None:
+			parts.append('Depth <= ' + _format(self._depthMax))
+		if self._bbox != None:
+			parts.append('Box = ' + ','.join([_format(value) for value in self._bbox]))
+		if self._fieldId != None:
+			parts.append('Field = ' + str(self._fieldId))
+		return ', '.join(parts)
+
+	def key(self):
+		"""Return a string uniquely identifying the filter, e.g. for cache keys"""
+
+		return repr((self._classes,self._period,self._use,self._colour,self._depthMin,self._depthMax,self._bbox,self._fieldId))
+
+	@property
+	def classes(self):
+		return self._classes
+
+
+def paramValues(params,key):
+	"""Return the non blank values of a parameter as a list, a value for each time it is repeated
+
+	Repeated parameters are a list of items in cgi.FieldStorage and paramsFromQuery.
+
+	Keyword arguments:
+	params -- a dictonary of parameters submitted from browser
+	key -- parameter name
+	"""
+
+	if key not in params:
+		return []
+	items = params[key] if isinstance(params[key],list) else [params[key]]
+	return [item.value for item in items if item.value != '']
+
+def _number(name,value):
+	"""Private function converting a parameter to float, None stays None"""
+
+	if value == None:
+		return None
+	try:
+		return float(value)
+	except (TypeError,ValueError):
+		raise Exception(name + ' must be a number')
+
+def _format(value):
+	"""Private function formatting whole numbers without the decimal point"""
+
+	return str(int(value)) if value == int(value) else str(value)
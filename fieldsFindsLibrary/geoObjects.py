@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
+import base64
+import math
 import numpy as np
-from .htmlHelper import genHTMLElement, genTextElement, genTableElements, genImageElements
+from .htmlHelper import genHTMLElement, genTextElement, genTableElements, genImageElements, resolveImage
+from .raster import rasterSize
 from datetime import datetime
 __all__ = ['Field','Find','MapArea']
 
+#Largest side allowed for a normal map area and for a large-area mode map
+MAX_AREA_SIZE = 50
+MAX_LARGE_AREA_SIZE = 100000
+
 class Field(object):
 	"""The Field object
 	
@@ -34,12 +41,14 @@ class Field(object):
 		self._htmlId = 'Field' + self._fieldId
 		self._prettyId = 'Field ' + self._fieldId
 		
-	def renderGeo(self,style,maxY):
+	def renderGeo(self,style,maxY,scale=1,showLabel=True):
 		"""Return the geographic svg elements
 		
 		Keyword arguments:
 		style -- The css style
 		maxY -- The maximum value of Y for the area map
+		scale -- symbol scale factor, 1 for normal areas (default 1)
+		showLabel -- render the field number (default True)
 		
 		"""
 		
@@ -49,25 +58,33 @@ class Field(object):
 		#Build rectangle element
 		rectElement = genHTMLElement('rect',
 									['class','id','x','y','width','height','fill','fill-opacity','stroke','stroke-width'],
-									[style,self._htmlId,self._lowX,maxY-self._hiY,self._hiX-self._lowX,self._hiY-self._lowY,'lightgreen',0.5,'black',0.02],
+									[style,self._htmlId,self._lowX,maxY-self._hiY,self._hiX-self._lowX,self._hiY-self._lowY,'lightgreen',0.5,'black',0.02*scale],
 									titleElement)
+		
+		if not showLabel:
+			return rectElement
 										
 		#Smaller font size needed if field is only 1 width or high
-		fontSize = '1.7px'
-		yAdjust = 0.65
-		if (self._hiX-self._lowX)<1.1 or (self._hiY-self._lowY)<1.1:
-			fontSize = '0.7px'
-			yAdjust = 0.25
+		fontSize = str(round(1.7*scale,3)) + 'px'
+		yAdjust = 0.65*scale
+		if (self._hiX-self._lowX)<1.1*scale or (self._hiY-self._lowY)<1.1*scale:
+			fontSize = str(round(0.7*scale,3)) + 'px'
+			yAdjust = 0.25*scale
 
 		#Generate the field number to be displayed 
 		fieldNumber = genHTMLElement('text',
-									['x','y','font-size','font-family','font-color','font-weight','fill-opacity','text-anchor'],
-									[self._lowX+(self._hiX-self._lowX)/2,maxY-self._hiY+(self._hiY-self._lowY)/2+yAdjust,fontSize,'Arial','white','bold',0.5,'middle'],
+									['id','x','y','font-size','font-family','font-color','font-weight','fill-opacity','text-anchor'],
+									[self._htmlId + 'Label',self._lowX+(self._hiX-self._lowX)/2,maxY-self._hiY+(self._hiY-self._lowY)/2+yAdjust,fontSize,'Arial','white','bold',0.5,'middle'],
 									self._fieldId)
 		
 		#return combined field number and rectangle
 		return fieldNumber + rectElement
 	
+	def packValues(self):
+		"""Return (fieldId,lowX,hiX,lowY,hiY,crop) for the packed client data"""
+		
+		return (int(self._fieldId),self._lowX,self._hiX,self._lowY,self._hiY,self._crop)
+	
 	def renderInfo(self):
 		"""Return the information svg elements"""
 		
@@ -100,8 +117,8 @@ class Field(object):
 		#SVG group of all Elements
 		combineAll = bgElement + textElement + imageElements +strokeElements + visElement
 		groupElement = genHTMLElement('svg',
-										['width','height','viewbox','visibility'],
-										['100%','100%',viewBox,'hidden'],
+										['id','width','height','viewbox','visibility'],
+										[self._htmlId + 'Info','100%','100%',viewBox,'hidden'],
 										combineAll)
 		
 		#Return all elements grouped
@@ -171,12 +188,14 @@ class Find(object):
 		self._htmlId = 'Find' + self._findId
 		self._prettyId = 'Find ' + self._findId
 		
-	def renderGeo(self,style,maxY):
+	def renderGeo(self,style,maxY,scale=1,showLabel=True):
 		"""Return the geographic svg elements
 		
 		Keyword arguments:
 		style -- The css style
 		maxY -- The maximum value of Y for the area map
+		scale -- symbol scale factor, 1 for normal areas (default 1)
+		showLabel -- render the find number (default True)
 		
 		"""
 		
@@ -185,25 +204,33 @@ class Find(object):
 		
 		#Adjust radius and font for larger fields
 		radius = 0.25
-		fontSize = '0.4px'
+		fontSize = 0.4
 		if maxY > 35:
 			radius = 0.5
-			fontSize = '0.6px'
+			fontSize = 0.6
 		
 		#Generate circle element
 		circleElement = genHTMLElement('circle',
 										['class','id','cx','cy','r','fill','stroke','stroke-width'],
-										[style,self._htmlId,self._x,maxY-self._y,radius,self._colour,'black','0.02'],
+										[style,self._htmlId,self._x,maxY-self._y,radius*scale,self._colour,'black',str(0.02*scale)],
 										titleElement)
+		
+		if not showLabel:
+			return circleElement
 										
 		#Generate number element
 		circleNumber = genHTMLElement('text',
-										['x','y','font-size','font-family','font-weight','text-anchor','alignment-baseline'],
-										[self._x + 0.18,maxY-self._y-0.18,fontSize,'Arial','normal','start','bottom'],
+										['id','x','y','font-size','font-family','font-weight','text-anchor','alignment-baseline'],
+										[self._htmlId + 'Label',self._x + 0.18*scale,maxY-self._y-0.18*scale,str(round(fontSize*scale,3)) + 'px','Arial','normal','start','bottom'],
 										self._findId)
 							
 		#Return combined elements
 		return circleNumber + circleElement
+	
+	def packValues(self):
+		"""Return (findId,x,y,depth,type,colour) for the packed client data"""
+		
+		return (int(self._findId),self._x,self._y,self._depth,self._type,self._colour)
 		
 	def renderInfo(self):
 		"""Return the information svg elements"""
@@ -233,7 +260,7 @@ class Find(object):
 										
 		#SVG group of all Elements
 		combineAll = bgElement + textElement + imageElement +strokeElements + visElement
-		groupElement = genHTMLElement('svg',['width','height','viewbox','visibility'],['100%','100%',viewBox,'hidden'],combineAll)
+		groupElement = genHTMLElement('svg',['id','width','height','viewbox','visibility'],[self._htmlId + 'Info','100%','100%',viewBox,'hidden'],combineAll)
 		
 		return groupElement
 
@@ -292,16 +319,28 @@ class MapArea(object):
 		self._maxX = int(maxX)
 		self._maxY = int(maxY)
 		self._imgPath = str(imgPath)
-		self._xInterval = max(int(np.ceil(float(self._maxX)/8)),1)
-		self._yInterval = max(int(np.ceil(float(self._maxY)/8)),1)
 		self._htmlId = 'MapArea'
 		self._fieldList = []
 		self._findList = []
 		self._fieldStyle = ''
 		self._findStyle = ''
+		self._highlightPoints = []
+		self._highlightShape = None
+		
+		#Large areas scale axes, margins and symbols with the area size
+		self._largeArea = max(self._maxX,self._maxY) > MAX_AREA_SIZE
+		if self._largeArea:
+			self._scale = max(self._maxX,self._maxY) / float(MAX_AREA_SIZE)
+			self._xInterval = _niceInterval(self._maxX,8)
+			self._yInterval = _niceInterval(self._maxY,8)
+		else:
+			self._scale = 1
+			self._xInterval = max(int(np.ceil(float(self._maxX)/8)),1)
+			self._yInterval = max(int(np.ceil(float(self._maxY)/8)),1)
+		self._margin = self._scale
 		
 		#Define view boxes
-		self._viewBoxMapOuter = '0 0 ' + str(self._maxX + 2) + ' ' + str(self._maxY + 2)
+		self._viewBoxMapOuter = '0 0 ' + str(self._maxX + 2*self._margin) + ' ' + str(self._maxY + 2*self._margin)
 		self._viewBoxMapInner = '0 0 ' + str(self._maxX) + ' ' + str(self._maxY)
 		self._viewBoxInfo = '0 0 300 500'
 	
@@ -326,20 +365,38 @@ class MapArea(object):
 		self._findList = objList
 		self._findStyle = style
 	
-	def renderMap(self,width,height):
+	def setHighlight(self,points,shape=None):
+		"""Ring points on the map above the finds, e.g. the results of a spatial query
+		
+		Keyword arguments:
+		points -- list of x,y
+		shape -- ('circle',x,y,radius), ('rect',lowX,lowY,hiX,hiY) or ('point',x,y) outline of the query (default None)
+		"""
+		
+		self._highlightPoints = [(float(x),float(y)) for x,y in points]
+		self._highlightShape = shape
+	
+	def renderMap(self,width,height,rasterHref=None):
 		"""Renders the svg map and returns the svg element for display
 		
 		Keyword arguments:
 		width -- the svg width - can be percent or absolute
 		height -- the svg height - can be percent or absolute
+		rasterHref -- link to a png of the fields and finds drawn under the attached objects (default None)
 		"""
 		
 		#Render all and combine
 		viewBox = self._viewBoxMapOuter
 		background = self._renderBackground()
-		fields = self._renderObjects(self._fieldList,self._fieldStyle)
-		finds = self._renderObjects(self._findList,self._findStyle)
+		if rasterHref != None:
+			image = genHTMLElement('image',['id','href','width','height','x','y','preserveAspectRatio'],['MapRaster',rasterHref,'100%','100%',0,0,'none'])
+			background = background + self._renderLayer('RasterLayer',image)
+		fields = self._renderObjects(self._fieldList,self._fieldStyle,'FieldLayer',True)
+		#Find numbers are unreadable at large area scales so only the popup title is kept
+		finds = self._renderObjects(self._findList,self._findStyle,'FindLayer',not self._largeArea)
 		combined = background + fields + finds
+		if self._highlighted():
+			combined = combined + self._renderLayer('HighlightLayer',self._renderHighlight())
 		svgRoot = genHTMLElement('svg',
 								['width','height','viewBox'],
 								[width,height,viewBox],
@@ -348,6 +405,28 @@ class MapArea(object):
 		#Return the root svg element for display
 		return svgRoot
 	
+	def renderThumbnail(self,width,height,maxFinds=500):
+		"""Renders a simplified standalone svg map for overview pages
+		
+		The info layer and labels are left out and finds are thinned to at most maxFinds
+		
+		Keyword arguments:
+		width -- the svg width - can be percent or absolute
+		height -- the svg height - can be percent or absolute
+		maxFinds -- most finds drawn, every nth find is kept above this (default 500)
+		"""
+		
+		step = max(1,int(math.ceil(len(self._findList) / float(maxFinds))))
+		background = self._renderBackground()
+		fields = self._renderObjects(self._fieldList,self._fieldStyle,'FieldLayer',False)
+		finds = self._renderObjects(self._findList[::step],self._findStyle,'FindLayer',False)
+		
+		#Namespace needed as the thumbnail is saved as its own file
+		return genHTMLElement('svg',
+							['xmlns','width','height','viewBox'],
+							['http://www.w3.org/2000/svg',width,height,self._viewBoxMapOuter],
+							background + fields + finds)
+	
 	def renderInfo(self,width,height):
 		"""Renders the svg information and returns the svg element for display
 		
@@ -358,8 +437,8 @@ class MapArea(object):
 		
 		#Render all and combine
 		instructions = self._renderInstructions()
-		fieldInfo = self._renderObjectInfo(self._fieldList)
-		findInfo = self._renderObjectInfo(self._findList)
+		fieldInfo = genHTMLElement('g',['id'],['FieldInfoLayer'],self._renderObjectInfo(self._fieldList))
+		findInfo = genHTMLElement('g',['id'],['FindInfoLayer'],self._renderObjectInfo(self._findList))
 		combined = instructions + fieldInfo + findInfo
 		svgRoot = genHTMLElement('svg',
 								['width','height'],
@@ -369,53 +448,136 @@ class MapArea(object):
 		#Return the root svg element for display
 		return svgRoot
 	
+	def renderFragment(self):
+		"""Renders only the attached fields and finds for patching an already displayed map
+		
+		Returns a dictionary of the geographic and information svg elements that go inside
+		the FieldLayer, FindLayer, FieldInfoLayer and FindInfoLayer elements of the full render
+		"""
+		
+		return {
+				'fieldGeo':self._renderObjectGeo(self._fieldList,self._fieldStyle,True),
+				'findGeo':self._renderObjectGeo(self._findList,self._findStyle,not self._largeArea),
+				'fieldInfo':self._renderObjectInfo(self._fieldList),
+				'findInfo':self._renderObjectInfo(self._findList)
+				}
+	
+	def packArrays(self):
+		"""Returns the attached fields and finds as numpy arrays
+		
+		Returns a dictionary of fieldId, fieldBox (lowX,lowY,hiX,hiY rows) and fieldCrop, of
+		findId, findPoint (x,y rows), findDepth and findClass, and of the crops and classes
+		(name,colour) lists the crop and class arrays index.
+		"""
+		
+		crops = {}
+		classes = {}
+		fields = [obj.packValues() for obj in self._fieldList]
+		finds = [obj.packValues() for obj in self._findList]
+		return {
+				'fieldId':np.array([row[0] for row in fields],dtype='<i8'),
+				'fieldBox':np.array([(row[1],row[3],row[2],row[4]) for row in fields],dtype='<i4').reshape(-1,4),
+				'fieldCrop':np.array([crops.setdefault(row[5],len(crops)) for row in fields],dtype='<u2'),
+				'findId':np.array([row[0] for row in finds],dtype='<i8'),
+				'findPoint':np.array([(row[1],row[2]) for row in finds],dtype='<i4').reshape(-1,2),
+				'findDepth':np.array([row[3] for row in finds],dtype='<f4'),
+				'findClass':np.array([classes.setdefault((row[4],row[5]),len(classes)) for row in finds],dtype='<u2'),
+				'crops':sorted(crops,key=crops.get),
+				'classes':sorted(classes,key=classes.get)
+				}
+	
+	def packData(self):
+		"""Returns the attached fields and finds as packed arrays for drawing in the browser
+		
+		Arrays are little-endian and base64 encoded: field and find ids as uint32, or as float64
+		named by idType when an id is beyond uint32 as float64 holds every NUMBER(10) id exactly,
+		field boxes (lowX,lowY,hiX,hiY) and find points (x,y) as int32, find depths as float32.
+		Crop and class names are sent once and each object holds a uint16 index into them.
+		"""
+		
+		arrays = self.packArrays()
+		ids = np.concatenate([arrays['fieldId'],arrays['findId']])
+		idType = 'uint32' if len(ids) == 0 or (ids.min() >= 0 and ids.max() <= np.iinfo(np.uint32).max) else 'float64'
+		idDtype = '<u4' if idType == 'uint32' else '<f8'
+		return {
+				'areaId':self._areaId,
+				'maxX':self._maxX,
+				'maxY':self._maxY,
+				'scale':self._scale,
+				'largeArea':self._largeArea,
+				'idType':idType,
+				'fields':{
+						'count':len(arrays['fieldId']),
+						'id':_packArray(arrays['fieldId'].astype(idDtype)),
+						'box':_packArray(arrays['fieldBox']),
+						'crop':_packArray(arrays['fieldCrop'])
+						},
+				'finds':{
+						'count':len(arrays['findId']),
+						'id':_packArray(arrays['findId'].astype(idDtype)),
+						'point':_packArray(arrays['findPoint']),
+						'depth':_packArray(arrays['findDepth']),
+						'class':_packArray(arrays['findClass'])
+						},
+				'crops':arrays['crops'],
+				'classes':[list(pair) for pair in arrays['classes']]
+				}
+	
 	def _renderBackground(self):
 		"""Private method for rendering map background"""
 	
 		fontFamily='Arial'
 		viewBox = self._viewBoxMapOuter
+		scale = self._scale
+		margin = self._margin
 		
 		#Scale axes fonts depending on area size
-		fontScale = min(0.75,round(max(self._maxX,self._maxY) / 20 * 0.50,2))
+		if self._largeArea:
+			fontScale = round(0.75*scale,2)
+			xFontBuffer = (1.2+MAX_AREA_SIZE/8*0.1)*scale
+		else:
+			fontScale = min(0.75,round(max(self._maxX,self._maxY) / 20 * 0.50,2))
+			xFontBuffer = 1.2+max(self._maxX,self._maxY)/8*0.1
 		fontSize = str(fontScale)+'px'
-		xFontBuffer = 1.2+max(self._maxX,self._maxY)/8*0.1
 		
 		#Create x Axis
-		xAxis = ''
+		xAxis = []
 		for x in np.arange(0,self._maxX + 1,self._xInterval):
 			xStr = str(x)
-			xAxis = xAxis + genHTMLElement('text',
+			xAxis.append(genHTMLElement('text',
 											['x','y','font-size','font-family','font-weight','text-anchor'],
-											[x + 1,self._maxY + xFontBuffer,fontSize,fontFamily,'normal','middle'],
-											xStr)
+											[x + margin,self._maxY + xFontBuffer,fontSize,fontFamily,'normal','middle'],
+											xStr))
 							
 		#Create y Axis
-		yAxis = ''
+		yAxis = []
 		yRange = np.arange(0,self._maxY + 1,self._yInterval)
 		for y in yRange:
 			yStr = str(y)
-			yAxis = yAxis + genHTMLElement('text',
+			yAxis.append(genHTMLElement('text',
 											['x','y','font-size','font-family','font-weight','text-anchor','alignment-baseline'],
-											[0.9,self._maxY - y + 1,fontSize,fontFamily,'normal','end','middle'],
-											yStr)
+											[0.9*scale,self._maxY - y + margin,fontSize,fontFamily,'normal','end','middle'],
+											yStr))
 		
 		#Create Axis titles
 		xTitle = genHTMLElement('text',
 								['x','y','font-size','font-family','font-weight','text-anchor'],
-								[self._maxX/2 + 1,self._maxY + 1.9,fontSize,fontFamily,'bold','middle'],
+								[self._maxX/2 + margin,self._maxY + 1.9*scale,fontSize,fontFamily,'bold','middle'],
 								'x')
 		
+		#Large areas may have fewer ticks so centre the title instead
+		yTitlePos = yRange[4] if not self._largeArea else self._maxY/2 + margin
 		yTitle = genHTMLElement('text',
 								['x','y','font-size','font-family','font-weight','text-anchor','alignment-baseline'],
-								[0.4,yRange[4],fontSize,fontFamily,'bold','end','middle'],
+								[0.4*scale,yTitlePos,fontSize,fontFamily,'bold','end','middle'],
 								'y')
 		
 		#Generate translated image
 		image = self._renderImage()
-		translateImage = genHTMLElement('g',['transform'],['translate(1,1)'],image)
+		translateImage = genHTMLElement('g',['transform'],[self._translate()],image)
 		
 		#Combine elements
-		combine = translateImage + xAxis + yAxis + xTitle + yTitle
+		combine = translateImage + ''.join(xAxis) + ''.join(yAxis) + xTitle + yTitle
 		
 		#Create SVG collection and return
 		svgElement = genHTMLElement('svg',
@@ -429,9 +591,12 @@ class MapArea(object):
 		"""Private method for rendering map background image"""
 		
 		viewBox = self._viewBoxMapInner
-		imageElement = genHTMLElement('image',['href','width','height','x','y','preserveAspectRatio'],[self._imgPath,'100%','100%',0,0,'none'])
+		#Background images are drawn at the map raster size
+		width,height = rasterSize(self._maxX,self._maxY)
+		imgPath = resolveImage(self._imgPath,width,height,'none')
+		imageElement = genHTMLElement('image',['href','width','height','x','y','preserveAspectRatio'],[imgPath,'100%','100%',0,0,'none'])
 		svgElement = genHTMLElement('svg',['width','height','viewBox'],[str(self._maxX),str(self._maxY),viewBox],imageElement)
-		outline = genHTMLElement('rect',['x','y','width','height','fill','stroke','stroke-width'],[0,0,self._maxX,self._maxY,'none','black',0.04])
+		outline = genHTMLElement('rect',['x','y','width','height','fill','stroke','stroke-width'],[0,0,self._maxX,self._maxY,'none','black',0.04*self._scale])
 		
 		return outline + svgElement
 	
@@ -459,8 +624,10 @@ class MapArea(object):
 		fieldLabel = genTextElement(34,390,'normal','grey','Fields')
 		findLabel = genTextElement(34,420,'normal','grey','Finds (diff colour per class)',False)
 		highlightLabel = genTextElement(34,450,'normal','grey','Current Selection')
+		#Spatial query rings are only explained when the map has them
+		queryLabel = genTextElement(34,480,'normal','grey','Query Results') if self._highlighted() else ''
 		
-		combineLegend = legend + fieldLabel + findLabel + highlightLabel
+		combineLegend = legend + fieldLabel + findLabel + highlightLabel + queryLabel
 		legendText = genHTMLElement('text',
 										['font-size','font-family','font-weight','text-anchor'],
 										['14px',fontFamily,'normal','start'],
@@ -479,8 +646,14 @@ class MapArea(object):
 										['x','y','width','height','fill','fill-opacity'],
 										[10,440,18,10,'yellow',1])
 		
+		queryElement = ''
+		if self._highlighted():
+			queryElement = genHTMLElement('circle',
+											['cx','cy','r','fill','stroke','stroke-width'],
+											[20,475,7,'none','yellow','3'])
+		
 		#combine shapes
-		legendElement = legendText + rectElement + circleElement + highlightElement
+		legendElement = legendText + rectElement + circleElement + highlightElement + queryElement
 									
 		#SVG group of all Elements
 		combineAll = textElement + legendElement
@@ -491,43 +664,88 @@ class MapArea(object):
 		
 		return groupElement
 	
-	def _renderObjects(self,objList,style):
+	def _renderObjects(self,objList,style,layerId,showLabel):
 		"""Private method for rendering fields and finds geographic objects"""
+		
+		#Get obj Elements
+		objElements = self._renderObjectGeo(objList,style,showLabel)
+		return self._renderLayer(layerId,objElements)
+		
+	def _highlighted(self):
+		"""Private method returning True when setHighlight has given points or a query outline"""
+		
+		return len(self._highlightPoints) > 0 or self._highlightShape != None
 	
+	def _renderHighlight(self):
+		"""Private method for rendering the highlight rings and query outline"""
+		
+		#Rings sit just outside the find circles and let the mouse through to the finds
+		radius = (0.5 if self._maxY > 35 else 0.25) * self._scale * 1.8
+		stroke = 0.08*self._scale
+		names = ['fill','stroke','stroke-width','pointer-events']
+		values = ['none','yellow',stroke,'none']
+		elements = []
+		shape = self._highlightShape
+		if shape != None and shape[0] == 'rect':
+			elements.append(genHTMLElement('rect',['x','y','width','height','stroke-dasharray'] + names,
+										[shape[1],self._maxY-shape[4],shape[3]-shape[1],shape[4]-shape[2],str(4*stroke)] + values))
+		elif shape != None:
+			if shape[0] == 'circle':
+				elements.append(genHTMLElement('circle',['cx','cy','r','stroke-dasharray'] + names,
+											[shape[1],self._maxY-shape[2],shape[3],str(4*stroke)] + values))
+			#Query point marked with a cross
+			elements.append(genHTMLElement('path',['d'] + names,
+										['M%s %s l%s %s m0 %s l%s %s' % (shape[1]-radius,self._maxY-shape[2]-radius,2*radius,2*radius,-2*radius,-2*radius,2*radius)] + values))
+		for x,y in self._highlightPoints:
+			elements.append(genHTMLElement('circle',['class','cx','cy','r'] + names,['highlight',x,self._maxY-y,radius] + values))
+		return ''.join(elements)
+	
+	def _renderLayer(self,layerId,content):
+		"""Private method for placing map coordinate elements inside the axes"""
+		
 		#Define ViewBox
 		viewBox = self._viewBoxMapInner
-		
-		#Get obj Elements
-		objElements = ''
-		for obj in objList:
-			objElements = objElements + obj.renderGeo(style,self._maxY)
 	
 		#Create SVG element
 		svgElement = genHTMLElement('svg',
-									['width','height','viewBox'],
-									[str(self._maxX),str(self._maxY),viewBox],
-									objElements)
+									['id','width','height','viewBox'],
+									[layerId,str(self._maxX),str(self._maxY),viewBox],
+									content)
 		
 		#Shift to account for axes 		
 		translateSvg = genHTMLElement('g',
 									['transform'],
-									['translate(1,1)'],
+									[self._translate()],
 									svgElement)
 		
 		return translateSvg
 		
+	def _renderObjectGeo(self,objList,style,showLabel):
+		"""Private method for rendering the geographic elements of a list of objects"""
+		
+		#Joined once as large areas hold 100k+ objects
+		maxY = self._maxY
+		scale = self._scale
+		return ''.join([obj.renderGeo(style,maxY,scale,showLabel) for obj in objList])
+		
 	def _renderObjectInfo(self,objList):
 		"""Private method for rendering fields and finds information"""
 		
-		objElements = ''
-		for obj in objList:
-			objElements = objElements + obj.renderInfo()
-		return objElements
+		return ''.join([obj.renderInfo() for obj in objList])
+	
+	def _translate(self):
+		"""Private method for the transform shifting the map inside the axes margin"""
+		
+		return 'translate(' + str(self._margin) + ',' + str(self._margin) + ')'
 	
 	@property
 	def areaId(self):
 		return self._areaId
 		
+	@property
+	def areaName(self):
+		return self._areaName
+		
 	@property
 	def maxX(self):
 		return self._maxX
@@ -535,4 +753,32 @@ class MapArea(object):
 	@property
 	def maxY(self):
 		return self._maxY
+	
+	@property
+	def largeArea(self):
+		return self._largeArea
+	
+	@property
+	def scale(self):
+		return self._scale
+
+
+def _packArray(array):
+	"""Return a little-endian numpy array as base64 text"""
+	
+	return base64.b64encode(array.tobytes()).decode('ascii')
+
+def _niceInterval(maxVal,ticks):
+	"""Return a 1, 2 or 5 times power of ten axis interval giving roughly the requested ticks
+	
+	Keyword arguments:
+	maxVal -- axis maximum
+	ticks -- target number of intervals
+	"""
+	
+	raw = max(float(maxVal)/ticks,1.0)
+	magnitude = 10 ** int(np.floor(np.log10(raw)))
+	for step in (1,2,5,10):
+		if step*magnitude >= raw:
+			return int(step*magnitude)
 		
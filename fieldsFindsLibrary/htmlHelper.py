@@ -1,6 +1,33 @@
 #!/usr/bin/env python3
 
-__all__ = ['genHTMLElement','genTextElement','genTableElements','genImageElements']
+__all__ = ['genHTMLElement','genTextElement','genTableElements','genImageElements','setImageResolver','resolveImage']
+
+#Function of (href,width,height,fit) returning the link to draw, e.g. ImageCache.resolve
+_imageResolver = None
+
+def setImageResolver(resolver):
+	"""Set the function mapping image links to the link drawn, None to draw links unchanged
+	
+	Keyword arguments:
+	resolver -- function of (href,width,height,fit) returning a link, e.g. ImageCache.resolve
+	"""
+	
+	global _imageResolver
+	_imageResolver = resolver
+	
+def resolveImage(imageHref,width,height,fit):
+	"""Return the link to draw an image at width by height pixels
+	
+	Keyword arguments:
+	imageHref -- http location of image
+	width -- display width in pixels
+	height -- display height in pixels
+	fit -- preserveAspectRatio, none to stretch or meet to fit inside
+	"""
+	
+	if _imageResolver == None or imageHref == '' or imageHref == 'None':
+		return imageHref
+	return _imageResolver(imageHref,width,height,fit)
 
 def genHTMLElement(elementName,paramNames,paramValues,elementValue=""):
 	"""Function to generate a html element of the form <element params=values>text</element>
@@ -16,20 +43,18 @@ def genHTMLElement(elementName,paramNames,paramValues,elementValue=""):
 	#param names and values must be same length
 	assert len(paramNames) == len(paramValues)
 	
-	#Start of element
-	text='<' + elementName
-	
-	#Iterate through list and add params
-	for i in range(0, len(paramNames)):
-		text = text + ' ' + str(paramNames[i]) + '="' + str(paramValues[i]) + '"'
+	#Start of element and params - built as one list join as this is called for every map object
+	parts = ['<',elementName]
+	for name,value in zip(paramNames,paramValues):
+		parts.append(' ' + str(name) + '="' + str(value) + '"')
 		
 	#Add element value if not empty
 	if elementValue=="":
-		text = text + '/>'
+		parts.append('/>')
 	else:
-		text = text + '>' + elementValue + '</' + elementName + '>'
+		parts.append('>' + elementValue + '</' + elementName + '>')
 		
-	return text
+	return ''.join(parts)
 	
 def genTextElement(x,y,fontWeight,fontColour,value,camelCase=True):
 	"""Custom element specifically for information text
@@ -85,6 +110,7 @@ def genImageElements(imageHref,preserveAspectRatio,width,height,x,y):
 	y -- y location within view box
 	"""
 
+	imageHref = resolveImage(imageHref,width,height,preserveAspectRatio)
 	imageLink = genHTMLElement('image',['href','width','height','preserveAspectRatio'],[imageHref,'100%','100%',preserveAspectRatio])
 	imageSVG = genHTMLElement('svg',['width','height','x','y'],[width,height,x,y],imageLink)
 	imageElement = imageSVG
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+try:
+	from PIL import Image
+except ImportError:
+	#Only needed to make derivatives. Without it pages link the original images
+	Image = None
+import hashlib
+import json
+import os
+import re
+import tempfile
+from .metrics import getMetrics
+__all__ = ['ImageCache']
+
+#Derivative names are the source content hash, display size and fit
+_derivativeName = re.compile(r'^[0-9a-f]{40}_\d+x\d+_(none|meet)\.(jpg|png)$')
+
+_contentTypes = {'jpg':'image/jpeg','png':'image/png'}
+
+#Source hashes by path, size and modification time so unchanged images are not read again
+_INDEX = 'index.json'
+
+
+class ImageCache(object):
+	"""Bounded on-disk cache of resized images at their display sizes
+
+	Image links starting with a configured url prefix are read from the matching local folder
+	and resized to the size they are drawn at. Derivatives are named by a hash of the source
+	content so they never change and can be served with long-lived cache headers. Links that
+	are not local, missing images, unreadable images or a missing PIL leave the link unchanged.
+	"""
+
+	def __init__(self,folder,sources,urlPrefix='images.py?Name=',maxBytes=200*1024*1024):
+		"""Initialise object
+
+		Keyword arguments:
+		folder -- cache folder
+		sources -- list of (url prefix, local folder) the images are read from
+		urlPrefix -- link to a derivative is this followed by its name (default images.py?Name=)
+		maxBytes -- derivatives are removed least recently used first above this total (default 200MB)
+		"""
+
+		self._folder = folder
+		self._sources = list(sources)
+		self._urlPrefix = urlPrefix
+		self._maxBytes = maxBytes
+		self._index = None
+		self._indexChanged = False
+		self._links = {}
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+
+	@classmethod
+	def fromEnvironment(cls):
+		"""Create cache from FF_IMAGE_CACHE and FF_IMAGE_SOURCES, None if FF_IMAGE_CACHE is not set
+
+		FF_IMAGE_SOURCES is a ; separated list of prefix=folder, e.g.
+		https://www.geos.ed.ac.uk/~s1783947/ex/=/home/s1783947/public_html/ex
+		and FF_IMAGE_URL replaces the images.py?Name= derivative link prefix.
+		"""
+
+		folder = os.environ.get('FF_IMAGE_CACHE')
+		if folder == None:
+			return None
+		sources = []
+		for item in os.environ.get('FF_IMAGE_SOURCES','').split(';'):
+			if '=' in item:
+				prefix,sourceFolder = item.rsplit('=',1)
+				sources.append((prefix,sourceFolder))
+		return cls(folder,sources,os.environ.get('FF_IMAGE_URL','images.py?Name='))
+
+	def resolve(self,href,width,height,fit='none'):
+		"""Return the link to a derivative of href at width by height, href if there is none
+
+		Used as the htmlHelper image resolver.
+
+		Keyword arguments:
+		href -- original image link
+		width,height -- display size in pixels
+		fit -- none to stretch to the size or meet to fit inside it keeping the aspect ratio (default none)
+		"""
+
+		key = (href,int(width),int(height),fit)
+		getMetrics().recordCache('image',key in self._links)
+		if key not in self._links:
+			name = self._derivative(href,int(width),int(height),fit)
+			self._links[key] = self._urlPrefix + name if name != None else href
+			self._saveIndex()
+		return self._links[key]
+
+	def read(self,name):
+		"""Return (content type, bytes) of a derivative for serving, None if there is none
+
+		Keyword arguments:
+		name -- derivative name from a resolved link
+		"""
+
+		match = _derivativeName.match(name)
+		if not match:
+			return None
+		path = os.path.join(self._folder,name)
+		try:
+			with open(path,'rb') as imageFile:
+				data = imageFile.read()
+			#Touched so pruning removes the least recently used
+			os.utime(path)
+		except (IOError,OSError):
+			return None
+		return _contentTypes[match.group(2)],data
+
+	def _derivative(self,href,width,height,fit):
+		"""Private method returning the derivative name, making it if needed, None on failure"""
+
+		path = self._localPath(href)
+		if Image == None or path == None or width <= 0 or height <= 0:
+			return None
+		try:
+			digest = self._hash(path)
+			for extension in ['jpg','png']:
+				name = '%s_%dx%d_%s.%s' % (digest,width,height,fit,extension)
+				if os.path.exists(os.path.join(self._folder,name)):
+					return name
+			return self._resize(path,digest,width,height,fit)
+		except (IOError,OSError,ValueError):
+			return None
+
+	def _resize(self,path,digest,width,height,fit):
+		"""Private method writing a resized copy of the source image"""
+
+		image = Image.open(path)
+		image.load()
+		if fit == 'meet':
+			image.thumbnail((width,height),Image.LANCZOS)
+		else:
+			image = image.resize((width,height),Image.LANCZOS)
+
+		#Transparent images stay png, others are smaller as jpeg
+		if image.mode in ('RGBA','LA') or (image.mode == 'P' and 'transparency' in image.info):
+			extension = 'png'
+			image = image.convert('RGBA')
+		else:
+			extension = 'jpg'
+			image = image.convert('RGB')
+		name = '%s_%dx%d_%s.%s' % (digest,width,height,fit,extension)
+
+		handle,tmpPath = tempfile.mkstemp(dir=self._folder,prefix='.tmp_')
+		try:
+			with os.fdopen(handle,'wb') as outFile:
+				if extension == 'jpg':
+					image.save(outFile,'JPEG',quality=85,optimize=True)
+				else:
+					image.save(outFile,'PNG',optimize=True)
+			os.chmod(tmpPath,0o644)
+			os.replace(tmpPath,os.path.join(self._folder,name))
+		except:
+			os.remove(tmpPath)
+			raise
+		self._prune()
+		return name
+
+	def _localPath(self,href):
+		"""Private method returning the local file of an image link, None if not local"""
+
+		for prefix,sourceFolder in self._sources:
+			if href.startswith(prefix):
+				relative = href[len(prefix):].split('?')[0]
+				path = os.path.realpath(os.path.join(sourceFolder,relative))
+				#Links must not reach outside the source folder
+				if path.startswith(os.path.realpath(sourceFolder) + os.sep) and os.path.isfile(path):
+					return path
+		return None
+
+	def _hash(self,path):
+		"""Private method returning the sha1 of a source file, read only when it has changed"""
+
+		if self._index == None:
+			try:
+				with open(os.path.join(self._folder,_INDEX),'r') as indexFile:
+					self._index = json.load(indexFile)
+			except (IOError,OSError,ValueError):
+				self._index = {}
+		stat = os.stat(path)
+		entry = self._index.get(path)
+		if entry != None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+			return entry[2]
+		sha = hashlib.sha1()
+		with open(path,'rb') as sourceFile:
+			for block in iter(lambda: sourceFile.read(1024*1024),b''):
+				sha.update(block)
+		self._index[path] = [stat.st_size,stat.st_mtime_ns,sha.hexdigest()]
+		self._indexChanged = True
+		return sha.hexdigest()
+
+	def _saveIndex(self):
+		"""Private method writing the source hashes when changed
+
+		A folder that cannot be written leaves the index changed to be written by a later resolve.
+		"""
+
+		if not self._indexChanged:
+			return
+		try:
+			handle,tmpPath = tempfile.mkstemp(dir=self._folder,prefix='.tmp_')
+		except (IOError,OSError):
+			return
+		try:
+			with os.fdopen(handle,'w') as outFile:
+				json.dump(self._index,outFile)
+			os.replace(tmpPath,os.path.join(self._folder,_INDEX))
+		except (IOError,OSError):
+			try:
+				os.remove(tmpPath)
+			except OSError:
+				pass
+			return
+		self._indexChanged = False
+
+	def _prune(self):
+		"""Private method removing the least recently used derivatives above maxBytes"""
+
+		entries = []
+		total = 0
+		for fileName in os.listdir(self._folder):
+			if _derivativeName.match(fileName):
+				try:
+					stat = os.stat(os.path.join(self._folder,fileName))
+				except OSError:
+					continue
+				entries.append((stat.st_mtime,stat.st_size,fileName))
+				total += stat.st_size
+		entries.sort()
+		for mtime,size,fileName in entries:
+			if total <= self._maxBytes:
+				break
+			try:
+				os.remove(os.path.join(self._folder,fileName))
+			except OSError:
+				pass
+			total -= size
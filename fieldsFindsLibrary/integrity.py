@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+import bisect
+import time
+import numpy as np
+__all__ = ['scanArea','scanDatabase','overlappingFields','duplicateFinds']
+
+
+def overlappingFields(ids,boxes):
+	"""Return sorted list of (id, id) of every pair of fields whose interiors overlap
+
+	A sweep line moves along x keeping the fields it crosses sorted by low y. A new field is only
+	compared with those whose low y is within the tallest field height below its high y, so the
+	scan is O(n log n) plus the overlaps found for fields of similar sizes. Fields sharing an
+	edge do not overlap. Fields without width or height are left out, see scanArea.
+
+	Keyword arguments:
+	ids -- field ids
+	boxes -- (n,4) array of lowX,lowY,hiX,hiY
+	"""
+
+	ids = np.asarray(ids,dtype=np.int64)
+	boxes = np.asarray(boxes,dtype=np.float64).reshape(-1,4)
+	valid = np.nonzero((boxes[:,2] > boxes[:,0]) & (boxes[:,3] > boxes[:,1]))[0]
+	if len(valid) < 2:
+		return []
+	boxes = boxes[valid]
+	lowY = boxes[:,1].tolist()
+	hiY = boxes[:,3].tolist()
+	tallest = float((boxes[:,3] - boxes[:,1]).max())
+
+	#Field ends sort before starts at the same x so touching fields are never both active
+	count = len(valid)
+	xs = np.concatenate([boxes[:,2],boxes[:,0]])
+	starts = np.concatenate([np.zeros(count,dtype=bool),np.ones(count,dtype=bool)])
+	order = np.lexsort((starts,xs))
+	fieldOf = np.concatenate([np.arange(count),np.arange(count)])[order].tolist()
+	isStart = starts[order].tolist()
+
+	active = []
+	pairs = []
+	for i,start in zip(fieldOf,isStart):
+		if not start:
+			del active[bisect.bisect_left(active,(lowY[i],i))]
+			continue
+		first = bisect.bisect_right(active,(lowY[i] - tallest,count))
+		last = bisect.bisect_left(active,(hiY[i],-1))
+		for otherLowY,j in active[first:last]:
+			if hiY[j] > lowY[i]:
+				pairs.append((i,j))
+		bisect.insort(active,(lowY[i],i))
+
+	ids = ids[valid].tolist()
+	return sorted([tuple(sorted((ids[i],ids[j]))) for i,j in pairs])
+
+def duplicateFinds(ids,points):
+	"""Return list of (x, y, ids) of the coordinates held by more than one find
+
+	Keyword arguments:
+	ids -- find ids
+	points -- (n,2) array of x,y
+	"""
+
+	ids = np.asarray(ids,dtype=np.int64)
+	points = np.asarray(points).reshape(-1,2)
+	if len(ids) < 2:
+		return []
+	order = np.lexsort((ids,points[:,1],points[:,0]))
+	sortedPoints = points[order]
+	#Runs of equal coordinates start where the coordinate changes
+	change = np.any(sortedPoints[1:] != sortedPoints[:-1],axis=1)
+	runStarts = np.concatenate([[0],np.nonzero(change)[0] + 1])
+	runEnds = np.concatenate([runStarts[1:],[len(order)]])
+	duplicates = []
+	for start,end in zip(runStarts.tolist(),runEnds.tolist()):
+		if end - start > 1:
+			x,y = sortedPoints[start].tolist()
+			duplicates.append((x,y,ids[order[start:end]].tolist()))
+	return duplicates
+
+def scanArea(mapArea,fieldIds,fieldBoxes,findIds,findPoints):
+	"""Return the integrity report of one area as a json ready dictionary
+
+	Reports overlapping field pairs, fields and finds outside the area or without width or
+	height, and finds sharing a coordinate.
+
+	Keyword arguments:
+	mapArea -- MapArea giving the bounds
+	fieldIds -- field ids
+	fieldBoxes -- (n,4) array of lowX,lowY,hiX,hiY
+	findIds -- find ids
+	findPoints -- (n,2) array of x,y
+	"""
+
+	start = time.perf_counter()
+	fieldIds = np.asarray(fieldIds,dtype=np.int64)
+	fieldBoxes = np.asarray(fieldBoxes,dtype=np.float64).reshape(-1,4)
+	findIds = np.asarray(findIds,dtype=np.int64)
+	findPoints = np.asarray(findPoints,dtype=np.float64).reshape(-1,2)
+	maxX = mapArea.maxX
+	maxY = mapArea.maxY
+
+	lowX,lowY,hiX,hiY = fieldBoxes.T
+	fieldProblems = [
+					('empty',(hiX <= lowX) | (hiY <= lowY)),
+					('outside',(lowX < 0) | (lowY < 0) | (hiX > maxX) | (hiY > maxY))
+					]
+	findProblems = [
+					('outside',(findPoints[:,0] < 0) | (findPoints[:,1] < 0) | (findPoints[:,0] > maxX) | (findPoints[:,1] > maxY))
+					]
+
+	report = {
+			'areaId':int(mapArea.areaId),
+			'areaName':mapArea.areaName,
+			'fields':len(fieldIds),
+			'finds':len(findIds),
+			'overlappingFields':[list(pair) for pair in overlappingFields(fieldIds,fieldBoxes)],
+			'fieldBounds':_problems(fieldIds,fieldProblems),
+			'findBounds':_problems(findIds,findProblems),
+			'duplicateFinds':[{'x':_number(x),'y':_number(y),'ids':dupIds} for x,y,dupIds in duplicateFinds(findIds,findPoints)]
+			}
+	report['problems'] = len(report['overlappingFields']) + len(report['fieldBounds']) + len(report['findBounds']) + len(report['duplicateFinds'])
+	report['seconds'] = round(time.perf_counter() - start,3)
+	return report
+
+def scanDatabase(db,areaNames=None):
+	"""Return the integrity report of areas in an open database
+
+	Returns a dictionary with the area reports and the total number of problems.
+
+	Keyword arguments:
+	db -- open DbFieldsFinds, DbFieldsFindsSqlite or DbFieldsFindsSnapshot
+	areaNames -- list of area names, all areas if None (default None)
+	"""
+
+	if areaNames == None:
+		areaNames = db.getMapAreaList()
+	areas = []
+	for areaName in areaNames:
+		mapArea = db.getMapArea(areaName)
+		fieldIds,fieldBoxes = db.getFieldBoxes(mapArea.areaId)
+		findIds,findPoints = db.getFindPoints(mapArea.areaId)
+		areas.append(scanArea(mapArea,fieldIds,fieldBoxes,findIds,findPoints))
+	return {'areas':areas,'problems':sum([area['problems'] for area in areas])}
+
+def _problems(ids,checks):
+	"""Private function returning list of {id, problem} for the rows failing each check"""
+
+	problems = []
+	for name,failed in checks:
+		problems.extend([{'id':objId,'problem':name} for objId in ids[failed].tolist()])
+	return sorted(problems,key=lambda problem: (problem['id'],problem['problem']))
+
+def _number(value):
+	"""Private function returning whole numbers as int for the json report"""
+
+	return int(value) if value == int(value) else value
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+import json
+import os
+import tempfile
+import threading
+try:
+	import fcntl
+except ImportError:
+	#Only on unix, elsewhere flushes from several processes at once can lose counts
+	fcntl = None
+__all__ = ['MetricsRegistry','setMetrics','getMetrics']
+
+#Metric name -> (type, help, label names, histogram bucket upper bounds)
+METRICS = {
+		'ff_page_seconds':('histogram','Page request time by action and format',('action','format'),
+						(0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10)),
+		'ff_page_bytes':('histogram','Rendered response size by format',('format',),
+						(1024,4096,16384,65536,262144,1048576,4194304,16777216)),
+		'ff_page_errors_total':('counter','Requests that failed with an unhandled error by action',('action',),None),
+		'ff_db_statement_seconds':('histogram','Database statement time by DbFieldsFinds method',('method',),
+						(0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1)),
+		'ff_db_rows':('histogram','Rows fetched or changed per statement by DbFieldsFinds method',('method',),
+						(0,1,10,100,1000,10000,100000)),
+		'ff_cache_requests_total':('counter','Cache lookups by cache and hit or miss',('cache','result'),None),
+		'ff_coalesced_total':('counter','Coalesced renders by leader, shared, timeout or failed leader',('result',),None)
+		}
+
+#Label values outside these are recorded as other so user input cannot add series
+_ACTIONS = ['AddArea','AddField','AddFind','AddFindClass','AddCrop','AddOwner','DelFind','DelField','DelArea']
+_FORMATS = ['ids','data','changes','spatial','png','hit','fragment','stats']
+
+
+class MetricsRegistry(object):
+	"""Counters and histograms aggregated over every worker process
+
+	Values are held in memory until flush adds them to a json file shared by the processes
+	under a lock, so short lived CGI processes and long running workers report the same
+	totals. render returns the file totals plus the values not yet flushed in the Prometheus
+	text format. A disabled registry records nothing.
+	"""
+
+	def __init__(self,enabled=True,path=None):
+		"""Initialise object
+
+		Keyword arguments:
+		enabled -- record values (default True)
+		path -- shared metrics file, None to keep values in this process only (default None)
+		"""
+
+		self._enabled = enabled
+		self._path = path
+		self._counters = {}
+		self._histograms = {}
+		self._lock = threading.Lock()
+
+	@classmethod
+	def fromEnvironment(cls):
+		"""Create registry from FF_METRICS_FILE, disabled if not set"""
+
+		path = os.environ.get('FF_METRICS_FILE')
+		return cls(path != None,path)
+
+	def inc(self,name,labels,value=1):
+		"""Add to a counter
+
+		Keyword arguments:
+		name -- counter name from METRICS
+		labels -- dictionary of label name to value
+		value -- amount added (default 1)
+		"""
+
+		if not self._enabled:
+			return
+		key = _key(name,labels,'counter')
+		with self._lock:
+			self._counters[key] = self._counters.get(key,0) + value
+
+	def observe(self,name,value,labels):
+		"""Add a value to a histogram
+
+		Keyword arguments:
+		name -- histogram name from METRICS
+		value -- observed value e.g. seconds or bytes
+		labels -- dictionary of label name to value
+		"""
+
+		if not self._enabled:
+			return
+		key = _key(name,labels,'histogram')
+		buckets = METRICS[name][3]
+		with self._lock:
+			histogram = self._histograms.get(key)
+			if histogram == None:
+				histogram = self._histograms[key] = [[0]*len(buckets),0.0,0]
+			for i,bound in enumerate(buckets):
+				if value <= bound:
+					histogram[0][i] = histogram[0][i] + 1
+					break
+			histogram[1] = histogram[1] + value
+			histogram[2] = histogram[2] + 1
+
+	def recordPage(self,action,pageFormat,seconds,size):
+		"""Record a page request
+
+		Keyword arguments:
+		action -- Action parameter, None for a view
+		pageFormat -- Format parameter, None for the full page
+		seconds -- request time
+		size -- response bytes
+		"""
+
+		pageFormat = _label(pageFormat,_FORMATS,'page')
+		self.observe('ff_page_seconds',seconds,{'action':_label(action,_ACTIONS,'view'),'format':pageFormat})
+		self.observe('ff_page_bytes',size,{'format':pageFormat})
+
+	def recordError(self,action):
+		"""Count a request that failed with an unhandled error
+
+		Keyword arguments:
+		action -- Action parameter, None for a view
+		"""
+
+		self.inc('ff_page_errors_total',{'action':_label(action,_ACTIONS,'view')})
+
+	def recordStatements(self,queryLog):
+		"""Record the time and rows of each statement of a QueryLog by calling method
+
+		Keyword arguments:
+		queryLog -- QueryLog of the request
+		"""
+
+		for stmt in queryLog.statements:
+			self.observe('ff_db_statement_seconds',stmt['seconds'],{'method':stmt['method']})
+			self.observe('ff_db_rows',stmt['rows'],{'method':stmt['method']})
+
+	def recordCache(self,cache,hit):
+		"""Count a cache lookup
+
+		Keyword arguments:
+		cache -- cache name e.g. raster
+		hit -- True if the entry was found
+		"""
+
+		self.inc('ff_cache_requests_total',{'cache':cache,'result':'hit' if hit else 'miss'})
+
+	def flush(self):
+		"""Add the values recorded since the last flush to the shared file
+
+		Values are kept to try again if the file cannot be written.
+		"""
+
+		if not self._enabled or self._path == None:
+			return
+		with self._lock:
+			counters,self._counters = self._counters,{}
+			histograms,self._histograms = self._histograms,{}
+		if len(counters) == 0 and len(histograms) == 0:
+			return
+		try:
+			with _FileLock(self._path + '.lock'):
+				shared = self._read()
+				_merge(shared,counters,histograms)
+				folder = os.path.dirname(os.path.abspath(self._path))
+				handle,tmpPath = tempfile.mkstemp(dir=folder,prefix='.tmp_')
+				with os.fdopen(handle,'w') as outFile:
+					json.dump(_toJson(*shared),outFile)
+				os.replace(tmpPath,self._path)
+		except (IOError,OSError):
+			with self._lock:
+				_merge((self._counters,self._histograms),counters,histograms)
+
+	def values(self):
+		"""Return (counters, histograms) of the shared file plus the values not yet flushed"""
+
+		counters,histograms = self._read() if self._path != None else ({},{})
+		with self._lock:
+			_merge((counters,histograms),self._counters,self._histograms)
+		return counters,histograms
+
+	def render(self):
+		"""Return every metric in the Prometheus text exposition format"""
+
+		counters,histograms = self.values()
+		lines = []
+		for name in sorted(METRICS):
+			kind,helpText,labelNames,buckets = METRICS[name]
+			lines.append('# HELP ' + name + ' ' + helpText)
+			lines.append('# TYPE ' + name + ' ' + kind)
+			if kind == 'counter':
+				for key in sorted([key for key in counters if key[0] == name]):
+					lines.append(name + _labelText(key[1]) + ' ' + _number(counters[key]))
+				continue
+			for key in sorted([key for key in histograms if key[0] == name]):
+				counts,total,count = histograms[key]
+				cumulative = 0
+				for bound,bucketCount in zip(buckets,counts):
+					cumulative = cumulative + bucketCount
+					lines.append(name + '_bucket' + _labelText(key[1] + (('le',_number(bound)),)) + ' ' + str(cumulative))
+				lines.append(name + '_bucket' + _labelText(key[1] + (('le','+Inf'),)) + ' ' + str(count))
+				lines.append(name + '_sum' + _labelText(key[1]) + ' ' + _number(total))
+				lines.append(name + '_count' + _labelText(key[1]) + ' ' + str(count))
+		return '\n'.join(lines) + '\n'
+
+	def _read(self):
+		"""Private method returning (counters, histograms) of the shared file, empty if none"""
+
+		try:
+			with open(self._path,'r') as inFile:
+				data = json.load(inFile)
+		except (IOError,OSError,ValueError):
+			return {},{}
+		counters = dict([((name,_labelKey(labels)),value) for name,labels,value in data['counters']])
+		histograms = dict([((name,_labelKey(labels)),[counts,total,count]) for name,labels,counts,total,count in data['histograms']
+						if name in METRICS and len(counts) == len(METRICS[name][3])])
+		return counters,histograms
+
+	@property
+	def enabled(self):
+		return self._enabled
+
+
+class _FileLock(object):
+	"""Context manager holding an exclusive lock on a lock file"""
+
+	def __init__(self,path):
+		self._path = path
+
+	def __enter__(self):
+		self._file = open(self._path,'a')
+		if fcntl != None:
+			fcntl.flock(self._file,fcntl.LOCK_EX)
+		return self
+
+	def __exit__(self,excType,excValue,traceback):
+		if fcntl != None:
+			fcntl.flock(self._file,fcntl.LOCK_UN)
+		self._file.close()
+		return False
+
+
+def _key(name,labels,kind):
+	"""Private function returning the (name, sorted label items) key of a series"""
+
+	if name not in METRICS or METRICS[name][0] != kind:
+		raise Exception('Unknown ' + kind + ': ' + name)
+	if sorted(labels) != sorted(METRICS[name][2]):
+		raise Exception('Metric ' + name + ' needs labels ' + ', '.join(METRICS[name][2]))
+	return (name,_labelKey(labels.items()))
+
+def _labelKey(labels):
+	"""Private function returning sorted label (name, value) tuples"""
+
+	return tuple(sorted([(str(label),str(value)) for label,value in labels]))
+
+def _label(value,known,default):
+	"""Private function returning default for None, the value if known, otherwise other"""
+
+	if value == None or value == '':
+		return default
+	return value if value in known else 'other'
+
+def _merge(target,counters,histograms):
+	"""Private function adding counters and histograms into the (counters, histograms) target"""
+
+	targetCounters,targetHistograms = target
+	for key,value in counters.items():
+		targetCounters[key] = targetCounters.get(key,0) + value
+	for key,(counts,total,count) in histograms.items():
+		if key not in targetHistograms:
+			targetHistograms[key] = [list(counts),total,count]
+			continue
+		existing = targetHistograms[key]
+		existing[0] = [a + b for a,b in zip(existing[0],counts)]
+		existing[1] = existing[1] + total
+		existing[2] = existing[2] + count
+
+def _toJson(counters,histograms):
+	"""Private function returning the json form of the shared file"""
+
+	return {
+			'counters':[[name,[list(label) for label in labels],value] for (name,labels),value in sorted(counters.items())],
+			'histograms':[[name,[list(label) for label in labels],counts,total,count] for (name,labels),(counts,total,count) in sorted(histograms.items())]
+			}
+
+def _labelText(labels):
+	"""Private function returning the {name="value",...} label text of a series"""
+
+	if len(labels) == 0:
+		return ''
+	escape = lambda value: value.replace('\\','\\\\').replace('"','\\"').replace('\n','\\n')
+	return '{' + ','.join([label + '="' + escape(value) + '"' for label,value in labels]) + '}'
+
+def _number(value):
+	"""Private function formatting a number without a trailing .0"""
+
+	return str(int(value)) if value == int(value) else repr(float(value))
+
+#Registry the caches record to, disabled until setMetrics is called
+_registry = MetricsRegistry(False)
+
+def setMetrics(registry):
+	"""Set the registry cache lookups and other library metrics are recorded to
+
+	Keyword arguments:
+	registry -- MetricsRegistry, None for a disabled registry
+	"""
+
+	global _registry
+	_registry = registry if registry != None else MetricsRegistry(False)
+
+def getMetrics():
+	"""Return the registry set by setMetrics"""
+
+	return _registry
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import os
+import re
+from datetime import date
+__all__ = ['applyMigrations','listMigrations','appliedMigrations']
+
+#Migration scripts, one folder per database dialect
+_migrationDir = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','sql','migrations')
+
+#Migration file names are a three digit version then a name, e.g. 002_area_indexes.sql
+_fileName = re.compile(r'^(\d{3})_(\w+)\.sql$')
+
+#PL/SQL blocks, procedures and triggers contain semicolons so they end at a line holding only /
+_blockStart = re.compile(r'^\s*(BEGIN|DECLARE|CREATE\s+(OR\s+REPLACE\s+)?(TRIGGER|PROCEDURE|FUNCTION))\b',re.IGNORECASE)
+
+_versionTable = 'CREATE TABLE FF_SCHEMA_VERSION (VERSION NUMBER(6) NOT NULL, NAME VARCHAR(200) NOT NULL, APPLIED DATE NOT NULL, PRIMARY KEY (VERSION))'
+
+
+def listMigrations(dialect):
+	"""Return list of (version, name, path) of the migration scripts in version order
+
+	Keyword arguments:
+	dialect -- oracle or sqlite
+	"""
+
+	folder = os.path.join(_migrationDir,dialect)
+	if not os.path.isdir(folder):
+		raise Exception('No migrations for database ' + dialect)
+	migrations = []
+	for fileName in os.listdir(folder):
+		match = _fileName.match(fileName)
+		if match:
+			migrations.append((int(match.group(1)),match.group(2),os.path.join(folder,fileName)))
+	migrations.sort()
+	return migrations
+
+def appliedMigrations(conn):
+	"""Return list of versions already applied, creating the version table if missing
+
+	Keyword arguments:
+	conn -- open connection with the cx_Oracle interface
+	"""
+
+	cursor = conn.cursor()
+	try:
+		cursor.execute('Select VERSION from FF_SCHEMA_VERSION Order By VERSION')
+	except Exception:
+		cursor.execute(_versionTable)
+		conn.commit()
+		return []
+	return [int(row[0]) for row in cursor.fetchall()]
+
+def applyMigrations(conn,dialect,target=None):
+	"""Apply the migrations not yet recorded in FF_SCHEMA_VERSION in version order
+
+	Each migration is committed with its version row. Schema statements commit as they run on
+	Oracle, and run outside a transaction on the SQLite stand-in, so a migration that fails part
+	way leaves its earlier statements applied without a version row. Those must be undone by hand
+	before the fixed migration is rerun, the error names the statement that failed. Returns list
+	of (version, name) applied.
+
+	Keyword arguments:
+	conn -- open connection with the cx_Oracle interface
+	dialect -- oracle or sqlite
+	target -- highest version to apply, all if None (default None)
+	"""
+
+	done = set(appliedMigrations(conn))
+	applied = []
+	for version,name,path in listMigrations(dialect):
+		if version in done or (target != None and version > target):
+			continue
+		with open(path,'r') as sqlFile:
+			statements = _splitStatements(sqlFile.read())
+		cursor = conn.cursor()
+		for i,statement in enumerate(statements):
+			try:
+				cursor.execute(statement)
+			except Exception as e:
+				conn.rollback()
+				message = 'Migration ' + '%03d' % version + ' ' + name + ' failed at statement ' + str(i + 1) + ' of ' + str(len(statements))
+				if i > 0:
+					message = message + ', undo statements 1 to ' + str(i) + ' by hand before rerunning'
+				raise Exception(message + ': ' + str(e))
+		cursor.execute('Insert Into FF_SCHEMA_VERSION (VERSION, NAME, APPLIED) Values (:Version, :Name, :Applied)',
+						Version=version,Name=name,Applied=date.today())
+		conn.commit()
+		applied.append((version,name))
+	return applied
+
+def _splitStatements(script):
+	"""Private function splitting a script into statements without the trailing semicolon"""
+
+	statements = []
+	lines = []
+	block = False
+	for line in script.splitlines():
+		stripped = line.strip()
+		if len(lines) == 0:
+			if stripped == '' or stripped.startswith('--'):
+				continue
+			block = _blockStart.match(line) != None
+		if block:
+			if stripped == '/':
+				statements.append('\n'.join(lines))
+				lines = []
+			else:
+				lines.append(line)
+		else:
+			lines.append(line)
+			if stripped.endswith(';'):
+				statements.append('\n'.join(lines).rstrip()[:-1])
+				lines = []
+	if len(''.join(lines).strip()) > 0:
+		statements.append('\n'.join(lines).rstrip().rstrip(';'))
+	return statements
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+__all__ = ['QueryLog']
+
+class QueryLog(object):
+	"""Records every statement run through an instrumented database connection for one request
+
+	Each statement records the sql text, number of binds, rows fetched or changed, elapsed time
+	and the calling DbFieldsFinds method. Statements slower than the threshold and identical
+	statements repeated within the request are written to the log file as json lines.
+	The summary can be used by tests to assert round trip budgets.
+	"""
+
+	def __init__(self,slowThreshold=0.1,logPath=None,nPlusOneThreshold=5):
+		"""Initialise object
+
+		Keyword arguments:
+		slowThreshold -- seconds above which a statement is logged as slow (default 0.1)
+		logPath -- file slow and repeated statements are appended to, None for no log (default None)
+		nPlusOneThreshold -- runs of the same sql text with different binds flagged as n+1 (default 5)
+		"""
+
+		self._slowThreshold = slowThreshold
+		self._logPath = logPath
+		self._nPlusOneThreshold = nPlusOneThreshold
+		self._statements = []
+		self._commits = 0
+		self._seen = {}
+		self._lock = threading.Lock()
+
+	@classmethod
+	def fromEnvironment(cls):
+		"""Create log from FF_QUERY_LOG (log file path) and FF_SLOW_QUERY_MS, None if not set"""
+
+		logPath = os.environ.get('FF_QUERY_LOG')
+		if logPath == None:
+			return None
+		return cls(float(os.environ.get('FF_SLOW_QUERY_MS','100'))/1000,logPath)
+
+	def wrap(self,conn):
+		"""Return conn wrapped so all its cursors record to this log
+
+		Keyword arguments:
+		conn -- cx_Oracle style connection
+		"""
+
+		return _InstrumentedConnection(conn,self)
+
+	def reset(self):
+		"""Clear all recorded statements, e.g. at the start of a request"""
+
+		self._statements = []
+		self._commits = 0
+		self._seen = {}
+
+	def summary(self):
+		"""Return dictionary summarising the statements of the request"""
+
+		byMethod = {}
+		for stmt in self._statements:
+			method = byMethod.setdefault(stmt['method'],{'statements':0,'rows':0,'seconds':0.0})
+			method['statements'] = method['statements'] + 1
+			method['rows'] = method['rows'] + stmt['rows']
+			method['seconds'] = method['seconds'] + stmt['seconds']
+		return {
+				'statements':len(self._statements),
+				'commits':self._commits,
+				'roundTrips':len(self._statements) + self._commits,
+				'rows':sum([stmt['rows'] for stmt in self._statements]),
+				'seconds':sum([stmt['seconds'] for stmt in self._statements]),
+				'byMethod':byMethod,
+				'slow':[stmt for stmt in self._statements if stmt['seconds'] > self._slowThreshold],
+				'repeated':self.repeatedStatements(),
+				'nPlusOne':self.nPlusOneStatements()
+				}
+
+	def repeatedStatements(self):
+		"""Return identical statements (same sql and binds) run more than once"""
+
+		return [{'sql':key[0],'binds':dict(key[1]),'count':count} for key,count in self._seen.items() if count > 1]
+
+	def nPlusOneStatements(self):
+		"""Return sql texts run with different binds at least nPlusOneThreshold times"""
+
+		counts = {}
+		for sql,binds in self._seen:
+			counts[sql] = counts.get(sql,0) + 1
+		return [{'sql':sql,'distinctBinds':count} for sql,count in counts.items() if count >= self._nPlusOneThreshold]
+
+	def writeSummary(self,request):
+		"""Append a json summary line for the request to the log file
+
+		Keyword arguments:
+		request -- request description e.g. the query string
+		"""
+
+		summary = self.summary()
+		summary['slow'] = len(summary['slow'])
+		self._write({'type':'summary','request':request,'summary':summary})
+
+	@property
+	def statements(self):
+		"""List of recorded statement dictionaries"""
+		return list(self._statements)
+
+	def _start(self,sql,binds):
+		"""Private method recording the start of a statement"""
+
+		key = (sql,tuple(sorted([(k,str(v)) for k,v in binds.items()])))
+		stmt = {'sql':sql,'binds':len(binds),'rows':0,'seconds':0.0,'method':_callingMethod()}
+		#Statements can be recorded from the concurrent fetch threads
+		with self._lock:
+			count = self._seen.get(key,0) + 1
+			self._seen[key] = count
+			self._statements.append(stmt)
+		if count == 2:
+			self._write({'type':'repeated','sql':sql,'method':stmt['method']})
+		return stmt
+
+	def _finish(self,stmt):
+		"""Private method logging a completed statement if slow"""
+
+		if stmt['seconds'] > self._slowThreshold:
+			self._write(dict(stmt,type='slow'))
+
+	def _commit(self):
+		"""Private method counting a commit round trip"""
+
+		with self._lock:
+			self._commits = self._commits + 1
+
+	def _write(self,entry):
+		"""Private method appending a json line to the log file"""
+
+		if self._logPath == None:
+			return
+		entry['time'] = datetime.now().isoformat()
+		with open(self._logPath,'a') as logFile:
+			logFile.write(json.dumps(entry) + '\n')
+
+
+def _callingMethod():
+	"""Return the name of the first public function up the stack, normally the DbFieldsFinds method"""
+
+	frame = sys._getframe(3)
+	while frame != None:
+		name = frame.f_code.co_name
+		if not name.startswith('_') and name != 'timedMethod':
+			return name
+		frame = frame.f_back
+	return 'unknown'
+
+
+class _InstrumentedConnection(object):
+	"""Connection wrapper handing out instrumented cursors"""
+
+	def __init__(self,conn,log):
+		self._conn = conn
+		self._log = log
+
+	def cursor(self):
+		return _InstrumentedCursor(self._conn.cursor(),self._log)
+
+	def commit(self):
+		self._log._commit()
+		self._conn.commit()
+
+	def rollback(self):
+		self._conn.rollback()
+
+	def close(self):
+		self._conn.close()
+
+
+class _InstrumentedCursor(object):
+	"""Cursor wrapper timing statements and counting rows"""
+
+	def __init__(self,cursor,log):
+		self._cursor = cursor
+		self._log = log
+		self._stmt = None
+
+	def execute(self,sql,**binds):
+		self._finishStatement()
+		self._stmt = self._log._start(sql,binds)
+		start = time.perf_counter()
+		try:
+			self._cursor.execute(sql,**binds)
+		finally:
+			self._stmt['seconds'] = time.perf_counter() - start
+		if self._cursor.description == None:
+			#Dml so rows are those changed
+			self._stmt['rows'] = max(self._cursor.rowcount,0)
+			self._finishStatement()
+
+	def fetchone(self):
+		start = time.perf_counter()
+		row = self._cursor.fetchone()
+		self._addFetch(start,0 if row == None else 1)
+		if row == None:
+			self._finishStatement()
+		return row
+
+	def fetchmany(self,numRows):
+		start = time.perf_counter()
+		rows = self._cursor.fetchmany(numRows)
+		self._addFetch(start,len(rows))
+		self._finishStatement()
+		return rows
+
+	def fetchall(self):
+		start = time.perf_counter()
+		rows = self._cursor.fetchall()
+		self._addFetch(start,len(rows))
+		self._finishStatement()
+		return rows
+
+	def __iter__(self):
+		start = time.perf_counter()
+		for row in self._cursor:
+			self._addFetch(start,1)
+			yield row
+			start = time.perf_counter()
+		self._addFetch(start,0)
+		self._finishStatement()
+
+	def var(self,dataType):
+		#Out binds of procedure calls
+		return self._cursor.var(dataType)
+
+	@property
+	def rowcount(self):
+		return self._cursor.rowcount
+
+	@property
+	def description(self):
+		return self._cursor.description
+
+	def _addFetch(self,start,rows):
+		if self._stmt != None:
+			self._stmt['seconds'] = self._stmt['seconds'] + time.perf_counter() - start
+			self._stmt['rows'] = self._stmt['rows'] + rows
+
+	def _finishStatement(self):
+		if self._stmt != None:
+			self._log._finish(self._stmt)
+			self._stmt = None
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import zlib
+from collections import OrderedDict
+import numpy as np
+from .metrics import getMetrics
+__all__ = ['RasterCache','rasterizeMap','rasterSize','encodePng']
+
+#Longest side in pixels of a rasterized map
+RASTER_SIZE = 1000
+
+#Finds are drawn in blocks to bound the memory of the pixel index arrays
+_FIND_BLOCK = 10000
+
+#Field fill matching the svg lightgreen at fill-opacity 0.5
+_FIELD_FILL = (144,238,144,128)
+_STROKE = (0,0,0,255)
+
+#Colour names used by the find classes, others fall back to grey
+_COLOURS = {
+			'black':(0,0,0),'white':(255,255,255),'red':(255,0,0),'lime':(0,255,0),'green':(0,128,0),
+			'blue':(0,0,255),'yellow':(255,255,0),'cyan':(0,255,255),'aqua':(0,255,255),'magenta':(255,0,255),
+			'fuchsia':(255,0,255),'silver':(192,192,192),'grey':(128,128,128),'gray':(128,128,128),
+			'maroon':(128,0,0),'olive':(128,128,0),'purple':(128,0,128),'teal':(0,128,128),'navy':(0,0,128),
+			'orange':(255,165,0),'gold':(255,215,0),'brown':(165,42,42),'pink':(255,192,203),
+			'lightgreen':(144,238,144),'darkgreen':(0,100,0),'lightblue':(173,216,230),'darkblue':(0,0,139)
+			}
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def rasterSize(maxX,maxY,longest=RASTER_SIZE):
+	"""Return (width, height) in pixels keeping the area aspect ratio
+
+	Keyword arguments:
+	maxX,maxY -- area size
+	longest -- pixels along the longest side (default RASTER_SIZE)
+	"""
+
+	pixels = float(longest) / max(maxX,maxY)
+	return (max(1,int(round(maxX*pixels))),max(1,int(round(maxY*pixels))))
+
+def rasterizeMap(mapArea,width,height):
+	"""Draw the fields and finds attached to a map area into an RGBA image
+
+	Fields and finds follow the svg styling: translucent lightgreen fields and class coloured
+	finds with black outlines, finds at least one pixel across. Returns the (height,width,4)
+	uint8 image and a (height,width) int64 id image holding the find id on find pixels, minus
+	the field id on other field pixels and 0 elsewhere. Ids are NUMBER(10) so int32 is too small.
+
+	Keyword arguments:
+	mapArea -- MapArea with fields and finds attached
+	width,height -- image size in pixels
+	"""
+
+	arrays = mapArea.packArrays()
+	rgba = np.zeros((height,width,4),dtype=np.uint8)
+	ids = np.zeros((height,width),dtype=np.int64)
+	sx = float(width) / mapArea.maxX
+	sy = float(height) / mapArea.maxY
+	stroke = max(1,int(round(0.02*mapArea.scale*sx)))
+
+	#Fields do not overlap so each is filled then outlined
+	for fieldId,(lowX,lowY,hiX,hiY) in zip(arrays['fieldId'].tolist(),arrays['fieldBox'].tolist()):
+		c0,c1 = _pixelRange(lowX*sx,hiX*sx,width)
+		r0,r1 = _pixelRange((mapArea.maxY-hiY)*sy,(mapArea.maxY-lowY)*sy,height)
+		rgba[r0:r1,c0:c1] = _FIELD_FILL
+		ids[r0:r1,c0:c1] = -fieldId
+		rgba[r0:min(r0+stroke,r1),c0:c1] = _STROKE
+		rgba[max(r1-stroke,r0):r1,c0:c1] = _STROKE
+		rgba[r0:r1,c0:min(c0+stroke,c1)] = _STROKE
+		rgba[r0:r1,max(c1-stroke,c0):c1] = _STROKE
+
+	#Finds are stamped with a disc of pixel offsets, outlined when wide enough to keep the colour visible
+	radius = (0.5 if mapArea.maxY > 35 else 0.25) * mapArea.scale * sx
+	radius = max(radius,1.0)
+	reach = int(math.ceil(radius))
+	dy,dx = np.mgrid[-reach:reach+1,-reach:reach+1]
+	distance = np.sqrt(dx*dx + dy*dy)
+	inside = distance <= radius
+	dx = dx[inside]
+	dy = dy[inside]
+	ring = distance[inside] > radius - stroke if radius >= 2 else np.zeros(len(dx),dtype=bool)
+	#Pixels are written as one uint32 each through flat indexes
+	palette = np.array([_parseColour(colour) + (255,) for name,colour in arrays['classes']] or [(0,0,0,0)],dtype=np.uint8).view(np.uint32).ravel()
+	strokePixel = np.array(_STROKE,dtype=np.uint8).view(np.uint32)[0]
+	pixels = rgba.view(np.uint32).reshape(-1)
+	flatIds = ids.reshape(-1)
+
+	points = arrays['findPoint']
+	centreX = np.round(points[:,0]*sx).astype(np.int64)
+	centreY = np.round((mapArea.maxY-points[:,1])*sy).astype(np.int64)
+	for start in range(0,len(centreX),_FIND_BLOCK):
+		block = slice(start,start+_FIND_BLOCK)
+		#Rows are finds in draw order so later finds overwrite earlier ones as in the svg
+		rows = centreY[block,None] + dy[None,:]
+		cols = centreX[block,None] + dx[None,:]
+		valid = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+		colours = np.where(ring[None,:],strokePixel,palette[arrays['findClass'][block]][:,None])
+		findIds = np.broadcast_to(arrays['findId'][block][:,None],rows.shape)
+		index = (rows*width + cols)[valid]
+		pixels[index] = colours[valid]
+		flatIds[index] = findIds[valid]
+
+	return rgba,ids
+
+def encodePng(rgba):
+	"""Return PNG file bytes of a (height,width,4) uint8 RGBA image
+
+	Keyword arguments:
+	rgba -- image array
+	"""
+
+	height,width = rgba.shape[:2]
+	#Each scanline starts with filter type 0
+	raw = np.zeros((height,width*4+1),dtype=np.uint8)
+	raw[:,1:] = rgba.reshape(height,width*4)
+	header = struct.pack('>IIBBBBB',width,height,8,6,0,0,0)
+	return _PNG_SIGNATURE + _pngChunk(b'IHDR',header) + _pngChunk(b'IDAT',zlib.compress(raw.tobytes(),6)) + _pngChunk(b'IEND',b'')
+
+
+class RasterCache(object):
+	"""Bounded cache of rasterized maps keyed by area, data version, find filter and size
+
+	Entries are a PNG and its id image. Without a folder they are held in memory for the
+	life of the process, with a folder they are files shared by every process. A write raises
+	the area data version, whoever makes it, so the map is drawn again and the older versions
+	of the area are removed when it is stored. The least recently used entries are removed
+	beyond maxEntries.
+	"""
+
+	def __init__(self,folder=None,maxEntries=32):
+		"""Initialise object
+
+		Keyword arguments:
+		folder -- cache folder, in memory if None (default None)
+		maxEntries -- most entries kept (default 32)
+		"""
+
+		self._folder = folder
+		self._maxEntries = maxEntries
+		self._memory = OrderedDict()
+		if folder != None and not os.path.isdir(folder):
+			os.makedirs(folder)
+
+	def get(self,areaId,version,filterKey,width,height):
+		"""Return (png bytes, id image) or None if not cached
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		version -- area data version
+		filterKey -- FindFilter key, '' for no filter
+		width,height -- image size in pixels
+		"""
+
+		entry = self._read(_entryName(areaId,version,filterKey,width,height))
+		getMetrics().recordCache('raster',entry != None)
+		return entry
+
+	def _read(self,name):
+		"""Private method returning the (png bytes, id image) of an entry or None"""
+
+		if self._folder == None:
+			if name not in self._memory:
+				return None
+			self._memory.move_to_end(name)
+			return self._memory[name]
+
+		pngPath = os.path.join(self._folder,name + '.png')
+		try:
+			with open(pngPath,'rb') as pngFile:
+				png = pngFile.read()
+			ids = np.load(os.path.join(self._folder,name + '.ids.npy'),mmap_mode='r')
+			#Touched so pruning removes the least recently used
+			os.utime(pngPath)
+		except (IOError,OSError,ValueError):
+			return None
+		return png,ids
+
+	def put(self,areaId,version,filterKey,width,height,png,ids):
+		"""Store a rasterized map, removing those of older versions of the area
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		version -- area data version the fields and finds were read at
+		filterKey -- FindFilter key, '' for no filter
+		width,height -- image size in pixels
+		png -- png bytes
+		ids -- id image from rasterizeMap
+		"""
+
+		name = _entryName(areaId,version,filterKey,width,height)
+		self._removeOlder(areaId,version)
+		if self._folder == None:
+			self._memory[name] = (png,ids)
+			self._memory.move_to_end(name)
+			while len(self._memory) > self._maxEntries:
+				self._memory.popitem(last=False)
+			return
+
+		#The png is written last as readers take it to mean the entry is complete
+		_atomicWrite(os.path.join(self._folder,name + '.ids.npy'),lambda outFile: np.save(outFile,ids))
+		_atomicWrite(os.path.join(self._folder,name + '.png'),lambda outFile: outFile.write(png))
+		self._prune()
+
+	def invalidate(self,areaId):
+		"""Remove every entry of an area, e.g. after its fields or finds change
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		"""
+
+		prefix = 'raster_' + str(areaId) + '_'
+		if self._folder == None:
+			for name in [name for name in self._memory if name.startswith(prefix)]:
+				del self._memory[name]
+			return
+		for fileName in os.listdir(self._folder):
+			if fileName.startswith(prefix):
+				_removeQuietly(os.path.join(self._folder,fileName))
+
+	def _removeOlder(self,areaId,version):
+		"""Private method removing the entries of an area older than version
+
+		Only older versions are removed as another process may store a newer one first.
+		"""
+
+		prefix = 'raster_' + str(areaId) + '_'
+		if self._folder == None:
+			names = list(self._memory)
+		else:
+			names = os.listdir(self._folder)
+		for name in names:
+			if not name.startswith(prefix):
+				continue
+			entryVersion = name[len(prefix):].split('_',1)[0]
+			if entryVersion.isdigit() and int(entryVersion) < version:
+				if self._folder == None:
+					del self._memory[name]
+				else:
+					_removeQuietly(os.path.join(self._folder,name))
+
+	def _prune(self):
+		"""Private method removing the least recently used files beyond maxEntries"""
+
+		entries = []
+		for fileName in os.listdir(self._folder):
+			if fileName.startswith('raster_') and fileName.endswith('.png'):
+				try:
+					entries.append((os.path.getmtime(os.path.join(self._folder,fileName)),fileName[:-4]))
+				except OSError:
+					pass
+		entries.sort()
+		for mtime,name in entries[:max(0,len(entries)-self._maxEntries)]:
+			_removeQuietly(os.path.join(self._folder,name + '.png'))
+			_removeQuietly(os.path.join(self._folder,name + '.ids.npy'))
+
+
+def _pixelRange(low,high,size):
+	"""Private function returning the pixel range covering low to high, at least one pixel wide"""
+
+	start = min(max(int(round(low)),0),size-1)
+	end = min(max(int(round(high)),start+1),size)
+	return start,end
+
+def _parseColour(colour):
+	"""Private function returning the (r,g,b) of a colour name or #rgb / #rrggbb value"""
+
+	colour = str(colour).strip().lower()
+	try:
+		if colour.startswith('#') and len(colour) == 7:
+			return tuple([int(colour[i:i+2],16) for i in (1,3,5)])
+		if colour.startswith('#') and len(colour) == 4:
+			return tuple([int(c*2,16) for c in colour[1:]])
+	except ValueError:
+		pass
+	return _COLOURS.get(colour,_COLOURS['grey'])
+
+def _pngChunk(kind,data):
+	"""Private function returning a length prefixed png chunk with its crc"""
+
+	return struct.pack('>I',len(data)) + kind + data + struct.pack('>I',zlib.crc32(kind + data) & 0xffffffff)
+
+def _entryName(areaId,version,filterKey,width,height):
+	"""Private function returning the cache file name of an entry without extension"""
+
+	digest = hashlib.sha1(repr((filterKey,width,height)).encode('utf-8')).hexdigest()[:16]
+	return 'raster_' + str(areaId) + '_' + str(int(version)) + '_' + digest
+
+def _atomicWrite(path,writer):
+	"""Private function writing to a temporary file then renaming it over path"""
+
+	handle,tmpPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),prefix='.tmp_')
+	try:
+		with os.fdopen(handle,'wb') as outFile:
+			writer(outFile)
+		os.chmod(tmpPath,0o644)
+		os.replace(tmpPath,path)
+	except:
+		os.remove(tmpPath)
+		raise
+
+def _removeQuietly(path):
+	"""Private function removing a file another process may already have removed"""
+
+	try:
+		os.remove(path)
+	except OSError:
+		pass
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import tempfile
+import threading
+import time
+try:
+	import fcntl
+except ImportError:
+	#Only on unix, elsewhere requests are only coalesced between threads
+	fcntl = None
+from .metrics import getMetrics
+__all__ = ['SingleFlight']
+
+#Seconds between tries of a lock held by another process
+_POLL = 0.01
+
+#Seconds after which unused lock and result files are removed
+_MAX_AGE = 3600
+
+
+class SingleFlight(object):
+	"""Coalesces identical concurrent renders so only one caller computes the result
+
+	Callers with the same key while a render is running wait for it and share its bytes.
+	Threads wait on an event. With a folder, processes take a lock file per key and the
+	leader leaves the result beside it, which a waiting process uses if it was written after
+	it started waiting. A follower computes the result itself when the leader fails or takes
+	longer than the timeout, so a stuck or crashed leader never blocks it for good.
+	"""
+
+	def __init__(self,folder=None,timeout=10.0):
+		"""Initialise object
+
+		Keyword arguments:
+		folder -- folder of the lock and result files, threads of this process only if None (default None)
+		timeout -- most seconds a follower waits for the leader (default 10)
+		"""
+
+		self._folder = folder
+		self._timeout = timeout
+		self._calls = {}
+		self._lock = threading.Lock()
+		if folder != None and not os.path.isdir(folder):
+			os.makedirs(folder)
+
+	@classmethod
+	def fromEnvironment(cls):
+		"""Create from FF_COALESCE_DIR and FF_COALESCE_TIMEOUT (seconds), None if FF_COALESCE_DIR is not set"""
+
+		folder = os.environ.get('FF_COALESCE_DIR')
+		if folder == None:
+			return None
+		return cls(folder,float(os.environ.get('FF_COALESCE_TIMEOUT','10')))
+
+	def run(self,key,compute):
+		"""Return the bytes of compute, shared with concurrent callers of the same key
+
+		Keyword arguments:
+		key -- tuple identifying the result e.g. area, filter and data version
+		compute -- function returning the result bytes
+		"""
+
+		with self._lock:
+			call = self._calls.get(key)
+			leader = call == None
+			if leader:
+				call = self._calls[key] = _Call()
+		if not leader:
+			if call.event.wait(self._timeout) and call.failed == False:
+				_record('shared')
+				return call.result
+			_record('timeout' if call.failed == None else 'failed')
+			return compute()
+
+		try:
+			call.result = self._runShared(key,compute) if self._folder != None and fcntl != None else self._lead(compute)
+			call.failed = False
+			return call.result
+		except:
+			call.failed = True
+			raise
+		finally:
+			with self._lock:
+				del self._calls[key]
+			call.event.set()
+
+	def _runShared(self,key,compute):
+		"""Private method running compute once across processes with a lock file per key"""
+
+		name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+		resultPath = os.path.join(self._folder,name + '.out')
+		started = time.time_ns()
+		deadline = time.monotonic() + self._timeout
+		with open(os.path.join(self._folder,name + '.lock'),'a') as lockFile:
+			while True:
+				try:
+					fcntl.flock(lockFile,fcntl.LOCK_EX | fcntl.LOCK_NB)
+					break
+				except (IOError,OSError):
+					if time.monotonic() > deadline:
+						_record('timeout')
+						return compute()
+					time.sleep(_POLL)
+			os.utime(lockFile.fileno())
+			try:
+				#A leader that finished while this process waited left its result
+				result = _readResult(resultPath,started)
+				if result != None:
+					_record('shared')
+					return result
+				result = self._lead(compute)
+				_writeResult(self._folder,resultPath,result)
+				_prune(self._folder)
+				return result
+			finally:
+				fcntl.flock(lockFile,fcntl.LOCK_UN)
+
+	def _lead(self,compute):
+		"""Private method computing the result as leader"""
+
+		_record('leader')
+		return compute()
+
+
+class _Call(object):
+	"""Render in progress in this process, failed is None until it finishes"""
+
+	def __init__(self):
+		self.event = threading.Event()
+		self.result = None
+		self.failed = None
+
+
+def _readResult(path,since):
+	"""Private function returning a result file written at or after since (ns), None otherwise"""
+
+	try:
+		with open(path,'rb') as resultFile:
+			if os.fstat(resultFile.fileno()).st_mtime_ns < since:
+				return None
+			return resultFile.read()
+	except (IOError,OSError):
+		return None
+
+def _writeResult(folder,path,result):
+	"""Private function replacing a result file so readers never see part of it"""
+
+	handle,tmpPath = tempfile.mkstemp(dir=folder,prefix='.tmp_')
+	try:
+		with os.fdopen(handle,'wb') as outFile:
+			outFile.write(result)
+		os.replace(tmpPath,path)
+	except (IOError,OSError):
+		if os.path.exists(tmpPath):
+			os.remove(tmpPath)
+
+def _prune(folder):
+	"""Private function removing lock and result files not used for _MAX_AGE seconds"""
+
+	oldest = time.time() - _MAX_AGE
+	for fileName in os.listdir(folder):
+		path = os.path.join(folder,fileName)
+		try:
+			if os.path.getmtime(path) < oldest:
+				os.remove(path)
+		except OSError:
+			pass
+
+def _record(result):
+	"""Private function counting how a request was served"""
+
+	getMetrics().inc('ff_coalesced_total',{'result':result})
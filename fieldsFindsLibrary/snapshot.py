@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+import json
+import os
+import struct
+import tempfile
+from datetime import date, datetime
+import numpy as np
+from .geoObjects import Field, Find, MapArea
+__all__ = ['AreaSnapshot','snapshotPath']
+
+#Snapshot file layout: magic, header length, json header then 8 byte aligned column arrays
+_MAGIC = b'FFSNAP01'
+_PREFIX = struct.Struct('<8sI4x')
+_ALIGN = 8
+
+#Index file listing the areas and the drop down lists
+SNAPSHOT_INDEX = 'index.json'
+
+#Field columns in VIEW_FIELDS_COMB select order: name, kind
+_FIELD_COLUMNS = [
+				('fieldId','<i8'),('lowX','<i8'),('hiX','<i8'),('lowY','<i8'),('hiY','<i8'),('area','<f8'),
+				('crop','str'),('cropStart','date'),('cropEnd','date'),('owner','str'),('areaId','<i8'),
+				('imgOwner','str'),('imgCrop','str')
+				]
+
+#Find columns in VIEW_FINDS_COMB select order: name, kind
+_FIND_COLUMNS = [
+				('findId','<i8'),('x','<i8'),('y','<i8'),('depth','<f8'),('notes','str'),('type','str'),
+				('period','str'),('use','str'),('areaId','<i8'),('colour','str'),('imgFind','str')
+				]
+
+
+def snapshotPath(snapshotDir,areaId):
+	"""Return the snapshot file path for an area
+
+	Keyword arguments:
+	snapshotDir -- snapshot folder
+	areaId -- Id of MapArea
+	"""
+
+	return os.path.join(snapshotDir,'area_' + str(areaId) + '.ffsnap')
+
+def writeAreaSnapshot(snapshotDir,areaRow,fieldRows,findRows,fieldIds,findIds,version=0):
+	"""Atomically write the snapshot file for one area
+
+	Keyword arguments:
+	snapshotDir -- snapshot folder
+	areaRow -- FF_AREA row (areaId,areaName,maxX,maxY,imgPath)
+	fieldRows -- VIEW_FIELDS_COMB rows in _loadFields column order
+	findRows -- VIEW_FINDS_COMB rows in _loadFinds column order
+	fieldIds -- deletable field ids
+	findIds -- deletable find ids
+	version -- area data version the rows are from (default 0)
+	"""
+
+	strings = _StringTable()
+	arrays = []
+	for prefix,columns,rows in [('field.',_FIELD_COLUMNS,fieldRows),('find.',_FIND_COLUMNS,findRows)]:
+		for i,(name,kind) in enumerate(columns):
+			arrays.append((prefix + name,_columnArray([row[i] for row in rows],kind,strings)))
+	arrays.append(('fieldIdList',np.array(fieldIds,dtype='<i8')))
+	arrays.append(('findIdList',np.array(findIds,dtype='<i8')))
+	arrays.append(('strings.offsets',np.array(strings.offsets,dtype='<i8')))
+	arrays.append(('strings.data',np.frombuffer(strings.data(),dtype='u1')))
+
+	#Work out array offsets once the header size is known
+	header = {
+			'area':[int(areaRow[0]),str(areaRow[1]),int(areaRow[2]),int(areaRow[3]),areaRow[4]],
+			'created':datetime.now().isoformat(),
+			'version':int(version),
+			'arrays':{}
+			}
+	headerBytes = _encodeHeader(header,arrays)
+
+	_atomicWrite(snapshotPath(snapshotDir,areaRow[0]),lambda outFile: _writeArrays(outFile,headerBytes,arrays))
+
+def writeSnapshotIndex(snapshotDir,areaRows,cropList,classList,ownerList):
+	"""Atomically write the index of areas and drop down lists
+
+	Keyword arguments:
+	snapshotDir -- snapshot folder
+	areaRows -- list of (areaId,areaName) for all areas
+	cropList,classList,ownerList -- drop down lists
+	"""
+
+	index = {
+			'areas':dict([(str(row[1]),int(row[0])) for row in areaRows]),
+			'cropList':list(cropList),
+			'classList':list(classList),
+			'ownerList':list(ownerList)
+			}
+	data = json.dumps(index,sort_keys=True).encode('utf-8')
+	_atomicWrite(os.path.join(snapshotDir,SNAPSHOT_INDEX),lambda outFile: outFile.write(data))
+
+
+class AreaSnapshot(object):
+	"""Read only view of an area snapshot file
+
+	The file is memory mapped and the numeric columns are numpy views onto the mapping so
+	nothing is copied until objects are built. Strings are decoded from the string table once.
+	"""
+
+	def __init__(self,path):
+		"""Open snapshot
+
+		Keyword arguments:
+		path -- snapshot file path
+		"""
+
+		self._path = path
+		self._map = np.memmap(path,dtype='u1',mode='r')
+		magic,headerLen = _PREFIX.unpack(self._map[:_PREFIX.size].tobytes())
+		if magic != _MAGIC:
+			raise Exception('Not a fields and finds snapshot: ' + path)
+		header = json.loads(self._map[_PREFIX.size:_PREFIX.size+headerLen].tobytes().decode('utf-8'))
+		self._area = header['area']
+		self._version = header.get('version',0)
+		self._arrays = {}
+		for name,info in header['arrays'].items():
+			if info['count'] == 0:
+				self._arrays[name] = np.zeros(0,dtype=info['dtype'])
+				continue
+			self._arrays[name] = np.frombuffer(self._map,dtype=info['dtype'],count=info['count'],offset=info['offset'])
+		self._strings = None
+
+	def mapArea(self):
+		"""Return a new MapArea for the snapshot area"""
+
+		return MapArea(self._area[0],self._area[1],self._area[2],self._area[3],self._area[4])
+
+	def column(self,name):
+		"""Return a column array view e.g. field.lowX or find.x
+
+		Keyword arguments:
+		name -- column name
+		"""
+
+		return self._arrays[name]
+
+	def fields(self,mask=None):
+		"""Return list of Field objects
+
+		Keyword arguments:
+		mask -- numpy boolean array selecting fields, all if None (default None)
+		"""
+
+		return [Field(*row) for row in self._rows('field.',_FIELD_COLUMNS,mask)]
+
+	def finds(self,filterClass=None,mask=None):
+		"""Return list of Find objects
+
+		Keyword arguments:
+		filterClass -- only return finds of this class (default None)
+		mask -- numpy boolean array selecting finds, all if None (default None)
+		"""
+
+		if filterClass != None:
+			classMask = self.stringMask('find.type',[filterClass])
+			mask = classMask if mask is None else mask & classMask
+		return [Find(*row) for row in self._rows('find.',_FIND_COLUMNS,mask)]
+
+	def stringMask(self,name,values):
+		"""Return numpy boolean mask of rows whose string column is one of values
+
+		Keyword arguments:
+		name -- string column name e.g. find.type
+		values -- list of strings
+		"""
+
+		indexes = [self._stringIndex(value) for value in values]
+		return np.isin(self._arrays[name],indexes)
+
+	def decode(self,codes):
+		"""Return the strings of string column codes, None for missing values
+
+		Keyword arguments:
+		codes -- string table indexes e.g. unique values of find.type
+		"""
+
+		strings = self._stringList()
+		return [strings[i] if i >= 0 else None for i in np.asarray(codes).tolist()]
+
+	@property
+	def areaId(self):
+		return self._area[0]
+
+	@property
+	def areaName(self):
+		return self._area[1]
+
+	@property
+	def version(self):
+		return self._version
+
+	@property
+	def fieldIdList(self):
+		return [int(i) for i in self._arrays['fieldIdList']]
+
+	@property
+	def findIdList(self):
+		return [int(i) for i in self._arrays['findIdList']]
+
+	def _rows(self,prefix,columns,mask):
+		"""Private method returning decoded row tuples"""
+
+		strings = self._stringList()
+		values = []
+		for name,kind in columns:
+			array = self._arrays[prefix + name]
+			if mask is not None:
+				array = array[mask]
+			if kind == 'str':
+				values.append([strings[i] if i >= 0 else None for i in array.tolist()])
+			elif kind == 'date':
+				values.append([date.fromordinal(i) for i in array.tolist()])
+			else:
+				values.append(array.tolist())
+		return zip(*values)
+
+	def _stringList(self):
+		"""Private method decoding the string table"""
+
+		if self._strings == None:
+			offsets = self._arrays['strings.offsets'].tolist()
+			data = self._arrays['strings.data'].tobytes()
+			self._strings = [data[offsets[i]:offsets[i+1]].decode('utf-8') for i in range(len(offsets)-1)]
+		return self._strings
+
+	def _stringIndex(self,value):
+		"""Private method returning the string table index of value, -2 if not present"""
+
+		try:
+			return self._stringList().index(value)
+		except ValueError:
+			return -2
+
+
+class _StringTable(object):
+	"""Dictionary encodes strings to indexes into one utf-8 buffer"""
+
+	def __init__(self):
+		self._index = {}
+		self._parts = []
+		self.offsets = [0]
+
+	def add(self,value):
+		if value == None:
+			return -1
+		value = str(value)
+		if value not in self._index:
+			encoded = value.encode('utf-8')
+			self._index[value] = len(self._parts)
+			self._parts.append(encoded)
+			self.offsets.append(self.offsets[-1] + len(encoded))
+		return self._index[value]
+
+	def data(self):
+		return b''.join(self._parts)
+
+
+def _columnArray(values,kind,strings):
+	"""Private function converting a column of row values to a typed array"""
+
+	if kind == 'str':
+		return np.array([strings.add(v) for v in values],dtype='<i4')
+	if kind == 'date':
+		return np.array([v.toordinal() for v in values],dtype='<i4')
+	return np.array(values,dtype=kind)
+
+def _encodeHeader(header,arrays):
+	"""Private function filling in array offsets and returning the encoded header"""
+
+	#Offsets depend on the header length so iterate until it is stable
+	headerLen = 0
+	while True:
+		offset = _aligned(_PREFIX.size + headerLen)
+		for name,array in arrays:
+			header['arrays'][name] = {'dtype':array.dtype.str,'count':len(array),'offset':offset}
+			offset = _aligned(offset + array.nbytes)
+		headerBytes = json.dumps(header,sort_keys=True).encode('utf-8')
+		if len(headerBytes) == headerLen:
+			return headerBytes
+		headerLen = len(headerBytes)
+
+def _writeArrays(outFile,headerBytes,arrays):
+	"""Private function writing the prefix, header and aligned arrays"""
+
+	outFile.write(_PREFIX.pack(_MAGIC,len(headerBytes)))
+	outFile.write(headerBytes)
+	position = _PREFIX.size + len(headerBytes)
+	for name,array in arrays:
+		padding = _aligned(position) - position
+		outFile.write(b'\0' * padding)
+		outFile.write(array.tobytes())
+		position = position + padding + array.nbytes
+
+def _aligned(position):
+	"""Private function rounding position up to the array alignment"""
+
+	return (position + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def _atomicWrite(path,writer):
+	"""Private function writing to a temporary file then renaming it over path"""
+
+	folder = os.path.dirname(os.path.abspath(path))
+	handle,tmpPath = tempfile.mkstemp(dir=folder,prefix='.tmp_')
+	try:
+		with os.fdopen(handle,'wb') as outFile:
+			writer(outFile)
+			outFile.flush()
+			os.fsync(outFile.fileno())
+		#mkstemp files are private but snapshots are read by the web server
+		os.chmod(tmpPath,0o644)
+		os.replace(tmpPath,path)
+	except:
+		os.remove(tmpPath)
+		raise
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+import json
+import os
+import numpy as np
+from .database import DbFieldsFinds, _timed, _idRanges, _afterId, _PROTECTED_AREAS
+from .snapshot import AreaSnapshot, snapshotPath, SNAPSHOT_INDEX
+from .metrics import getMetrics
+from .areaStatistics import summarizeArea
+__all__ = ['DbFieldsFindsSnapshot']
+
+class DbFieldsFindsSnapshot(DbFieldsFinds):
+	"""Read only fields and finds database served from snapshot files
+
+	Serves the page queries from the per-area snapshot files written by DbFieldsFinds.rebuildSnapshots
+	or by a DbFieldsFinds with setSnapshotDir, so a page can be rendered without the database.
+	Open snapshots are kept and reopened only when the file is replaced.
+	"""
+
+	def __init__(self,snapshotDir):
+		"""Initialise object
+
+		Keyword arguments:
+		snapshotDir -- snapshot folder
+		"""
+
+		DbFieldsFinds.__init__(self)
+		self._snapshotDir = None
+		self._readDir = snapshotDir
+		self._index = None
+		self._snapshots = {}
+
+	@_timed
+	def openConnection(self):
+		"""Load the snapshot index"""
+
+		with open(os.path.join(self._readDir,SNAPSHOT_INDEX),'r') as indexFile:
+			self._index = json.load(indexFile)
+		self._conn = self._index
+
+	def closeConnection(self):
+		"""Release the index, open snapshots are kept for the next request"""
+
+		assert self._conn != None #Check connection open
+		self._conn = None
+
+	def openSession(self):
+		"""Snapshots are read only so the same object is safe to share between threads"""
+
+		assert self._conn != None #Check connection open
+		return self
+
+	def closeSession(self):
+		"""Nothing to release for a shared snapshot session"""
+
+		pass
+
+	@_timed
+	def getMapArea(self,areaName):
+		"""Get Map Area
+
+		Keyword arguments:
+		areaName -- Name of Map
+		"""
+
+		assert self._conn != None #Check connection open
+		if areaName not in self._index['areas']:
+			raise Exception("Cannot Find Requested Map Area")
+		return self._snapshot(self._index['areas'][areaName]).mapArea()
+
+	@_timed
+	def getFields(self,areaId):
+		"""Get Fields in Area
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		"""
+
+		return self._snapshot(areaId).fields()
+
+	@_timed
+	def getField(self,fieldId):
+		"""Get a single Field
+
+		Keyword arguments:
+		fieldId -- Id of Field
+		"""
+
+		for areaId in self._index['areas'].values():
+			snapshot = self._snapshot(areaId)
+			fieldList = snapshot.fields(snapshot.column('field.fieldId') == int(fieldId))
+			if len(fieldList) > 0:
+				return fieldList[0]
+		raise Exception("Cannot Find Field " + str(fieldId))
+
+	@_timed
+	def getFinds(self,areaId,filterClass=None,findFilter=None):
+		"""Get Finds in Area
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		filterClass -- only return finds of this class (default None)
+		findFilter -- FindFilter applied to the snapshot columns (default None)
+		"""
+
+		snapshot = self._snapshot(areaId)
+		return snapshot.finds(filterClass,None if findFilter == None else findFilter.mask(snapshot))
+
+	@_timed
+	def getFind(self,findId):
+		"""Get a single Find
+
+		Keyword arguments:
+		findId -- Id of Find
+		"""
+
+		for areaId in self._index['areas'].values():
+			snapshot = self._snapshot(areaId)
+			findList = snapshot.finds(mask=snapshot.column('find.findId') == int(findId))
+			if len(findList) > 0:
+				return findList[0]
+		raise Exception("Cannot Find Find " + str(findId))
+
+	@_timed
+	def getMapAreaList(self):
+		"""Get list of Map Areas"""
+
+		return sorted(self._index['areas'])
+
+	@_timed
+	def getCropList(self):
+		"""Get list of Crops"""
+
+		return list(self._index['cropList'])
+
+	@_timed
+	def getClassList(self):
+		"""Get list of Classes"""
+
+		return list(self._index['classList'])
+
+	@_timed
+	def getOwnerList(self):
+		"""Get list of Owners"""
+
+		return list(self._index['ownerList'])
+
+	@_timed
+	def getFieldIdList(self,areaId):
+		"""Get list of Field Ids within area"""
+
+		return self._snapshot(areaId).fieldIdList
+
+	@_timed
+	def getFindIdList(self,areaId):
+		"""Get list of Find Ids within area"""
+
+		return self._snapshot(areaId).findIdList
+
+	@_timed
+	def lookupIds(self,kind,areaId=None,prefix='',after=None,limit=50):
+		"""Get a page of field ids, find ids or area names starting with prefix
+
+		Keyword arguments:
+		kind -- field, find, area or delArea for the areas that can be deleted
+		areaId -- Id of MapArea searched for fields and finds (default None)
+		prefix -- start of the id or area name (default '')
+		after -- last value of the previous page, None for the first page (default None)
+		limit -- most values returned (default 50)
+		"""
+
+		assert self._conn != None #Check connection open
+		if kind in ['area','delArea']:
+			values = [name for name in sorted(self._index['areas']) if name.startswith(prefix) and (after == None or name > after)]
+			if kind == 'delArea':
+				values = [name for name in values if name not in _PROTECTED_AREAS]
+		else:
+			snapshot = self._snapshot(areaId)
+			ids = np.array(snapshot.fieldIdList if kind == 'field' else snapshot.findIdList,dtype=np.int64)
+			ranges = _idRanges(prefix)
+			mask = np.ones(len(ids),dtype=bool) if ranges == None else np.zeros(len(ids),dtype=bool)
+			for low,high in ranges or []:
+				mask |= (ids >= low) & (ids <= high)
+			if after != None:
+				mask &= ids > _afterId(after)
+			values = [int(i) for i in ids[mask][:limit + 1]]
+		return values[:limit],len(values) > limit
+
+	@_timed
+	def getAreaVersion(self,areaId):
+		"""Get the data version of an area when its snapshot was written"""
+
+		return self._snapshot(areaId).version
+
+	@_timed
+	def getFindPoints(self,areaId,findFilter=None):
+		"""Get the ids and (n,2) x,y array of the finds in an area
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		findFilter -- FindFilter applied to the snapshot columns (default None)
+		"""
+
+		snapshot = self._snapshot(areaId)
+		ids = snapshot.column('find.findId')
+		points = np.stack([snapshot.column('find.x'),snapshot.column('find.y')],axis=1)
+		if findFilter != None:
+			mask = findFilter.mask(snapshot)
+			return ids[mask],points[mask]
+		return np.array(ids),points
+
+	def getFieldBoxes(self,areaId):
+		"""Get the ids and (n,4) lowX,lowY,hiX,hiY array of the fields in an area
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		"""
+
+		snapshot = self._snapshot(areaId)
+		boxes = np.stack([snapshot.column('field.' + name) for name in ['lowX','lowY','hiX','hiY']],axis=1)
+		return np.array(snapshot.column('field.fieldId')),boxes.reshape(-1,4)
+
+	@_timed
+	def _loadAreaStatistics(self,areaId,version):
+		"""Private method grouping the snapshot columns of an area with numpy"""
+
+		snapshot = self._snapshot(areaId)
+		mapArea = snapshot.mapArea()
+
+		#Finds by class, period, use and depth, missing depths are nan and grouped as None
+		depthValues,depthCodes = np.unique(snapshot.column('find.depth'),return_inverse=True)
+		findGroups = []
+		for codes,count in _groupCodes(snapshot,'find.',['type','period','use'],depthCodes):
+			depth = float(depthValues[codes[3]])
+			findGroups.append(tuple(snapshot.decode(codes[:3])) + (None if np.isnan(depth) else depth,count))
+
+		fieldGroups = []
+		for codes,count,area in _groupCodes(snapshot,'field.',['crop','owner'],None,snapshot.column('field.area')):
+			fieldGroups.append(tuple(snapshot.decode(codes)) + (count,area))
+		return summarizeArea(areaId,mapArea.maxX,mapArea.maxY,version,findGroups,fieldGroups)
+
+	def getChangesSince(self,*args,**kwargs):
+		raise Exception('Snapshot database has no change log')
+
+	def getReferenceRows(self):
+		raise Exception('Snapshot database has no crop and class ids')
+
+	def addNewArea(self,*args,**kwargs):
+		_readOnly()
+
+	def addField(self,*args,**kwargs):
+		_readOnly()
+
+	def addFind(self,*args,**kwargs):
+		_readOnly()
+
+	def delFind(self,*args,**kwargs):
+		_readOnly()
+
+	def delField(self,*args,**kwargs):
+		_readOnly()
+
+	def delArea(self,*args,**kwargs):
+		_readOnly()
+
+	def addFindClass(self,*args,**kwargs):
+		_readOnly()
+
+	def addCrop(self,*args,**kwargs):
+		_readOnly()
+
+	def addOwner(self,*args,**kwargs):
+		_readOnly()
+
+	def _snapshot(self,areaId):
+		"""Private method returning the open snapshot for an area, reopening it if the file was replaced"""
+
+		assert self._conn != None #Check connection open
+		path = snapshotPath(self._readDir,areaId)
+		try:
+			stat = os.stat(path)
+		except OSError:
+			raise Exception("Cannot Find Requested Map Area")
+		key = (stat.st_ino,stat.st_mtime_ns,stat.st_size)
+		cached = self._snapshots.get(path)
+		hit = cached != None and cached[0] == key
+		getMetrics().recordCache('snapshot',hit)
+		if not hit:
+			cached = (key,AreaSnapshot(path))
+			self._snapshots[path] = cached
+		return cached[1]
+
+
+def _groupCodes(snapshot,prefix,names,extra=None,values=None):
+	"""Private function returning (codes, count) or (codes, count, values sum) of each distinct row of string columns
+
+	Keyword arguments:
+	snapshot -- AreaSnapshot
+	prefix -- column prefix e.g. find.
+	names -- string column names grouped by
+	extra -- numpy array of integer codes also grouped by, the last of the codes (default None)
+	values -- numpy array summed per group (default None)
+	"""
+
+	columns = [snapshot.column(prefix + name) for name in names]
+	if extra is not None:
+		columns.append(extra.reshape(-1))
+	codes = np.stack(columns,axis=1).reshape(-1,len(columns))
+	if len(codes) == 0:
+		return []
+	groups,inverse,counts = np.unique(codes,axis=0,return_inverse=True,return_counts=True)
+	if values is None:
+		return [(groups[i],int(counts[i])) for i in range(len(groups))]
+	sums = np.bincount(inverse.reshape(-1),weights=values,minlength=len(groups))
+	return [(groups[i],int(counts[i]),float(sums[i])) for i in range(len(groups))]
+
+def _readOnly():
+	"""Private function raising the read only error"""
+
+	raise Exception('Snapshot database is read only')
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+import heapq
+import threading
+from collections import OrderedDict
+import numpy as np
+from .metrics import getMetrics
+__all__ = ['FindIndex','FindIndexCache','SpatialQuery']
+
+#Most finds in a leaf, leaves are searched with one numpy expression
+_LEAF_SIZE = 32
+
+
+class FindIndex(object):
+	"""KD-tree over the find coordinates of an area
+
+	The tree is built once with numpy partitions into flat node arrays. Finds are reordered so
+	each node covers a contiguous slice and searches prune nodes by their bounding boxes.
+	"""
+
+	def __init__(self,ids,points,leafSize=_LEAF_SIZE):
+		"""Build the tree
+
+		Keyword arguments:
+		ids -- find ids
+		points -- (n,2) array of find x,y
+		leafSize -- most finds in a leaf node (default 32)
+		"""
+
+		ids = np.asarray(ids,dtype=np.int64)
+		points = np.asarray(points,dtype=np.float64).reshape(-1,2)
+		order = np.arange(len(ids))
+		starts = []
+		ends = []
+		children = []
+
+		#Split each node at the median of its widest side until leaves are small
+		stack = []
+		if len(ids) > 0:
+			starts.append(0)
+			ends.append(len(ids))
+			children.append(None)
+			stack.append(0)
+		while len(stack) > 0:
+			node = stack.pop()
+			start,end = starts[node],ends[node]
+			if end - start <= leafSize:
+				continue
+			nodePoints = points[order[start:end]]
+			dim = int(np.argmax(nodePoints.max(0) - nodePoints.min(0)))
+			mid = (start + end) // 2
+			order[start:end] = order[start:end][np.argpartition(nodePoints[:,dim],mid - start)]
+			children[node] = (len(starts),len(starts) + 1)
+			for childStart,childEnd in [(start,mid),(mid,end)]:
+				starts.append(childStart)
+				ends.append(childEnd)
+				children.append(None)
+				stack.append(len(starts) - 1)
+
+		self._ids = ids[order]
+		self._points = points[order]
+		self._starts = starts
+		self._ends = ends
+		self._children = children
+		self._lows = np.array([self._points[s:e].min(0) for s,e in zip(starts,ends)]).reshape(-1,2)
+		self._highs = np.array([self._points[s:e].max(0) for s,e in zip(starts,ends)]).reshape(-1,2)
+		self._positions = dict(zip(self._ids.tolist(),range(len(self._ids))))
+
+	def __len__(self):
+		return len(self._ids)
+
+	def within(self,x,y,radius):
+		"""Return list of (find id, distance) within radius of x,y, nearest first
+
+		Keyword arguments:
+		x,y -- centre
+		radius -- search radius in area units
+		"""
+
+		centre = np.array([x,y],dtype=np.float64)
+		slices = []
+		stack = [0] if len(self._ids) > 0 else []
+		while len(stack) > 0:
+			node = stack.pop()
+			if self._boxDistance(node,centre) > radius:
+				continue
+			#Nodes wholly inside the circle need no distance tests
+			far = np.maximum(np.abs(self._lows[node] - centre),np.abs(self._highs[node] - centre))
+			if self._children[node] == None or np.hypot(far[0],far[1]) <= radius:
+				slices.append((self._starts[node],self._ends[node]))
+			else:
+				stack.extend(self._children[node])
+		return self._closest(slices,centre,radius)
+
+	def nearest(self,x,y,k):
+		"""Return list of the k (find id, distance) nearest x,y, nearest first
+
+		Keyword arguments:
+		x,y -- centre
+		k -- number of finds
+		"""
+
+		centre = np.array([x,y],dtype=np.float64)
+		bestIds = np.zeros(0,dtype=np.int64)
+		bestDistances = np.zeros(0)
+		heap = [(self._boxDistance(0,centre),0)] if len(self._ids) > 0 and k > 0 else []
+		while len(heap) > 0:
+			distance,node = heapq.heappop(heap)
+			#Remaining nodes are all further than the kth find found
+			if len(bestIds) == k and distance > bestDistances[-1]:
+				break
+			if self._children[node] != None:
+				for child in self._children[node]:
+					heapq.heappush(heap,(self._boxDistance(child,centre),child))
+				continue
+			start,end = self._starts[node],self._ends[node]
+			ids = np.concatenate([bestIds,self._ids[start:end]])
+			distances = np.concatenate([bestDistances,self._distances(start,end,centre)])
+			keep = np.lexsort((ids,distances))[:k]
+			bestIds = ids[keep]
+			bestDistances = distances[keep]
+		return list(zip(bestIds.tolist(),bestDistances.tolist()))
+
+	def inBox(self,lowX,lowY,hiX,hiY):
+		"""Return sorted list of find ids with lowX <= x <= hiX and lowY <= y <= hiY
+
+		Keyword arguments:
+		lowX,lowY,hiX,hiY -- box corners
+		"""
+
+		low = np.array([lowX,lowY],dtype=np.float64)
+		high = np.array([hiX,hiY],dtype=np.float64)
+		found = []
+		stack = [0] if len(self._ids) > 0 else []
+		while len(stack) > 0:
+			node = stack.pop()
+			if np.any(self._highs[node] < low) or np.any(self._lows[node] > high):
+				continue
+			start,end = self._starts[node],self._ends[node]
+			if np.all(self._lows[node] >= low) and np.all(self._highs[node] <= high):
+				found.append(self._ids[start:end])
+			elif self._children[node] == None:
+				points = self._points[start:end]
+				found.append(self._ids[start:end][np.all((points >= low) & (points <= high),axis=1)])
+			else:
+				stack.extend(self._children[node])
+		return sorted(np.concatenate(found).tolist()) if len(found) > 0 else []
+
+	def points(self,findIds):
+		"""Return (n,2) array of the x,y of find ids in the index
+
+		Keyword arguments:
+		findIds -- list of find ids
+		"""
+
+		return self._points[[self._positions[findId] for findId in findIds]].reshape(-1,2)
+
+	def _boxDistance(self,node,centre):
+		"""Private method returning the distance from centre to a node bounding box"""
+
+		gap = np.maximum(np.maximum(self._lows[node] - centre,centre - self._highs[node]),0)
+		return float(np.hypot(gap[0],gap[1]))
+
+	def _distances(self,start,end,centre):
+		"""Private method returning the distances from centre to a slice of finds"""
+
+		offsets = self._points[start:end] - centre
+		return np.hypot(offsets[:,0],offsets[:,1])
+
+	def _closest(self,slices,centre,radius):
+		"""Private method returning (id, distance) of the finds in slices within radius, nearest first"""
+
+		if len(slices) == 0:
+			return []
+		ids = np.concatenate([self._ids[s:e] for s,e in slices])
+		distances = np.concatenate([self._distances(s,e,centre) for s,e in slices])
+		inside = distances <= radius
+		ids = ids[inside]
+		distances = distances[inside]
+		order = np.lexsort((ids,distances))
+		return list(zip(ids[order].tolist(),distances[order].tolist()))
+
+
+class FindIndexCache(object):
+	"""Bounded in memory cache of find indexes keyed by area, data version and find filter
+
+	A write raises the area data version so a new index is built and the older versions of the
+	area are dropped when it is stored.
+	"""
+
+	def __init__(self,maxEntries=16):
+		"""Initialise object
+
+		Keyword arguments:
+		maxEntries -- most indexes kept (default 16)
+		"""
+
+		self._maxEntries = maxEntries
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self,areaId,version,filterKey):
+		"""Return the cached FindIndex or None
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		version -- area data version
+		filterKey -- FindFilter key, '' for no filter
+		"""
+
+		key = (areaId,version,filterKey)
+		with self._lock:
+			index = self._entries.get(key)
+			if index != None:
+				self._entries.move_to_end(key)
+		getMetrics().recordCache('findIndex',index != None)
+		return index
+
+	def put(self,areaId,version,filterKey,index):
+		"""Store an index, removing those of older versions of the area
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		version -- area data version
+		filterKey -- FindFilter key, '' for no filter
+		index -- FindIndex
+		"""
+
+		with self._lock:
+			for key in [key for key in self._entries if key[0] == areaId and key[1] != version]:
+				del self._entries[key]
+			self._entries[(areaId,version,filterKey)] = index
+			while len(self._entries) > self._maxEntries:
+				self._entries.popitem(last=False)
+
+	def invalidate(self,areaId):
+		"""Remove every index of an area
+
+		Keyword arguments:
+		areaId -- Id of MapArea
+		"""
+
+		with self._lock:
+			for key in [key for key in self._entries if key[0] == areaId]:
+				del self._entries[key]
+
+
+class SpatialQuery(object):
+	"""Radius, nearest or box query over the finds of an area
+
+	Set from the Near (x,y) and Radius or Nearest (k) website parameters, or from Within
+	(lowX,lowY,hiX,hiY). The find filter limits the finds searched, e.g. FilterClass for the
+	nearest finds of a class.
+	"""
+
+	#Query string parameters read by fromParams
+	PARAMS = ['Near','Radius','Nearest','Within']
+
+	def __init__(self,kind,values):
+		"""Initialise object
+
+		Keyword arguments:
+		kind -- radius, nearest or box
+		values -- (x,y,radius), (x,y,k) or (lowX,lowY,hiX,hiY)
+		"""
+
+		if kind not in ['radius','nearest','box']:
+			raise Exception('Spatial query must be radius, nearest or box')
+		try:
+			values = [float(value) for value in values]
+		except (TypeError,ValueError):
+			raise Exception('Spatial query values must be numbers')
+		if kind == 'box' and len(values) != 4:
+			raise Exception('Within must be lowX,lowY,hiX,hiY')
+		if kind != 'box' and len(values) != 3:
+			raise Exception('Near must be x,y')
+		if kind == 'radius' and values[2] < 0:
+			raise Exception('Radius must be >= 0')
+		if kind == 'nearest':
+			if values[2] < 1 or values[2] != int(values[2]):
+				raise Exception('Nearest must be a whole number > 0')
+			values[2] = int(values[2])
+		self._kind = kind
+		self._values = tuple(values)
+
+	@classmethod
+	def fromParams(cls,params):
+		"""Create query from website parameters, None if no query parameters are set
+
+		Keyword arguments:
+		params -- a dictonary of parameters submitted from browser
+		"""
+
+		values = dict([(key,params[key].value) for key in cls.PARAMS if key in params and params[key].value != ''])
+		if 'Within' in values:
+			return cls('box',values['Within'].split(','))
+		if 'Near' not in values:
+			return None
+		near = values['Near'].split(',')
+		if 'Radius' in values:
+			return cls('radius',near + [values['Radius']])
+		if 'Nearest' in values:
+			return cls('nearest',near + [values['Nearest']])
+		raise Exception('Near needs Radius or Nearest')
+
+	def run(self,index):
+		"""Return list of (find id, distance), distance None for box queries
+
+		Keyword arguments:
+		index -- FindIndex of the area
+		"""
+
+		if self._kind == 'radius':
+			return index.within(*self._values)
+		if self._kind == 'nearest':
+			return index.nearest(*self._values)
+		return [(findId,None) for findId in index.inBox(*self._values)]
+
+	def description(self,results):
+		"""Return text describing the query and its results for the status message
+
+		Keyword arguments:
+		results -- list from run
+		"""
+
+		if self._kind == 'radius':
+			text = '%d finds within %s of %s,%s' % (len(results),_format(self._values[2]),_format(self._values[0]),_format(self._values[1]))
+		elif self._kind == 'nearest':
+			text = '%d nearest finds to %s,%s' % (len(results),_format(self._values[0]),_format(self._values[1]))
+		else:
+			text = '%d finds within box %s' % (len(results),','.join([_format(value) for value in self._values]))
+		if len(results) > 0:
+			text = text + ': ' + ', '.join([str(findId) for findId,distance in results[:20]]) + (' ...' if len(results) > 20 else '')
+		return text
+
+	@property
+	def kind(self):
+		return self._kind
+
+	@property
+	def values(self):
+		return self._values
+
+
+def _format(value):
+	"""Private function formatting a number without a trailing .0"""
+
+	return str(int(value)) if value == int(value) else str(value)
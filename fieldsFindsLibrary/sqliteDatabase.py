@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+import itertools
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from urllib.request import pathname2url
+from .database import DbFieldsFinds, _timed
+from .migrations import applyMigrations
+__all__ = ['DbFieldsFindsSqlite']
+
+#Location of the SQLite schema and demo data scripts
+_sqlDir = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','sql','sqlite')
+
+#Oracle schema prefix removed from statements
+_schemaPrefix = re.compile(r'\bs1783947\.',re.IGNORECASE)
+
+#Store dates as iso text and read DATE columns back as dates like cx_Oracle
+sqlite3.register_adapter(date,lambda d: d.isoformat())
+sqlite3.register_converter('DATE',lambda b: datetime.strptime(b.decode()[:10],'%Y-%m-%d'))
+
+#Unique names for the shared in-memory databases
+_memoryIds = itertools.count(1)
+
+
+class DbFieldsFindsSqlite(DbFieldsFinds):
+	"""SQLite stand-in for the fields and finds database
+
+	Runs all DbFieldsFinds queries unchanged against a local SQLite database so the website,
+	benchmarks and tests can run without the Oracle instance. A new database is created from
+	sql/sqlite/CreateSchema.sql and sql/sqlite/DemoData.sql then the sql/migrations/sqlite
+	migrations are applied.
+	"""
+
+	dialect = 'sqlite'
+
+	def __init__(self,path=':memory:',demoData=True,migrate=True):
+		"""Initialise object
+
+		Keyword arguments:
+		path -- database file, or :memory: for a private in-memory database (default :memory:)
+		demoData -- load the demo areas when creating a new database (default True)
+		migrate -- apply pending migrations when connecting (default True)
+		"""
+
+		DbFieldsFinds.__init__(self)
+		self._path = path
+		self._demoData = demoData
+		self._migrate = migrate
+		self._sqlite = None
+		
+		#In-memory databases use a named shared cache so sessions on other threads see the same data
+		if path == ':memory:':
+			self._uri = 'file:ffmemory' + str(next(_memoryIds)) + '?mode=memory&cache=shared'
+		else:
+			self._uri = 'file:' + pathname2url(os.path.abspath(path))
+
+	@_timed
+	def openConnection(self):
+		"""Open Connection
+
+		An in-memory database is kept between connections so its data is not lost
+		"""
+
+		if self._sqlite == None or self._path != ':memory:':
+			self._sqlite = self._connect()
+			self._createSchema()
+			if self._migrate:
+				applyMigrations(_SqliteConnection(self._sqlite),self.dialect)
+		self._conn = self._instrument(_SqliteConnection(self._sqlite))
+
+	def closeConnection(self):
+		"""Close Connection
+
+		Uncommitted statements are rolled back so a rejected add does not keep the database
+		locked. File databases are closed, in-memory ones are kept so their data is not lost
+		"""
+
+		DbFieldsFinds.closeConnection(self)
+		self._sqlite.rollback()
+		if self._path != ':memory:':
+			self._sqlite.close()
+			self._sqlite = None
+
+	def loadRows(self,table,columns,rows):
+		"""Bulk insert rows and commit
+
+		Loaded fields and finds are copied into the denormalized tables by the migration triggers.
+
+		Keyword arguments:
+		table -- table name
+		columns -- list of column names
+		rows -- list of row tuples in column order
+		"""
+
+		assert self._conn != None #Check connection open
+		sql = 'Insert Into ' + table + ' (' + ','.join(columns) + ') Values (' + ','.join(['?']*len(columns)) + ')'
+		self._sqlite.executemany(sql,rows)
+		self._sqlite.commit()
+
+	def _insertField(self,cursor,areaName,lowX,hiX,lowY,hiY,area,owner,cropName):
+		"""Private method adding a field with one guarded Insert Select
+
+		SQLite has no stored procedures so the checks are conditions of the insert and the
+		migration triggers copy the row into the denormalized table. When no row is inserted
+		the checks are run again one by one to raise the error.
+		"""
+
+		source = self._source('field')
+		sql = ("Insert Into s1783947.FF_FIELDS_NEW (FIELD_ID,LOWX,HIX,LOWY,HIY,AREA,OWNER,CROP,AREA_ID) "
+				"Select (Select coalesce(Max(FIELD_ID),0)+1 from " + source + "),:LowX,:HiX,:LowY,:HiY,:Area,:Owner,C.CROP,A.AREA_ID "
+				"from s1783947.FF_AREA A, s1783947.VIEW_CROP_COMB C where A.AREA_NAME=:AreaName and C.NAME=:CropName "
+				"and :HiX<=A.MAX_X and :HiY<=A.MAX_Y "
+				"and (Select count(*) from s1783947.FF_AREA where AREA_NAME=:AreaName)=1 "
+				"and (Select count(*) from s1783947.VIEW_CROP_COMB where NAME=:CropName)=1 "
+				"and not exists (Select FIELD_ID from " + source + " F where F.AREA_ID=A.AREA_ID and "
+				"((:InLowX > LOW_X and :InLowX < HI_X and :InLowY > LOW_Y and :InLowY < HI_Y) or (:InHiX > LOW_X and :InHiX < HI_X and :InLowY > LOW_Y and :InLowY < HI_Y) or "
+				"(:InLowX > LOW_X and :InLowX < HI_X and :InHiY > LOW_Y and :InHiY < HI_Y) or (:InHiX > LOW_X and :InHiX < HI_X and :InHiY > LOW_Y and :InHiY < HI_Y))) "
+				"Returning FIELD_ID,AREA_ID")
+		cursor.execute(sql,AreaName=areaName,LowX=lowX,HiX=hiX,LowY=lowY,HiY=hiY,Area=area,Owner=owner,CropName=cropName,InLowX=lowX+0.1,InLowY=lowY+0.1,InHiX=hiX-0.1,InHiY=hiY-0.1)
+		row = cursor.fetchone()
+		if row != None:
+			return row[0],row[1]
+
+		#Nothing inserted so find the first failed check
+		mapArea = self.getMapArea(areaName)
+		if hiX > mapArea.maxX or hiY > mapArea.maxY: raise Exception('X coordinate must be within area bounds')
+		self._checkIntersect(mapArea.areaId,lowX,lowY,hiX,hiY)
+		self._checkName(cursor,"Select CROP from s1783947.VIEW_CROP_COMB where NAME=:Name",cropName,'Crop does not exist: ','Duplicate crop in database: ')
+		raise Exception('Field not added')
+
+	def _insertFind(self,cursor,areaName,x,y,typeName,depth,notes,imgPath):
+		"""Private method adding a find with one guarded Insert Select
+
+		As _insertField, the migration triggers copy the row into the denormalized table and the
+		checks are run again one by one to raise the error when no row is inserted.
+		"""
+
+		source = self._source('find')
+		sql = ("Insert Into s1783947.FF_FINDS_NEW (FIND_ID,XCOORD,YCOORD,TYPE,DEPTH,FIELD_NOTES,AREA_ID,IMAGE_PATH) "
+				"Select (Select coalesce(Max(OBJECT_ID),0)+1 from " + source + "),:X,:Y,C.TYPE,:Depth,:Notes,A.AREA_ID,:ImgPath "
+				"from s1783947.FF_AREA A, s1783947.VIEW_CLASS_COMB C where A.AREA_NAME=:AreaName and C.NAME=:TypeName "
+				"and :X<=A.MAX_X and :Y<=A.MAX_Y "
+				"and (Select count(*) from s1783947.FF_AREA where AREA_NAME=:AreaName)=1 "
+				"and (Select count(*) from s1783947.VIEW_CLASS_COMB where NAME=:TypeName)=1 "
+				"and not exists (Select OBJECT_ID from " + source + " F where F.AREA_ID=A.AREA_ID and F.X=:X and F.Y=:Y) "
+				"Returning FIND_ID,AREA_ID")
+		cursor.execute(sql,AreaName=areaName,X=x,Y=y,TypeName=typeName,Depth=depth,Notes=notes,ImgPath=imgPath)
+		row = cursor.fetchone()
+		if row != None:
+			return row[0],row[1]
+
+		#Nothing inserted so find the first failed check
+		mapArea = self.getMapArea(areaName)
+		if x > mapArea.maxX: raise Exception('X coordinate must be within area bounds')
+		if y > mapArea.maxY: raise Exception('Y coordinate must be within area bounds')
+		self._checkFindCoord(mapArea.areaId,x,y)
+		self._checkName(cursor,"Select TYPE from s1783947.VIEW_CLASS_COMB where NAME=:Name",typeName,'Type does not exist: ','Duplicate Type in database: ')
+		raise Exception('Find not added')
+
+	def _checkName(self,cursor,sql,name,missing,duplicate):
+		"""Private method raising when a crop or find class name does not match exactly one row"""
+
+		cursor.execute(sql,Name=name)
+		count = len(cursor.fetchall())
+		if count == 0:
+			raise Exception(missing + name)
+		elif count > 1:
+			raise Exception(duplicate + name)
+
+	def _acquireSession(self):
+		"""Private method opening a separate connection to the same database"""
+		
+		return _SqliteConnection(self._connect())
+	
+	def _releaseSession(self,rawConn):
+		"""Private method closing a session connection"""
+		
+		rawConn.closeSqlite()
+	
+	def _connect(self):
+		"""Private method opening a configured sqlite connection"""
+		
+		conn = sqlite3.connect(self._uri,detect_types=sqlite3.PARSE_DECLTYPES,check_same_thread=False,uri=True)
+		conn.execute('PRAGMA foreign_keys = ON')
+		conn.create_function('TO_DATE',2,lambda value,fmt: value)
+		return conn
+	
+	def _createSchema(self):
+		"""Private method creating the schema and demo data in a new database"""
+
+		cursor = self._sqlite.execute("Select count(*) from sqlite_master where type='table' and name='FF_AREA'")
+		if cursor.fetchone()[0] > 0:
+			return
+		scripts = ['CreateSchema.sql']
+		if self._demoData:
+			scripts.append('DemoData.sql')
+		for script in scripts:
+			with open(os.path.join(_sqlDir,script),'r') as sqlFile:
+				self._sqlite.executescript(sqlFile.read())
+		self._sqlite.commit()
+
+
+class _SqliteConnection(object):
+	"""Wraps a sqlite3 connection with the parts of the cx_Oracle connection interface used"""
+
+	def __init__(self,conn):
+		self._conn = conn
+
+	def cursor(self):
+		return _SqliteCursor(self._conn.cursor())
+
+	def commit(self):
+		self._conn.commit()
+
+	def rollback(self):
+		self._conn.rollback()
+
+	def close(self):
+		#The sqlite connection is owned by DbFieldsFindsSqlite so it can be reused
+		pass
+	
+	def closeSqlite(self):
+		self._conn.close()
+
+
+class _SqliteCursor(object):
+	"""Wraps a sqlite3 cursor to accept cx_Oracle keyword binds and count rows like cx_Oracle"""
+
+	def __init__(self,cursor):
+		self._cursor = cursor
+		self.rowcount = 0
+
+	def execute(self,sql,**binds):
+		self._cursor.execute(_schemaPrefix.sub('',sql),binds)
+		#cx_Oracle counts rows fetched so far for queries and rows changed for dml
+		self.rowcount = max(self._cursor.rowcount,0)
+
+	def fetchone(self):
+		row = self._cursor.fetchone()
+		if row != None:
+			self.rowcount = self.rowcount + 1
+		return row
+
+	def fetchmany(self,numRows):
+		rows = self._cursor.fetchmany(numRows)
+		self.rowcount = self.rowcount + len(rows)
+		return rows
+
+	def fetchall(self):
+		rows = self._cursor.fetchall()
+		self.rowcount = self.rowcount + len(rows)
+		return rows
+
+	def __iter__(self):
+		for row in self._cursor:
+			self.rowcount = self.rowcount + 1
+			yield row
+
+	@property
+	def description(self):
+		return self._cursor.description
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlencode
+from .dbSource import dbFromSource
+from .website import WebsiteFieldsFinds, paramsFromQuery
+__all__ = ['prerenderSite','staticPageName']
+
+#Manifest of page hashes kept in the output folder for incremental runs
+_MANIFEST = 'manifest.json'
+
+#Database opened once in each worker process
+_workerDb = None
+
+
+def staticPageName(areaId,filterClass=None):
+	"""Return the static page file name for an area and optional class filter
+
+	Keyword arguments:
+	areaId -- Id of MapArea
+	filterClass -- class name or None for the unfiltered page (default None)
+	"""
+
+	if filterClass == None:
+		return 'area_' + str(areaId) + '.html'
+	#Class names are free text so keep a readable part plus a hash for uniqueness
+	slug = re.sub('[^A-Za-z0-9]+','_',filterClass).strip('_')
+	digest = hashlib.sha1(filterClass.encode('utf-8')).hexdigest()[:8]
+	return 'area_' + str(areaId) + '_' + slug + '_' + digest + '.html'
+
+def prerenderSite(source,outDir,processes=None,incremental=False):
+	"""Pre-render the full page of every area, unfiltered and for each class, as static html
+
+	Areas are rendered in a process pool, each worker opening its own database. In incremental
+	mode the unfiltered page of each area is rendered and hashed first and the remaining pages
+	are only rendered when the hash differs from the last run, so unchanged areas cost one page.
+	Returns a summary dictionary.
+
+	Keyword arguments:
+	source -- database source string for dbFromSource, SQLite sources must be files
+	outDir -- folder the static pages are written to
+	processes -- worker processes, one per core if None (default None)
+	incremental -- skip areas whose pages are unchanged since the last run (default False)
+	"""
+
+	start = time.perf_counter()
+	if not os.path.isdir(outDir):
+		os.makedirs(outDir)
+
+	#Area ids are needed up front for the links between pages
+	db = dbFromSource(source)
+	db.openConnection()
+	areaIds = dict([(areaName,db.getMapArea(areaName).areaId) for areaName in db.getMapAreaList()])
+	classList = db.getClassList()
+	db.closeConnection()
+	areaLinks = dict([(areaName,staticPageName(areaId)) for areaName,areaId in areaIds.items()])
+
+	manifest = {}
+	manifestPath = os.path.join(outDir,_MANIFEST)
+	if incremental and os.path.exists(manifestPath):
+		with open(manifestPath,'r') as manifestFile:
+			manifest = json.load(manifestFile)
+
+	areaNames = sorted(areaIds)
+	tasks = [(areaName,areaIds[areaName],areaLinks,classList,outDir,manifest.get(areaName)) for areaName in areaNames]
+	with ProcessPoolExecutor(max_workers=processes,initializer=_initWorker,initargs=(source,)) as pool:
+		results = list(pool.map(_renderArea,tasks))
+
+	#Remove pages of deleted areas and classes
+	newManifest = dict([(result['areaName'],{'hash':result['hash'],'files':result['files']}) for result in results])
+	keep = set([_MANIFEST,'index.html'])
+	for entry in newManifest.values():
+		keep.update(entry['files'])
+	for entry in manifest.values():
+		for fileName in entry['files']:
+			if fileName not in keep and os.path.exists(os.path.join(outDir,fileName)):
+				os.remove(os.path.join(outDir,fileName))
+
+	#Default area is the landing page
+	if 'Default' in areaLinks:
+		with open(os.path.join(outDir,areaLinks['Default']),'r') as defaultPage:
+			_replaceFile(os.path.join(outDir,'index.html'),defaultPage.read())
+	_replaceFile(manifestPath,json.dumps(newManifest,indent=1,sort_keys=True))
+
+	return {
+			'areas':len(results),
+			'renderedAreas':len([result for result in results if result['rendered']]),
+			'pages':sum([len(result['files']) for result in results if result['rendered']]),
+			'seconds':time.perf_counter() - start
+			}
+
+def _initWorker(source):
+	"""Private function creating the database of a worker process, each page opens and closes it"""
+
+	global _workerDb
+	_workerDb = dbFromSource(source)
+
+def _renderArea(task):
+	"""Private function rendering all pages of one area in a worker process"""
+
+	areaName,areaId,areaLinks,classList,outDir,previous = task
+	filterLinks = {'':staticPageName(areaId)}
+	for className in classList:
+		filterLinks[className] = staticPageName(areaId,className)
+
+	page = _renderPage(areaName,None,areaLinks,filterLinks)
+	pageHash = hashlib.sha1(page.encode('utf-8')).hexdigest()
+	files = [filterLinks['']] + [filterLinks[className] for className in classList]
+	if previous != None and previous['hash'] == pageHash and previous['files'] == files:
+		if all([os.path.exists(os.path.join(outDir,fileName)) for fileName in files]):
+			return {'areaName':areaName,'hash':pageHash,'files':files,'rendered':False}
+
+	_replaceFile(os.path.join(outDir,filterLinks['']),page)
+	for className in classList:
+		_replaceFile(os.path.join(outDir,filterLinks[className]),_renderPage(areaName,className,areaLinks,filterLinks))
+	return {'areaName':areaName,'hash':pageHash,'files':files,'rendered':True}
+
+def _renderPage(areaName,filterClass,areaLinks,filterLinks):
+	"""Private function rendering one static page without http headers"""
+
+	params = {'MapArea':areaName}
+	if filterClass != None:
+		params['FilterClass'] = filterClass
+	website = WebsiteFieldsFinds(paramsFromQuery(urlencode(params)),_workerDb)
+	website.setStaticLinks(areaLinks,filterLinks)
+	website.run()
+	return website.renderPage()
+
+def _replaceFile(path,text):
+	"""Private function writing text to a temporary file then renaming it over path"""
+
+	tmpPath = path + '.' + str(os.getpid()) + '.tmp'
+	with open(tmpPath,'w') as outFile:
+		outFile.write(text)
+	os.replace(tmpPath,path)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+import csv
+import heapq
+import os
+import numpy as np
+from .geoObjects import MAX_LARGE_AREA_SIZE
+__all__ = ['DEMO_REFERENCE','packFields','placeFinds','generateArea','writeSql','writeCsv','loadArea']
+
+#Crops, owners and find classes of the SQLite stand-in demo data
+DEMO_REFERENCE = {
+		'crops':[(1,'WHEAT'),(2,'BARLEY'),(3,'TURNIPS'),(4,'POTATOES')],
+		'owners':['MR MCDONALD','MRS BROWN','MR SMITH'],
+		'classes':[(1,'SHERD','ROMAN','COOKING'),(2,'COIN','ROMAN','CURRENCY'),
+					(3,'FLINT','NEOLITHIC','TOOL'),(4,'BROOCH','VIKING','ADORNMENT')]
+		}
+
+#Relative numbers of finds of a class, other classes count 2
+CLASS_WEIGHTS = {'SHERD':6,'FLINT':4,'COIN':2,'BROOCH':1}
+
+#Mean depth of finds of a period, older finds lie deeper, other periods use DEFAULT_DEPTH
+PERIOD_DEPTHS = {'NEOLITHIC':1.6,'BRONZE AGE':1.4,'IRON AGE':1.2,'ROMAN':0.9,'VIKING':0.7,'MEDIEVAL':0.5}
+DEFAULT_DEPTH = 1.0
+
+#Table columns in row order
+FIELD_COLUMNS = ['FIELD_ID','LOWX','HIX','LOWY','HIY','AREA','OWNER','CROP','AREA_ID']
+FIND_COLUMNS = ['FIND_ID','XCOORD','YCOORD','TYPE','DEPTH','FIELD_NOTES','AREA_ID','IMAGE_PATH']
+AREA_COLUMNS = ['AREA_ID','AREA_NAME','MAX_X','MAX_Y','IMAGE_PATH']
+
+#Finds per archaeological site the clustered finds are spread over
+_FINDS_PER_SITE = 500
+
+#Batches drawn before the remaining finds are scattered, from the free coordinates if there are at most _MAX_FREE_CELLS
+_CLUSTER_TRIES = 10
+_MAX_FREE_CELLS = 10000000
+
+
+def packFields(maxX,maxY,numFields,numOwners,rng,fill=0.7):
+	"""Return (n,4) lowX,lowY,hiX,hiY array of non-overlapping fields and the owner index of each
+
+	The area is packed by repeatedly cutting the largest rectangle across its longer side at a
+	random point, then each field takes a random part of its rectangle so hedges and rough
+	ground are left between them. Rectangles are given to owners once there are as many as
+	owners so each owner's fields lie together.
+
+	Keyword arguments:
+	maxX,maxY -- area size
+	numFields -- number of fields
+	numOwners -- number of owners
+	rng -- numpy RandomState
+	fill -- least share of each side of its rectangle a field takes (default 0.7)
+	"""
+
+	if numFields > maxX * maxY:
+		raise Exception('Area ' + str(maxX) + 'x' + str(maxY) + ' is too small for ' + str(numFields) + ' fields')
+	cuts = rng.uniform(0.3,0.7,max(numFields,1))
+	owners = rng.permutation(numOwners)
+	#Heap of (-size, order, lowX, lowY, hiX, hiY, owner) so the largest rectangle is cut next
+	cells = [(-maxX * maxY,0,0,0,maxX,maxY,owners[0] if numOwners == 1 else -1)]
+	order = 1
+	while len(cells) < numFields:
+		size,created,lowX,lowY,hiX,hiY,owner = heapq.heappop(cells)
+		width = hiX - lowX
+		height = hiY - lowY
+		#The largest rectangle has a side of 2 or more as there are fewer fields than cells
+		if width >= height:
+			split = lowX + min(max(int(round(width * cuts[len(cells)])),1),width - 1)
+			halves = [(lowX,lowY,split,hiY),(split,lowY,hiX,hiY)]
+		else:
+			split = lowY + min(max(int(round(height * cuts[len(cells)])),1),height - 1)
+			halves = [(lowX,lowY,hiX,split),(lowX,split,hiX,hiY)]
+		for box in halves:
+			heapq.heappush(cells,(-(box[2] - box[0]) * (box[3] - box[1]),order,box[0],box[1],box[2],box[3],owner))
+			order = order + 1
+		if len(cells) == numOwners:
+			cells = [cell[:6] + (owners[i],) for i,cell in enumerate(cells)]
+			heapq.heapify(cells)
+
+	#Ids run along the rows of fields
+	cells.sort(key=lambda cell: (cell[3],cell[2]))
+	boxes = np.array([cell[2:6] for cell in cells],dtype=np.int64).reshape(-1,4)
+	ownerIndex = np.array([cell[6] if cell[6] >= 0 else owners[i % numOwners] for i,cell in enumerate(cells)],dtype=np.int64)
+
+	#Shrink each field within its rectangle
+	sizes = boxes[:,2:] - boxes[:,:2]
+	kept = np.maximum(np.round(sizes * rng.uniform(fill,1.0,sizes.shape)).astype(np.int64),1)
+	offsets = np.floor((sizes - kept + 1) * rng.uniform(0,1,sizes.shape)).astype(np.int64)
+	lows = boxes[:,:2] + np.minimum(offsets,sizes - kept)
+	return np.concatenate([lows,lows + kept],axis=1),ownerIndex
+
+def placeFinds(maxX,maxY,numFinds,classes,rng,clustered=0.7):
+	"""Return (n,2) x,y array of finds at unique coordinates, their class index and depth
+
+	Most finds lie in clusters around sites of one period, the rest are scattered over the
+	area. Classes are drawn by CLASS_WEIGHTS, from the site period's classes for clustered
+	finds. Depths follow a gamma distribution around the period's PERIOD_DEPTHS mean.
+
+	Keyword arguments:
+	maxX,maxY -- area size
+	numFinds -- number of finds
+	classes -- list of (id, name, period, use) of the find classes
+	rng -- numpy RandomState
+	clustered -- share of the finds in site clusters (default 0.7)
+	"""
+
+	cellCount = (maxX + 1) * (maxY + 1)
+	if numFinds > cellCount:
+		raise Exception('Area ' + str(maxX) + 'x' + str(maxY) + ' has fewer than ' + str(numFinds) + ' find coordinates')
+	weights = np.array([CLASS_WEIGHTS.get(cls[1],2) for cls in classes],dtype=np.float64)
+	periods = sorted(set([cls[2] for cls in classes]))
+	periodOf = np.array([periods.index(cls[2]) for cls in classes],dtype=np.int64)
+	periodWeights = np.bincount(periodOf,weights=weights,minlength=len(periods))
+
+	#Sites each have a centre, spread and period
+	numSites = max(1,numFinds // _FINDS_PER_SITE)
+	centres = rng.uniform(0,1,(numSites,2)) * [maxX,maxY]
+	spreads = rng.uniform(0.005,0.03,numSites) * max(maxX,maxY) + 1
+	sitePeriods = rng.choice(len(periods),numSites,p=periodWeights / periodWeights.sum())
+
+	keys = np.zeros(0,dtype=np.int64)
+	classIndex = np.zeros(0,dtype=np.int64)
+	tries = 0
+	while len(keys) < numFinds:
+		wanted = numFinds - len(keys)
+		if tries >= _CLUSTER_TRIES and cellCount <= _MAX_FREE_CELLS:
+			#Crowded areas take the rest from the free coordinates
+			batchKeys = rng.choice(np.setdiff1d(np.arange(cellCount),keys),wanted,replace=False)
+			batchClasses = rng.choice(len(classes),wanted,p=weights / weights.sum())
+		else:
+			batch = int(wanted * 1.2) + 10
+			points = np.round(rng.uniform(0,1,(batch,2)) * [maxX,maxY]).astype(np.int64)
+			batchClasses = rng.choice(len(classes),batch,p=weights / weights.sum())
+			inSite = rng.uniform(0,1,batch) < (clustered if tries < _CLUSTER_TRIES else 0)
+			sites = rng.randint(0,numSites,batch)[inSite]
+			offsets = rng.normal(0,1,(len(sites),2)) * spreads[sites][:,None]
+			points[inSite] = np.round(centres[sites] + offsets).astype(np.int64)
+			batchClasses[inSite] = _periodClasses(sitePeriods[sites],periodOf,weights,rng)
+			points = np.clip(points,0,[maxX,maxY])
+			batchKeys = points[:,1] * (maxX + 1) + points[:,0]
+		tries = tries + 1
+
+		#Keep the first find at each coordinate
+		keys = np.concatenate([keys,batchKeys])
+		classIndex = np.concatenate([classIndex,batchClasses])
+		first = np.sort(np.unique(keys,return_index=True)[1])[:numFinds]
+		keys = keys[first]
+		classIndex = classIndex[first]
+
+	means = np.array([PERIOD_DEPTHS.get(cls[2],DEFAULT_DEPTH) for cls in classes])[classIndex]
+	depths = np.clip(np.round(rng.gamma(4.0,means / 4.0),2),0.01,30)
+	points = np.stack([keys % (maxX + 1),keys // (maxX + 1)],axis=1)
+	return points,classIndex,depths
+
+def _periodClasses(sitePeriods,periodOf,weights,rng):
+	"""Private function drawing a class of each site period by class weight"""
+
+	chosen = np.zeros(len(sitePeriods),dtype=np.int64)
+	for period in np.unique(sitePeriods):
+		rows = np.nonzero(sitePeriods == period)[0]
+		candidates = np.nonzero(periodOf == period)[0]
+		chosen[rows] = rng.choice(candidates,len(rows),p=weights[candidates] / weights[candidates].sum())
+	return chosen
+
+def generateArea(areaId,areaName,maxX,maxY,numFields,numFinds,reference=None,seed=1,firstId=None):
+	"""Return the FF_AREA, FF_FIELDS_NEW and FF_FINDS_NEW rows of a synthetic area
+
+	The same arguments and seed always give the same rows. Returns a list of
+	(table, columns, rows) in load order.
+
+	Keyword arguments:
+	areaId -- new area id
+	areaName -- new area name
+	maxX,maxY -- area size, up to MAX_LARGE_AREA_SIZE
+	numFields -- number of fields
+	numFinds -- number of finds
+	reference -- crops, owners and classes as DbFieldsFinds.getReferenceRows, DEMO_REFERENCE if None (default None)
+	seed -- random seed (default 1)
+	firstId -- first field and find id, areaId * 10000000 if None (default None)
+	"""
+
+	if maxX < 1 or maxY < 1 or maxX > MAX_LARGE_AREA_SIZE or maxY > MAX_LARGE_AREA_SIZE:
+		raise Exception('Area sides must be 1 to ' + str(MAX_LARGE_AREA_SIZE))
+	reference = reference if reference != None else DEMO_REFERENCE
+	for kind in ['crops','owners','classes']:
+		if len(reference[kind]) == 0:
+			raise Exception('No ' + kind + ' to reference')
+	firstId = firstId if firstId != None else int(areaId) * 10000000
+	rng = np.random.RandomState(seed)
+
+	fieldRows = []
+	if numFields > 0:
+		boxes,ownerIndex = packFields(maxX,maxY,numFields,len(reference['owners']),rng)
+		crops = rng.randint(0,len(reference['crops']),numFields)
+		for i,(lowX,lowY,hiX,hiY) in enumerate(boxes.tolist()):
+			fieldRows.append((firstId + i,lowX,hiX,lowY,hiY,(hiX - lowX) * (hiY - lowY),
+							reference['owners'][ownerIndex[i]],reference['crops'][crops[i]][0],areaId))
+
+	findRows = []
+	if numFinds > 0:
+		points,classIndex,depths = placeFinds(maxX,maxY,numFinds,reference['classes'],rng)
+		for i,((x,y),cls,depth) in enumerate(zip(points.tolist(),classIndex.tolist(),depths.tolist())):
+			findRows.append((firstId + i,x,y,reference['classes'][cls][0],depth,'Synthetic ' + reference['classes'][cls][1].lower(),areaId,''))
+
+	return [
+			('FF_AREA',AREA_COLUMNS,[(areaId,areaName,maxX,maxY,'')]),
+			('FF_FIELDS_NEW',FIELD_COLUMNS,fieldRows),
+			('FF_FINDS_NEW',FIND_COLUMNS,findRows)
+			]
+
+def writeSql(tables,outFile,dialect='oracle'):
+	"""Write the rows as one Insert per row, loadable by sqlplus or the sqlite3 shell
+
+	The insert triggers keep the denormalized tables and area versions up to date.
+
+	Keyword arguments:
+	tables -- list of (table, columns, rows) from generateArea
+	outFile -- open text file
+	dialect -- oracle or sqlite, which runs the inserts in one transaction (default oracle)
+	"""
+
+	if dialect == 'oracle':
+		outFile.write('SET DEFINE OFF\n')
+	else:
+		outFile.write('BEGIN TRANSACTION;\n')
+	for table,columns,rows in tables:
+		start = 'INSERT INTO ' + table + ' (' + ','.join(columns) + ') VALUES ('
+		for row in rows:
+			outFile.write(start + ','.join([_sqlValue(value) for value in row]) + ');\n')
+	outFile.write('COMMIT;\n')
+
+def _sqlValue(value):
+	"""Private function returning a sql literal"""
+
+	if value == None:
+		return 'NULL'
+	if isinstance(value,str):
+		return "'" + value.replace("'","''") + "'"
+	return repr(value)
+
+def writeCsv(tables,folder):
+	"""Write one csv file with a header row per table, e.g. FF_FINDS_NEW.csv
+
+	Keyword arguments:
+	tables -- list of (table, columns, rows) from generateArea
+	folder -- output folder
+	"""
+
+	if not os.path.isdir(folder):
+		os.makedirs(folder)
+	for table,columns,rows in tables:
+		with open(os.path.join(folder,table + '.csv'),'w',newline='') as outFile:
+			writer = csv.writer(outFile)
+			writer.writerow(columns)
+			writer.writerows(rows)
+
+def loadArea(db,tables):
+	"""Load the rows into an open DbFieldsFindsSqlite
+
+	Keyword arguments:
+	db -- open DbFieldsFindsSqlite
+	tables -- list of (table, columns, rows) from generateArea
+	"""
+
+	for table,columns,rows in tables:
+		db.loadRows(table,columns,rows)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from jinja2 import Environment, FileSystemLoader
+from .dbSource import dbFromSource
+__all__ = ['renderThumbnails']
+
+#Templates folder sits beside the library
+_templateDir = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','templates')
+
+#Database opened once in each worker process
+_workerDb = None
+
+
+def renderThumbnails(source,outDir,processes=None,size=200,maxFinds=500):
+	"""Render a thumbnail svg of every map area in a process pool and write an index page
+
+	Each worker process opens its own database connection and renders whole areas, so the
+	wall clock time falls close to linearly with the number of processes.
+	Returns a list of dictionaries describing each thumbnail in area name order.
+
+	Keyword arguments:
+	source -- database source string for dbFromSource, SQLite sources must be files
+	outDir -- cache folder the thumbnails and index.html are written to
+	processes -- worker processes, one per core if None (default None)
+	size -- thumbnail width and height in pixels (default 200)
+	maxFinds -- most finds drawn per thumbnail (default 500)
+	"""
+
+	if not os.path.isdir(outDir):
+		os.makedirs(outDir)
+
+	db = dbFromSource(source)
+	db.openConnection()
+	areaList = db.getMapAreaList()
+	db.closeConnection()
+
+	with ProcessPoolExecutor(max_workers=processes,initializer=_initWorker,initargs=(source,)) as pool:
+		results = list(pool.map(_renderArea,areaList,[outDir]*len(areaList),[size]*len(areaList),[maxFinds]*len(areaList)))
+
+	writeOverviewIndex(outDir,results,size)
+	return results
+
+def writeOverviewIndex(outDir,results,size):
+	"""Write the overview index.html linking every thumbnail
+
+	Keyword arguments:
+	outDir -- folder holding the thumbnails
+	results -- thumbnail dictionaries from renderThumbnails
+	size -- thumbnail width and height in pixels
+	"""
+
+	env = Environment(loader=FileSystemLoader(_templateDir))
+	page = env.get_template('overview.html').render(thumbnails=results,size=size)
+	_replaceFile(os.path.join(outDir,'index.html'),page)
+
+def _initWorker(source):
+	"""Private function opening the database of a worker process"""
+
+	global _workerDb
+	_workerDb = dbFromSource(source)
+	_workerDb.openConnection()
+
+def _renderArea(areaName,outDir,size,maxFinds):
+	"""Private function rendering one area thumbnail in a worker process"""
+
+	start = time.perf_counter()
+	mapArea = _workerDb.getMapArea(areaName)
+	fields = _workerDb.getFields(mapArea.areaId)
+	finds = _workerDb.getFinds(mapArea.areaId)
+	mapArea.addFields(fields,'field')
+	mapArea.addFinds(finds,'find')
+	fileName = 'area_' + str(mapArea.areaId) + '.svg'
+	_replaceFile(os.path.join(outDir,fileName),mapArea.renderThumbnail(size,size,maxFinds))
+	return {
+			'areaName':areaName,
+			'fileName':fileName,
+			'fields':len(fields),
+			'finds':len(finds),
+			'maxX':mapArea.maxX,
+			'maxY':mapArea.maxY,
+			'seconds':time.perf_counter() - start
+			}
+
+def _replaceFile(path,text):
+	"""Private function writing text to a temporary file then renaming it over path"""
+
+	tmpPath = path + '.' + str(os.getpid()) + '.tmp'
+	with open(tmpPath,'w') as outFile:
+		outFile.write(text)
+	os.replace(tmpPath,path)
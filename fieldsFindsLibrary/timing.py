@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+import time
+from datetime import datetime
+__all__ = ['RequestTimer']
+
+class RequestTimer(object):
+	"""Collects named timing spans for one request
+
+	Spans with the same name are summed. The totals are reported as a Server-Timing
+	header and can be appended as one json line per request to a log file.
+	A disabled timer hands out a shared do-nothing span so costs close to nothing.
+	"""
+
+	def __init__(self,enabled=True,logPath=None):
+		"""Initialise object
+
+		Keyword arguments:
+		enabled -- record spans (default True)
+		logPath -- file the json line is appended to, None for no log (default None)
+		"""
+
+		self._enabled = enabled
+		self._logPath = logPath
+		self._start = time.perf_counter()
+		self._totals = {}
+		self._counts = {}
+		self._order = []
+		self._lock = threading.Lock()
+
+	@classmethod
+	def fromEnvironment(cls):
+		"""Create timer from FF_TIMING_LOG (log file path) or FF_TIMING=1 (header only)"""
+
+		logPath = os.environ.get('FF_TIMING_LOG')
+		enabled = logPath != None or os.environ.get('FF_TIMING') == '1'
+		return cls(enabled,logPath)
+
+	def span(self,name):
+		"""Return context manager timing the enclosed code under name
+
+		Keyword arguments:
+		name -- span name
+		"""
+
+		if not self._enabled:
+			return _nullSpan
+		return _Span(self,name)
+
+	def record(self,name,seconds):
+		"""Add a timing to the named span
+
+		Keyword arguments:
+		name -- span name
+		seconds -- elapsed seconds
+		"""
+
+		#Spans can be recorded from the concurrent fetch threads
+		with self._lock:
+			if name not in self._totals:
+				self._totals[name] = 0.0
+				self._counts[name] = 0
+				self._order.append(name)
+			self._totals[name] = self._totals[name] + seconds
+			self._counts[name] = self._counts[name] + 1
+
+	def serverTiming(self):
+		"""Return the Server-Timing header line or empty string if disabled"""
+
+		if not self._enabled:
+			return ''
+		metrics = []
+		for name in self._order:
+			metrics.append(name + ';dur=' + '%.2f' % (self._totals[name]*1000) + ';desc="' + str(self._counts[name]) + ' call(s)"')
+		metrics.append('total;dur=' + '%.2f' % (self.elapsed()*1000))
+		return 'Server-Timing: ' + ', '.join(metrics) + '\n'
+
+	def writeLog(self,request):
+		"""Append a json line for this request to the log file if configured
+
+		Keyword arguments:
+		request -- request description e.g. the query string
+		"""
+
+		if not self._enabled or self._logPath == None:
+			return
+		spans = {}
+		for name in self._order:
+			spans[name] = {'ms':round(self._totals[name]*1000,3),'count':self._counts[name]}
+		line = json.dumps({
+						'time':datetime.now().isoformat(),
+						'request':request,
+						'totalMs':round(self.elapsed()*1000,3),
+						'spans':spans
+						})
+		with open(self._logPath,'a') as logFile:
+			logFile.write(line + '\n')
+
+	def elapsed(self):
+		"""Seconds since the timer was created"""
+
+		return time.perf_counter() - self._start
+
+	@property
+	def enabled(self):
+		return self._enabled
+
+	@property
+	def totals(self):
+		"""Dictionary of span name to total seconds"""
+		return dict(self._totals)
+
+
+class _Span(object):
+	"""Context manager recording elapsed time to a RequestTimer"""
+
+	def __init__(self,timer,name):
+		self._timer = timer
+		self._name = name
+
+	def __enter__(self):
+		self._start = time.perf_counter()
+		return self
+
+	def __exit__(self,excType,excValue,traceback):
+		self._timer.record(self._name,time.perf_counter() - self._start)
+		return False
+
+
+class _NullSpan(object):
+	"""Do-nothing context manager used when timing is disabled"""
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self,excType,excValue,traceback):
+		return False
+
+_nullSpan = _NullSpan()
+
+#Shared disabled timer
+NULL_TIMER = RequestTimer(False)
@@ -1,51 +1,67 @@
 #!/usr/bin/env python3
 import numpy as np
-import copy
 from .htmlHelper import genHTMLElement
-__all__ = ['AreaDropDown','FormList','Status']
+__all__ = ['AreaDropDown','FormList','Status','AreaStatistics']
 
 class AreaDropDown(object):
 	"""Drop down list of Map Areas"""
 
-	def __init__(self,areaList):
+	def __init__(self,areaList,linkFunction=None,more=False):
 		"""Initialise object
 		
 		Keyword arguments:
 		areaList -- list of Map Areas
+		linkFunction -- function returning the link for an area name, main.py links if None (default None)
+		more -- areaList is the first page of areas so add a search box looking up the rest (default False)
 		"""
 		
-		self._areaList = copy.deepcopy(areaList)
+		self._areaList = list(areaList)
+		self._linkFunction = linkFunction
+		self._more = more
 		
 	def __str__(self):
 		"""Returns dropdown html elements"""
 		
 		dropList = ''
 		for area in self._areaList:
-			link = 'https://www.geos.ed.ac.uk/~s1783947/cgi-bin/webmapping/main.py?MapArea=' + area
+			if self._linkFunction == None:
+				link = 'https://www.geos.ed.ac.uk/~s1783947/cgi-bin/webmapping/main.py?MapArea=' + area
+			else:
+				link = self._linkFunction(area)
 			aElement = genHTMLElement('a',['href'],[link],area)
 			listElement = genHTMLElement('li',[],[],aElement)
 			dropList = dropList + listElement
+		if self._more:
+			#Search results replace the links above, see SearchAreas in the page template
+			search = genHTMLElement('input',['type','class','placeholder','onInput','onClick'],['text','form-control','Search maps','SearchAreas(this)','event.stopPropagation()'])
+			dropList = dropList + genHTMLElement('li',['class'],['areaSearch'],search)
 		return dropList
 
 		
 class FormList(object):
 	"""Renders form option list from any input list"""
 
-	def __init__(self,list):
+	def __init__(self,list,counts=None):
 		"""Initialise object
 		
 		Keyword arguments:
 		list -- any list
+		counts -- dictionary of value to a count shown after it, the option value stays the list value (default None)
 		"""
 		
-		self._list = copy.deepcopy(list)
+		self._list = [val for val in list]
+		self._counts = counts
 		
 	def __str__(self):
 		"""Returns html list elements"""
 		
 		html = ''
 		for val in self._list:
-			listElement = genHTMLElement('option',[],[],str(val))
+			if self._counts == None:
+				listElement = genHTMLElement('option',[],[],str(val))
+			else:
+				label = str(val) + ' (' + str(self._counts.get(val,0)) + ')'
+				listElement = genHTMLElement('option',['value'],[str(val)],label)
 			html = html + listElement
 		return html
 
@@ -57,7 +73,7 @@ class Status(object):
 		"""Initialise object
 		
 		Keyword arguments:
-		status -- Success, Filter Applied or Error
+		status -- Success, Filter Applied, Selection or Error
 		message -- Any message
 		"""
 		
@@ -73,6 +89,9 @@ class Status(object):
 		elif self._status == 'Filter Applied':
 			style = 'alert alert-warning'
 			back = ''
+		elif self._status == 'Selection':
+			style = 'alert alert-info'
+			back = ''
 		else:
 			style = 'alert alert-danger'
 			#Attach back instruction to see cause of error
@@ -85,3 +104,55 @@ class Status(object):
 		return html
 
 
+class AreaStatistics(object):
+	"""Create the area statistics panel html elements"""
+
+	def __init__(self,stats):
+		"""Initialise object
+		
+		Keyword arguments:
+		stats -- statistics dictionary from DbFieldsFinds.getAreaStatistics
+		"""
+		
+		self._stats = stats
+		
+	def classCounts(self):
+		"""Returns dictionary of find class to number of finds"""
+		
+		return dict([(row['name'],row['count']) for row in self._stats['finds']['byClass']])
+		
+	def __str__(self):
+		"""Returns html tables of the find and field statistics"""
+		
+		finds = self._stats['finds']
+		fields = self._stats['fields']
+		depth = finds['depth']
+		summary = 'Finds: ' + str(finds['count']) + '<br>Fields: ' + str(fields['count'])
+		summary = summary + '<br>Field area: ' + _number(fields['area']) + ' (' + _number(100*fields['coverage']) + '% of map)'
+		if depth['count'] > 0:
+			summary = summary + '<br>Depth: ' + _number(depth['min']) + ' to ' + _number(depth['max']) + ', median ' + _number(depth['quartiles'][1])
+		html = genHTMLElement('p',[],[],summary)
+		html = html + _table(['Class','Finds','Mean depth'],[(row['name'],row['count'],_number(row['meanDepth'])) for row in finds['byClass']])
+		html = html + _table(['Period','Finds'],[(row['name'],row['count']) for row in finds['byPeriod']])
+		html = html + _table(['Use','Finds'],[(row['name'],row['count']) for row in finds['byUse']])
+		html = html + _table(['Depth','Finds'],[(_number(row['low']) + ' - ' + _number(row['high']),row['count']) for row in depth['histogram'] if row['count'] > 0])
+		html = html + _table(['Crop','Fields','Area'],[(row['name'],row['count'],_number(row['area'])) for row in fields['byCrop']])
+		html = html + _table(['Owner','Fields','Area'],[(row['name'],row['count'],_number(row['area'])) for row in fields['byOwner']])
+		return html
+		
+
+def _table(headings,rows):
+	"""Private function returning a condensed table, blank if there are no rows"""
+	
+	if len(rows) == 0:
+		return ''
+	head = genHTMLElement('tr',[],[],''.join([genHTMLElement('th',[],[],heading) for heading in headings]))
+	body = ''.join([genHTMLElement('tr',[],[],''.join([genHTMLElement('td',[],[],str(value) if value != '' else '-') for value in row])) for row in rows])
+	return genHTMLElement('table',['class'],['table table-condensed'],head + body)
+	
+def _number(value):
+	"""Private function formatting a statistic to at most 2 decimal places, - if missing"""
+	
+	if value == None:
+		return '-'
+	return ('%.2f' % value).rstrip('0').rstrip('.')
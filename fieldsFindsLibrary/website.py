@@ -2,14 +2,34 @@
 
 #Import field and find library objects
 from .geoObjects import Field, Find, MapArea
-from .webObjects import AreaDropDown, FormList, Status
+from .webObjects import AreaDropDown, FormList, Status, AreaStatistics
 from .database import DbFieldsFinds
+from .timing import NULL_TIMER
+from .concurrentFetch import fetchConcurrent
+from .findFilter import FindFilter, paramValues
+from .spatialIndex import SpatialQuery
+from .raster import RasterCache, rasterizeMap, rasterSize, encodePng
 
 #Import Jinja2 to render website
 from jinja2 import Environment, FileSystemLoader
 
+#Json for the in-place page update responses
+import json
+import os
+from urllib.parse import parse_qsl, urlencode
+
 #Class list in file
-__all__ = ['WebsiteFieldsFinds']
+__all__ = ['WebsiteFieldsFinds','paramsFromQuery']
+
+#Templates folder sits beside the library
+_templateDir = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','templates')
+
+#Areas linked in the dropdown before it switches to searching
+_AREA_DROPDOWN_SIZE = 100
+
+#Default and largest page of an id lookup
+_LOOKUP_PAGE_SIZE = 50
+_LOOKUP_MAX_PAGE_SIZE = 500
 
 class WebsiteFieldsFinds(object):
 	"""The Fields and Finds Website
@@ -22,15 +42,22 @@ class WebsiteFieldsFinds(object):
 	
 	"""
 	
-	def __init__(self,params):
+	def __init__(self,params,db=None,timer=None,concurrent=False):
 		"""Initialise object
 		
 		Keyword arguments:
 		params -- a dictonary of parameters submitted from browser
+		db -- database to use, a new DbFieldsFinds if None (default None)
+		timer -- RequestTimer for timing spans, disabled if None (default None)
+		concurrent -- run the independent page queries in parallel on pooled sessions (default False)
 		"""
 		
+		#Timing spans
+		self._timer = timer if timer != None else NULL_TIMER
+		self._concurrent = concurrent
+		
 		#Get Website Templates
-		self._env = Environment(loader=FileSystemLoader('templates'))
+		self._env = Environment(loader=FileSystemLoader(_templateDir))
 		self._mainTemplate = self._env.get_template('maintemplate.html')
 		
 		#Style names to pass to SVG
@@ -38,7 +65,8 @@ class WebsiteFieldsFinds(object):
 		self._fieldStyle = 'field'
 		
 		#Setup DB Connection
-		self._db = DbFieldsFinds()
+		self._db = db if db != None else DbFieldsFinds()
+		self._db.setTimer(self._timer)
 		
 		#Map Objects
 		self._mapArea = None	
@@ -48,9 +76,8 @@ class WebsiteFieldsFinds(object):
 		self._cropDropDown = None
 		self._classDropDown = None
 		self._ownerDropDown = None
-		self._areaDelList = None
-		self._findList = None
-		self._fieldList = None
+		self._filterClassDropDown = None
+		self._areaStatistics = None
 		
 		#Status - default empty line
 		self._status = '<br>'
@@ -69,77 +96,547 @@ class WebsiteFieldsFinds(object):
 		else:
 			self._mapAreaName = 'Default'
 			
-		if 'FilterClass' in self._params:
-			self._filterClass = self._params['FilterClass'].value
-			self._status = Status('Filter Applied','Class = ' + self._filterClass)
-		else:
-			self._filterClass = None
+		#Find filter from FilterClass, FilterPeriod, FilterUse, FilterColour, DepthMin, DepthMax, BBox and FieldId
+		try:
+			self._findFilter = FindFilter.fromParams(self._params)
+		except Exception as e:
+			self._findFilter = None
+			self._status = Status('Error',str(e))
+		if self._findFilter != None:
+			self._status = Status('Filter Applied',self._findFilter.description())
+		
+		#Radius, nearest or box query from Near with Radius or Nearest, or Within, over the filtered finds
+		self._spatialError = 'Spatial query needs Near with Radius or Nearest, or Within'
+		try:
+			self._spatialQuery = SpatialQuery.fromParams(self._params)
+		except Exception as e:
+			self._spatialQuery = None
+			self._spatialError = str(e)
+			self._status = Status('Error',str(e))
+		self._spatialData = None
+		
+		#Fragment requests return json to patch the displayed page in place rather than a full page
+		#and ids requests return a page of ids for the delete forms and area search
+		self._format = self._allowBlank('Format')
+		self._fragment = self._format == 'fragment'
+		self._fragmentData = None
+		self._lookupData = None
+		
+		#Data requests return packed arrays of the fields and finds and client rendered pages
+		#leave the map layers empty for the browser to fill from a data request
+		self._clientRender = self._allowBlank('Render') == 'client'
+		self._mapData = None
+		
+		#Changes requests return the fields and finds added or deleted since the Since version
+		self._changeData = None
+		
+		#Stats requests return the area statistics shown in the statistics panel
+		self._statsData = None
+		
+		#Maps with more objects than rasterOver are drawn as a png, None to always draw svg
+		self._rasterCache = None
+		self._rasterOver = None
+		self._rasterHref = None
+		self._png = None
+		self._hitData = None
+		self._actionFailed = False
+		
+		#Static site links, None for links back to main.py
+		self._areaLinks = None
+		self._filterLinks = None
+		
+		#Identical views running at once are rendered once when a SingleFlight is set
+		self._coalescer = None
+		self._sharedBody = None
 					
 
 	
+	def setStaticLinks(self,areaLinks,filterLinks):
+		"""Link the area dropdown and filter buttons to pre-rendered static pages
+		
+		Keyword arguments:
+		areaLinks -- dictionary of area name to page link
+		filterLinks -- dictionary of class name to page link for the current area, '' for unfiltered
+		"""
+		
+		self._areaLinks = areaLinks
+		self._filterLinks = filterLinks
+	
+	def setRaster(self,rasterOver,cache=None):
+		"""Draw maps with more fields and finds than rasterOver as a png rather than svg
+		
+		Keyword arguments:
+		rasterOver -- object count above which the map is rasterized
+		cache -- RasterCache of the pngs, a new in memory cache if None (default None)
+		"""
+		
+		self._rasterOver = rasterOver
+		self._rasterCache = cache if cache != None else RasterCache()
+	
+	def setCoalescer(self,coalescer):
+		"""Share the response of requests without actions with identical concurrent requests
+		
+		Requests are identical when they have the same area, find filter, area data version and
+		other parameters.
+		
+		Keyword arguments:
+		coalescer -- SingleFlight, None to render every request
+		"""
+		
+		self._coalescer = coalescer
+	
 	def run(self):
 		"""Run all actions requested and generate the website"""
 	
 		self._db.openConnection()
-		self._performActions()
-		fields = self._db.getFields(self._mapArea.areaId)
-		finds = self._db.getFinds(self._mapArea.areaId,self._filterClass)
-		self._mapArea.addFields(fields,self._fieldStyle)
-		self._mapArea.addFinds(finds,self._findStyle)
-		self._genWebObjects()
+		with self._timer.span('performActions'):
+			self._performActions()
+		if self._coalescer != None and self._action == None:
+			with self._timer.span('coalesced'):
+				self._sharedBody = self._coalescer.run(self._flightKey(),self._renderBody)
+		else:
+			self._generate()
 		self._db.closeConnection()
 	
+	def _generate(self):
+		"""Load and generate the response of the requested format"""
+		
+		if self._format == 'ids':
+			with self._timer.span('idLookup'):
+				self._genIdLookup()
+		elif self._format == 'data':
+			with self._timer.span('genData'):
+				self._genData()
+		elif self._format == 'changes':
+			with self._timer.span('genChanges'):
+				self._genChanges()
+		elif self._format == 'spatial':
+			with self._timer.span('genSpatial'):
+				self._genSpatial()
+		elif self._format == 'stats':
+			with self._timer.span('genStats'):
+				self._genStats()
+		elif self._format == 'png':
+			with self._timer.span('genRaster'):
+				self._png = self._rasterTile()[0]
+		elif self._format == 'hit':
+			with self._timer.span('genHit'):
+				self._genHit()
+		elif self._fragment:
+			with self._timer.span('genFragment'):
+				self._genFragment()
+		else:
+			#The version is read before the fields and finds so a png is never stored under a newer one
+			version = self._db.getAreaVersion(self._mapArea.areaId) if self._rasterOver != None else None
+			with self._timer.span('fetchPage'):
+				data = self._fetchPage()
+			if self._rasterOver != None and len(data['fields']) + len(data['finds']) > self._rasterOver:
+				#Rasterized maps leave the svg layers and information panels empty
+				with self._timer.span('genRaster'):
+					self._rasterTile(data['fields'],data['finds'],version)
+				self._rasterHref = 'main.py?' + urlencode(self._areaQuery() + [('Format','png')])
+				data['fields'] = []
+				data['finds'] = []
+			self._mapArea.addFields(data['fields'],self._fieldStyle)
+			self._mapArea.addFinds(data['finds'],self._findStyle)
+			if self._spatialQuery != None:
+				with self._timer.span('spatialQuery'):
+					self._highlightSpatial()
+			with self._timer.span('genWebObjects'):
+				self._genWebObjects(data)
+	
+	def _flightKey(self):
+		"""Return the coalescing key of the area, find filter, data version and other parameters"""
+		
+		filterKey = self._findFilter.key() if self._findFilter != None else ''
+		#Filter parameters stay in as invalid ones make no filter but change the status
+		others = tuple(sorted([(key,tuple(paramValues(self._params,key))) for key in self._params if key != 'MapArea']))
+		return (self._mapAreaName,filterKey,self._db.getAreaVersion(self._mapArea.areaId),others)
+	
+	def _renderBody(self):
+		"""Generate the response and return its body bytes without the http headers"""
+		
+		self._generate()
+		if self.binary:
+			return self._png
+		return self._body()[1].encode('utf-8')
+	
+	def _fetchPage(self):
+		"""Run the independent page queries, in parallel if concurrent, and return results by name"""
+		
+		areaId = self._mapArea.areaId
+		calls = [
+				('areaPage','lookupIds',('area',None,'',None,_AREA_DROPDOWN_SIZE)),
+				('cropList','getCropList',()),
+				('classList','getClassList',()),
+				('ownerList','getOwnerList',()),
+				('stats','getAreaStatistics',(areaId,))
+				]
+		if not self._clientRender:
+			calls = [
+					('fields','getFields',(areaId,)),
+					('finds','getFinds',(areaId,None,self._findFilter))
+					] + calls
+		if self._concurrent:
+			data = fetchConcurrent(self._db,calls)
+		else:
+			data = {}
+			for key,method,args in calls:
+				data[key] = getattr(self._db,method)(*args)
+		data.setdefault('fields',[])
+		data.setdefault('finds',[])
+		return data
+	
+	@property
+	def binary(self):
+		"""True when the response is the png bytes rather than text"""
+		
+		return self._format == 'png'
+	
+	def __bytes__(self):
+		"""return png response including the http headers"""
+		
+		png = self._sharedBody if self._sharedBody != None else self._png
+		assert png != None
+		return self._headers('image/png').encode('ascii') + png
+	
 	def __str__(self):
-		"""return rendered website as string object"""
+		"""return rendered website as string object including the http headers"""
+		
+		#Headers follow the render so the timing header includes it
+		contentType,body = self._body()
+		return self._headers(contentType) + body
+	
+	def _body(self):
+		"""Return the content type and body of the response"""
+		
+		if self._sharedBody != None:
+			return self._contentType(),self._sharedBody.decode('utf-8')
+		
+		if self._format == 'hit':
+			assert self._hitData != None
+			return 'application/json',json.dumps(self._hitData)
+		
+		if self._format == 'ids':
+			assert self._lookupData != None
+			return 'application/json',json.dumps(self._lookupData)
+		
+		if self._format == 'data':
+			assert self._mapData != None
+			return 'application/json',json.dumps(self._mapData)
+		
+		if self._format == 'spatial':
+			assert self._spatialData != None
+			return 'application/json',json.dumps(self._spatialData)
+		
+		if self._format == 'changes':
+			assert self._changeData != None
+			return 'application/json',json.dumps(self._changeData)
+		
+		if self._format == 'stats':
+			assert self._statsData != None
+			return 'application/json',json.dumps(self._statsData)
+		
+		#Fragment requests only return the changes as json
+		if self._fragment:
+			assert self._fragmentData != None
+			return 'application/json',json.dumps(self._fragmentData)
+		
+		return 'text/html',self.renderPage()
+	
+	def _contentType(self):
+		"""Return the content type of the requested format"""
+		
+		if self._format == 'png':
+			return 'image/png'
+		if self._format in ['hit','ids','data','spatial','changes','stats'] or self._fragment:
+			return 'application/json'
+		return 'text/html'
+	
+	def renderPage(self):
+		"""return rendered html page without http headers"""
 		
 		assert self._mapArea != None #Check map created
 		assert self._areaDropDown != None
-		svgMap = self._mapArea.renderMap('100%','100%')
-		svgInfo = self._mapArea.renderInfo(300,500)
-		return self._mainTemplate.render(
-										svgMap = svgMap,
-										svgInfo = svgInfo,
-										currentMap = self._mapAreaName,
-										mapAreas = self._areaDropDown,
-										cropList = self._cropDropDown,
-										classList = self._classDropDown,
-										ownerList = self._ownerDropDown,
-										jsMapAreaName = self._mapAreaName,
-										status = self._status,
-										maxX = self._mapArea.maxX,
-										maxY = self._mapArea.maxY,
-										maxXl1 = self._mapArea.maxX-1,
-										maxYl1 = self._mapArea.maxY-1,
-										delAreaList = self._areaDelList,
-										findList = self._findList,
-										fieldList = self._fieldList
-										)
-		
-	def _genWebObjects(self):
-		"""Generate webpage dropdowns and lists"""
-		
-		#Get list of maps
-		areaList = self._db.getMapAreaList()
-		self._areaDropDown = AreaDropDown(areaList)
-		
-		#Remove default and demo maps and create delete map list
-		areaList.remove('Default')
-		areaList.remove('Demo Kindrogan')
-		areaList.remove('Demo Large')
-		self._areaDelList = FormList(areaList)
-		
-		#Get crop, class, owner, find and field lists
-		cropList = self._db.getCropList()
-		self._cropDropDown = FormList(cropList)
-		classList = self._db.getClassList()
-		self._classDropDown = FormList(classList)
-		ownerList = self._db.getOwnerList()
-		self._ownerDropDown = FormList(ownerList)
-		findList = self._db.getFindIdList(self._mapArea.areaId)
-		self._findList = FormList(findList)
-		fieldList = self._db.getFieldIdList(self._mapArea.areaId)
-		self._fieldList = FormList(fieldList)
+		with self._timer.span('renderMap'):
+			svgMap = self._mapArea.renderMap('100%','100%',self._rasterHref)
+		with self._timer.span('renderInfo'):
+			svgInfo = self._mapArea.renderInfo(300,500)
+		#Static pages switch filters by loading the matching page. Escaped for use inside the script element
+		staticPages = 'null'
+		if self._filterLinks != None:
+			staticPages = json.dumps(self._filterLinks,sort_keys=True).replace('</','<\\/')
+		#Query for the data request of a client rendered page, keeping any find filter
+		dataQuery = 'null'
+		if self._clientRender:
+			dataQuery = json.dumps(urlencode(self._areaQuery()))
+		#Rasterized maps look up the object under the pointer with hit requests
+		rasterMap = 'null'
+		if self._rasterHref != None:
+			width,height = rasterSize(self._mapArea.maxX,self._mapArea.maxY)
+			rasterMap = json.dumps({'query':urlencode(self._areaQuery()),'width':width,'height':height},sort_keys=True)
+		with self._timer.span('templateRender'):
+			return self._mainTemplate.render(
+											svgMap = svgMap,
+											svgInfo = svgInfo,
+											currentMap = self._mapAreaName,
+											mapAreas = self._areaDropDown,
+											cropList = self._cropDropDown,
+											classList = self._classDropDown,
+											filterClassList = self._filterClassDropDown,
+											areaStatistics = self._areaStatistics,
+											ownerList = self._ownerDropDown,
+											idPageSize = _LOOKUP_PAGE_SIZE,
+											jsMapAreaName = self._mapAreaName,
+											status = self._status,
+											maxX = self._mapArea.maxX,
+											maxY = self._mapArea.maxY,
+											maxXl1 = self._mapArea.maxX-1,
+											maxYl1 = self._mapArea.maxY-1,
+											staticPages = staticPages,
+											dataQuery = dataQuery,
+											rasterMap = rasterMap
+											)
 		
+	def _headers(self,contentType):
+		"""Return http headers including any Server-Timing header"""
+		
+		return 'Content-Type: ' + contentType + '\n' + self._timer.serverTiming() + '\n'
+		
+	def _genWebObjects(self,data):
+		"""Generate webpage dropdowns and lists
+		
+		Keyword arguments:
+		data -- page query results from _fetchPage
+		"""
+		
+		#Get first page of maps, static pages link every map as there is no lookup
+		if self._areaLinks == None:
+			areaList,moreAreas = data['areaPage']
+			self._areaDropDown = AreaDropDown(areaList,None,moreAreas)
+		else:
+			self._areaDropDown = AreaDropDown(sorted(self._areaLinks),self._areaLinks.get)
+		
+		#Get crop, class and owner lists. Delete form ids are looked up on demand
+		self._cropDropDown = FormList(data['cropList'])
+		self._classDropDown = FormList(data['classList'])
+		self._ownerDropDown = FormList(data['ownerList'])
+		
+		#Statistics panel and the filter classes with their number of finds
+		self._areaStatistics = AreaStatistics(data['stats'])
+		self._filterClassDropDown = FormList(data['classList'],self._areaStatistics.classCounts())
+		
+	def _genFragment(self):
+		"""Load and render only the objects changed by the action for an in-place page update"""
+		
+		data = {
+				'status':str(self._status),
+				'mapArea':self._mapAreaName,
+				'reload':False,
+				'replaceFinds':False,
+				'remove':[],
+				'fieldIds':[],
+				'findIds':[]
+				}
+		fields = []
+		finds = []
+		
+		if self._actionFailed:
+			#Only the error status is shown
+			pass
+		elif self._action == 'AddField':
+			fields = [self._db.getField(self._db.lastInsertId)]
+			data['fieldIds'] = [self._db.lastInsertId]
+		elif self._action == 'AddFind':
+			finds = [self._db.getFind(self._db.lastInsertId)]
+			data['findIds'] = [self._db.lastInsertId]
+		elif self._action == 'DelField' or self._action == 'DelFind':
+			#Html ids are Field or Find followed by the id
+			data['remove'] = [self._action[3:] + str(self._getParam('Id'))]
+		elif self._action == None:
+			#Filter applied or removed so the whole find layer is replaced
+			finds = self._db.getFinds(self._mapArea.areaId,None,self._findFilter)
+			data['replaceFinds'] = True
+		else:
+			#Area, crop, class and owner changes alter the dropdowns so need a full page
+			data['reload'] = True
+		
+		#Field and find changes alter the statistics and filter class counts
+		if not self._actionFailed and self._action in ['AddField','AddFind','DelField','DelFind']:
+			statistics = AreaStatistics(self._db.getAreaStatistics(self._mapArea.areaId))
+			data['statistics'] = str(statistics)
+			data['filterClasses'] = str(FormList(self._db.getClassList(),statistics.classCounts()))
+		
+		self._mapArea.addFields(fields,self._fieldStyle)
+		self._mapArea.addFinds(finds,self._findStyle)
+		data.update(self._mapArea.renderFragment())
+		self._fragmentData = data
+	
+	def _genData(self):
+		"""Load the area fields and finds, filtered by any find filter, as packed arrays"""
+		
+		areaId = self._mapArea.areaId
+		#Version first so changes made while loading are fetched again by the next changes request
+		version = self._db.getAreaVersion(areaId)
+		self._mapArea.addFields(self._db.getFields(areaId),self._fieldStyle)
+		self._mapArea.addFinds(self._db.getFinds(areaId,None,self._findFilter),self._findStyle)
+		data = self._mapArea.packData()
+		data['version'] = version
+		data['status'] = str(self._status)
+		self._mapData = data
+	
+	def _genChanges(self):
+		"""Load the fields and finds added or deleted since version Since as packed arrays
+		
+		Added fields and finds are packed as in a data request and replace those with the same id.
+		Errors are returned in the json rather than the status.
+		"""
+		
+		try:
+			try:
+				since = int(self._allowBlank('Since') or 0)
+			except ValueError:
+				raise Exception('Since must be a whole number')
+			changes = self._db.getChangesSince(self._mapArea.areaId,since,self._findFilter)
+			self._mapArea.addFields(changes['fields'],self._fieldStyle)
+			self._mapArea.addFinds(changes['finds'],self._findStyle)
+			data = self._mapArea.packData()
+			data['since'] = since
+			data['version'] = changes['version']
+			data['deleted'] = {'fields':changes['deletedFields'],'finds':changes['deletedFinds']}
+		except Exception as e:
+			data = {'error':str(e)}
+		self._changeData = data
+	
+	def _genStats(self):
+		"""Load the area statistics, see DbFieldsFinds.getAreaStatistics"""
+		
+		data = dict(self._db.getAreaStatistics(self._mapArea.areaId))
+		data['areaName'] = self._mapAreaName
+		self._statsData = data
+	
+	def _genSpatial(self):
+		"""Run the spatial query over the filtered finds and return the find ids and distances
+		
+		Errors are returned in the json rather than the status.
+		"""
+		
+		data = {'ids':[],'distances':[]}
+		try:
+			if self._spatialQuery == None:
+				raise Exception(self._spatialError)
+			results = self._spatialQuery.run(self._db.getFindIndex(self._mapArea.areaId,self._findFilter))
+			data['ids'] = [findId for findId,distance in results]
+			data['distances'] = [distance for findId,distance in results]
+			data['description'] = self._spatialQuery.description(results)
+		except Exception as e:
+			data['error'] = str(e)
+		self._spatialData = data
+	
+	def _highlightSpatial(self):
+		"""Run the spatial query over the filtered finds and ring the results on the map"""
+		
+		index = self._db.getFindIndex(self._mapArea.areaId,self._findFilter)
+		results = self._spatialQuery.run(index)
+		kind = self._spatialQuery.kind
+		values = self._spatialQuery.values
+		if kind == 'box':
+			shape = ('rect',) + values
+		elif kind == 'radius':
+			shape = ('circle',) + values
+		else:
+			shape = ('point',) + values[:2]
+		self._mapArea.setHighlight(index.points([findId for findId,distance in results]).tolist(),shape)
+		#Action results keep the status line
+		if self._action == None:
+			description = self._spatialQuery.description(results)
+			if self._findFilter != None:
+				description = description + ' (' + self._findFilter.description() + ')'
+			self._status = Status('Selection',description)
+	
+	def _rasterTile(self,fields=None,finds=None,version=None):
+		"""Return the cached (png, id image) of the area, data version and filter, drawing it if not cached
+		
+		Keyword arguments:
+		fields -- area fields if already loaded (default None)
+		finds -- filtered area finds if already loaded (default None)
+		version -- area data version read before the fields and finds were loaded (default None)
+		"""
+		
+		if self._rasterCache == None:
+			self._rasterCache = RasterCache()
+		areaId = self._mapArea.areaId
+		if version == None:
+			version = self._db.getAreaVersion(areaId)
+		filterKey = self._findFilter.key() if self._findFilter != None else ''
+		width,height = rasterSize(self._mapArea.maxX,self._mapArea.maxY)
+		tile = self._rasterCache.get(areaId,version,filterKey,width,height)
+		if tile != None:
+			return tile
+		
+		if fields == None:
+			fields = self._db.getFields(areaId)
+			finds = self._db.getFinds(areaId,None,self._findFilter)
+		self._mapArea.addFields(fields,self._fieldStyle)
+		self._mapArea.addFinds(finds,self._findStyle)
+		rgba,ids = rasterizeMap(self._mapArea,width,height)
+		tile = (encodePng(rgba),ids)
+		self._rasterCache.put(areaId,version,filterKey,width,height,tile[0],tile[1])
+		return tile
+	
+	def _genHit(self):
+		"""Look up the field or find under pixel Px,Py of the rasterized map and render its information"""
+		
+		data = {'htmlId':None,'info':''}
+		try:
+			try:
+				px = int(self._getParam('Px'))
+				py = int(self._getParam('Py'))
+			except ValueError:
+				raise Exception('Px and Py must be whole numbers')
+			ids = self._rasterTile()[1]
+			if 0 <= py < ids.shape[0] and 0 <= px < ids.shape[1]:
+				objId = int(ids[py,px])
+				if objId > 0:
+					obj = self._db.getFind(objId)
+					data['htmlId'] = 'Find' + str(objId)
+				elif objId < 0:
+					obj = self._db.getField(-objId)
+					data['htmlId'] = 'Field' + str(-objId)
+				if objId != 0:
+					data['info'] = obj.renderInfo()
+		except Exception as e:
+			data['error'] = str(e)
+		self._hitData = data
+	
+	def _areaQuery(self):
+		"""Return query parameters for the current area and find filter"""
+		
+		return [('MapArea',self._mapAreaName)] + [(key,value) for key in FindFilter.PARAMS for value in paramValues(self._params,key)]
+	
+	def _genIdLookup(self):
+		"""Look up a page of field ids, find ids or area names for the delete forms and area search
+		
+		Parameters are Lookup (field, find, area or delArea), Prefix, After (last value of the previous
+		page) and Limit. Errors are returned in the json rather than the status.
+		"""
+		
+		data = {'values':[],'more':False}
+		try:
+			kind = self._allowBlank('Lookup')
+			if kind not in ['field','find','area','delArea']:
+				raise Exception('Lookup must be field, find, area or delArea')
+			try:
+				limit = int(self._allowBlank('Limit') or _LOOKUP_PAGE_SIZE)
+			except ValueError:
+				raise Exception('Limit must be a number')
+			limit = max(1,min(limit,_LOOKUP_MAX_PAGE_SIZE))
+			after = self._allowBlank('After')
+			data['values'],data['more'] = self._db.lookupIds(kind,self._mapArea.areaId,self._allowBlank('Prefix'),None if after == '' else after,limit)
+		except Exception as e:
+			data['error'] = str(e)
+		self._lookupData = data
+	
 	def _performActions(self):
 		"""Performs any database actions requested"""
 		
@@ -209,6 +706,7 @@ class WebsiteFieldsFinds(object):
 			except Exception as e:
 				#Display error message
 				self._status = Status('Error',str(e))
+				self._actionFailed = True
 					
 		#Select Area to display
 		self._mapArea = self._db.getMapArea(self._mapAreaName)
@@ -222,7 +720,8 @@ class WebsiteFieldsFinds(object):
 											self._getParam('MapArea'),
 											self._getParam('MaxX'),
 											self._getParam('MaxY'),
-											self._allowBlank('ImgPath'))
+											self._allowBlank('ImgPath'),
+											self._allowBlank('LargeArea') == 'true')
 											
 			#Display success message								
 			self._status = Status('Success',message)
@@ -230,6 +729,7 @@ class WebsiteFieldsFinds(object):
 		except Exception as e:
 			#Display error message and display old map area
 			self._status = Status('Error',str(e))
+			self._actionFailed = True
 			self._mapAreaName = self._params['OldArea'].value
 
 	def _getParam(self,key):
@@ -251,4 +751,29 @@ class WebsiteFieldsFinds(object):
 		
 
 		
-	
\ No newline at end of file
+	
+
+
+class _QueryParam(object):
+	"""Single query string value with the same value attribute as cgi.FieldStorage items"""
+
+	def __init__(self,value):
+		self.value = value
+		
+def paramsFromQuery(query):
+	"""Build website parameters from a url query string, for running the website without cgi
+	
+	Keyword arguments:
+	query -- query string e.g. MapArea=Default&FilterClass=COIN
+	"""
+	
+	params = {}
+	for key,value in parse_qsl(query):
+		if key in params:
+			#Repeated parameters become a list as in cgi.FieldStorage
+			if not isinstance(params[key],list):
+				params[key] = [params[key]]
+			params[key].append(_QueryParam(value))
+		else:
+			params[key] = _QueryParam(value)
+	return params
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+""" Generate a large synthetic area for scale testing
+
+Packs non-overlapping fields with random rectangle cuts and places finds in site clusters
+with class and depth distributions by period. Fields and finds reference the crops, owners
+and classes of --reference. The same arguments and --seed always give the same area. Writes
+Insert statements, csv files per table or loads a SQLite stand-in database.
+
+Usage:
+	python generateArea.py --area-id 10 --name Synthetic --size 5000 --fields 10000 --finds 1000000
+		[--height 4000] [--seed 1] [--first-id N] [--reference oracle|sqlite:<file>]
+		[--sql area.sql [--dialect oracle|sqlite]] [--csv folder] [--load database.db]
+"""
+
+import argparse
+import sys
+import time
+
+#FieldsFindsLibrary is the main library for generating the website
+import fieldsFindsLibrary as ffLib
+
+
+def main():
+	"""Generate the area and write or load it"""
+
+	parser = argparse.ArgumentParser(description='Generate a large synthetic area for scale testing')
+	parser.add_argument('--area-id',type=int,required=True,help='new area id, 1 to 99')
+	parser.add_argument('--name',required=True,help='new area name')
+	parser.add_argument('--size',type=int,required=True,help='area width, and height unless --height is given')
+	parser.add_argument('--height',type=int,default=None,help='area height')
+	parser.add_argument('--fields',type=int,default=1000,help='number of fields (default 1000)')
+	parser.add_argument('--finds',type=int,default=10000,help='number of finds (default 10000)')
+	parser.add_argument('--seed',type=int,default=1,help='random seed (default 1)')
+	parser.add_argument('--first-id',type=int,default=None,help='first field and find id (default area id * 10000000)')
+	parser.add_argument('--reference',default=None,help='oracle or sqlite:<database file> to read crops, owners and classes from, the --load database or the demo data if not given')
+	parser.add_argument('--sql',default=None,help='write Insert statements to this file, - for stdout')
+	parser.add_argument('--dialect',default='oracle',choices=['oracle','sqlite'],help='sql for sqlplus or the sqlite3 shell (default oracle)')
+	parser.add_argument('--csv',default=None,help='write a csv file per table to this folder')
+	parser.add_argument('--load',default=None,help='load into this SQLite stand-in database')
+	args = parser.parse_args()
+	if args.sql == None and args.csv == None and args.load == None:
+		parser.error('give at least one of --sql, --csv or --load')
+
+	reference = None
+	source = args.reference if args.reference != None else ('sqlite:' + args.load if args.load != None else None)
+	if source != None:
+		db = ffLib.dbFromSource(source)
+		db.openConnection()
+		try:
+			reference = db.getReferenceRows()
+		finally:
+			db.closeConnection()
+
+	start = time.time()
+	height = args.height if args.height != None else args.size
+	tables = ffLib.generateArea(args.area_id,args.name,args.size,height,args.fields,args.finds,reference,args.seed,args.first_id)
+	log = sys.stderr if args.sql == '-' else sys.stdout
+	log.write('Generated %d fields and %d finds in %.1fs\n' % (len(tables[1][2]),len(tables[2][2]),time.time() - start))
+
+	if args.sql == '-':
+		ffLib.writeSql(tables,sys.stdout,args.dialect)
+	elif args.sql != None:
+		with open(args.sql,'w') as outFile:
+			ffLib.writeSql(tables,outFile,args.dialect)
+	if args.csv != None:
+		ffLib.writeCsv(tables,args.csv)
+	if args.load != None:
+		start = time.time()
+		db = ffLib.DbFieldsFindsSqlite(args.load)
+		db.openConnection()
+		try:
+			ffLib.loadArea(db,tables)
+		finally:
+			db.closeConnection()
+		log.write('Loaded area %s into %s in %.1fs\n' % (args.name,args.load,time.time() - start))
+
+if __name__ == '__main__':
+	main()
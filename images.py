@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+""" Serve resized images from the image cache
+
+Images are named by a hash of the source image so a name always has the same content and
+the response can be cached by browsers for a year. Uses FF_IMAGE_CACHE and FF_IMAGE_SOURCES
+as main.py does.
+
+Usage:
+	images.py?Name=<derivative name>
+"""
+
+import cgi
+import sys
+
+#FieldsFindsLibrary is the main library for generating the website
+import fieldsFindsLibrary as ffLib
+
+params = cgi.FieldStorage()
+cache = ffLib.ImageCache.fromEnvironment()
+image = None
+if cache != None and 'Name' in params:
+	image = cache.read(params['Name'].value)
+
+if image == None:
+	print('Status: 404 Not Found')
+	print('Content-Type: text/plain\n')
+	print('Image not found')
+else:
+	contentType,data = image
+	sys.stdout.write('Content-Type: ' + contentType + '\n')
+	sys.stdout.write('Cache-Control: public, max-age=31536000, immutable\n\n')
+	sys.stdout.flush()
+	sys.stdout.buffer.write(data)
@@ -11,6 +11,8 @@ It also catches any exceptions preventing the website to crash in the event of a
 
 #Import CGI so python can interact with browser
 import cgi
+import os
+import sys
 
 #FieldsFindsLibrary is the main library for generating the website
 import fieldsFindsLibrary as ffLib
@@ -18,18 +20,75 @@ import fieldsFindsLibrary as ffLib
 #Get parameters submitted
 params = cgi.FieldStorage()
 
+#Disabled until read from the environment so the error display can always record to it
+metrics = ffLib.MetricsRegistry(False)
+
 #Try catch block around website - don't want website to crash if anything goes wrong
 try:
-	#Initialise website
-	website = ffLib.WebsiteFieldsFinds(params)
+	#Page, statement and cache metrics are added to the FF_METRICS_FILE shared by every process
+	metrics = ffLib.MetricsRegistry.fromEnvironment()
+	ffLib.setMetrics(metrics)
+	
+	#Timing spans are enabled by the FF_TIMING_LOG or FF_TIMING environment variables
+	timer = ffLib.RequestTimer.fromEnvironment()
+	
+	#Pages without actions are served from the snapshot files when FF_SNAPSHOT_DIR is set
+	snapshotDir = os.environ.get('FF_SNAPSHOT_DIR')
+	if snapshotDir != None and 'Action' not in params:
+		db = ffLib.DbFieldsFindsSnapshot(snapshotDir)
+	else:
+		#FF_SQLITE serves from a local SQLite stand-in file rather than Oracle, used by load tests
+		sqlitePath = os.environ.get('FF_SQLITE')
+		db = ffLib.DbFieldsFindsSqlite(sqlitePath) if sqlitePath != None else ffLib.DbFieldsFinds()
+		db.setSnapshotDir(snapshotDir)
+	
+	#Images are linked at their display size from the FF_IMAGE_CACHE folder when set
+	imageCache = ffLib.ImageCache.fromEnvironment()
+	if imageCache != None:
+		ffLib.setImageResolver(imageCache.resolve)
+	
+	#Statement logging is enabled by the FF_QUERY_LOG environment variable
+	queryLog = ffLib.QueryLog.fromEnvironment()
+	if queryLog == None and metrics.enabled:
+		#Statements are recorded for the metrics without writing a log
+		queryLog = ffLib.QueryLog()
+	db.setQueryLog(queryLog)
+	
+	#Initialise website, FF_CONCURRENT=1 runs the page queries in parallel on pooled sessions
+	website = ffLib.WebsiteFieldsFinds(params,db,timer,os.environ.get('FF_CONCURRENT') == '1')
+	
+	#Maps with more objects than FF_RASTER_OVER are drawn as png, cached for every process in FF_RASTER_DIR
+	rasterOver = os.environ.get('FF_RASTER_OVER')
+	if rasterOver != None:
+		rasterDir = os.environ.get('FF_RASTER_DIR')
+		website.setRaster(int(rasterOver),ffLib.RasterCache(rasterDir) if rasterDir != None else None)
+	
+	#Identical views running at once are rendered once, shared between processes through FF_COALESCE_DIR
+	website.setCoalescer(ffLib.SingleFlight.fromEnvironment())
 	
 	#Perform actions and create website
 	website.run()
 	
-	#Print to screen
-	print(website)
+	#Print to screen, png images are written as bytes
+	if website.binary:
+		output = bytes(website)
+		sys.stdout.flush()
+		sys.stdout.buffer.write(output)
+	else:
+		output = str(website)
+		print(output)
+		output = output.encode('utf-8')
+	
+	#Append request timings to the log
+	timer.writeLog(os.environ.get('QUERY_STRING',''))
+	if queryLog != None:
+		queryLog.writeSummary(os.environ.get('QUERY_STRING',''))
+	metrics.recordPage(params.getfirst('Action'),params.getfirst('Format'),timer.elapsed(),len(output))
+	if queryLog != None:
+		metrics.recordStatements(queryLog)
 	
 except Exception as e:
+	metrics.recordError(params.getfirst('Action'))
 	#Create basic error display in case website experiences a major failure such as the database being offline
 	print("Content-Type: text/html\n")
 	print("<!DOCTYPE html>")
@@ -41,5 +100,4 @@ except Exception as e:
 	print("</font><br><br>Please contact s1783947@sms.ed.ac.uk</center></body>")
 	print("</html>")
 
-
-
+metrics.flush()
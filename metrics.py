@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+
+""" Serve the website metrics in the Prometheus text format
+
+Returns the page, database statement and cache counters and histograms added to the
+FF_METRICS_FILE by every main.py process, as main.py does.
+
+Usage:
+	metrics.py
+"""
+
+import sys
+
+#FieldsFindsLibrary is the main library for generating the website
+import fieldsFindsLibrary as ffLib
+
+metrics = ffLib.MetricsRegistry.fromEnvironment()
+if not metrics.enabled:
+	print('Status: 404 Not Found')
+	print('Content-Type: text/plain\n')
+	print('Metrics are not enabled')
+else:
+	sys.stdout.write('Content-Type: text/plain; version=0.0.4; charset=utf-8\n\n')
+	sys.stdout.write(metrics.render())
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+""" Apply the schema migrations
+
+Applies the sql/migrations scripts not yet recorded in FF_SCHEMA_VERSION in version order.
+The SQLite stand-in applies them itself when connecting.
+
+Usage:
+	python migrate.py [--sqlite database.db] [--target N] [--list]
+"""
+
+import argparse
+
+#FieldsFindsLibrary is the main library for generating the website
+import fieldsFindsLibrary as ffLib
+
+
+def main():
+	"""Apply or list migrations"""
+
+	parser = argparse.ArgumentParser(description='Apply the fields and finds schema migrations')
+	parser.add_argument('--sqlite',default=None,help='migrate this SQLite stand-in database rather than Oracle')
+	parser.add_argument('--target',type=int,default=None,help='highest version to apply')
+	parser.add_argument('--list',action='store_true',help='list migrations and whether they are applied')
+	args = parser.parse_args()
+
+	db = ffLib.DbFieldsFindsSqlite(args.sqlite,migrate=False) if args.sqlite != None else ffLib.DbFieldsFinds()
+	db.openConnection()
+	if args.list:
+		applied = set(db.getSchemaVersions())
+		for version,name,path in ffLib.listMigrations(db.dialect):
+			print('%03d %-30s %s' % (version,name,'applied' if version in applied else 'pending'))
+	else:
+		for version,name in db.migrateSchema(args.target):
+			print('Applied %03d %s' % (version,name))
+		print('Schema at version ' + str(max(db.getSchemaVersions() + [0])))
+	db.closeConnection()
+
+if __name__ == '__main__':
+	main()
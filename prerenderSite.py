@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+""" Pre-render the website as static pages
+
+Renders the full page of every map area, unfiltered and for each find class, into static html
+files that a plain web server can serve without python or the database. The area dropdown and
+filter buttons link between the static pages; adding or deleting data still uses main.py.
+
+Usage:
+	python prerenderSite.py outDir [--source oracle|sqlite:<file>|snapshot:<folder>]
+								[--processes N] [--incremental]
+"""
+
+import argparse
+
+#FieldsFindsLibrary is the main library for generating the website
+import fieldsFindsLibrary as ffLib
+
+
+def main():
+	"""Pre-render all pages and print a summary"""
+
+	parser = argparse.ArgumentParser(description='Pre-render every area and filter page as static html')
+	parser.add_argument('outDir',help='folder to write the static pages to')
+	parser.add_argument('--source',default='oracle',help='oracle, sqlite:<database file> or snapshot:<snapshot folder>')
+	parser.add_argument('--processes',type=int,default=None,help='worker processes, one per core by default')
+	parser.add_argument('--incremental',action='store_true',help='only re-render areas whose pages changed since the last run')
+	args = parser.parse_args()
+
+	summary = ffLib.prerenderSite(args.source,args.outDir,args.processes,args.incremental)
+	print('Rendered %d of %d areas (%d pages) in %.2fs' % (summary['renderedAreas'],summary['areas'],summary['pages'],summary['seconds']))
+
+if __name__ == '__main__':
+	main()
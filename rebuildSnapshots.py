@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+""" Rebuild the area snapshot files
+
+Writes a snapshot file for every map area plus the index of areas and drop down lists so
+main.py can serve pages from local files when FF_SNAPSHOT_DIR is set.
+
+Usage:
+	python rebuildSnapshots.py snapshotDir [--sqlite database.db]
+"""
+
+import argparse
+import os
+
+#FieldsFindsLibrary is the main library for generating the website
+import fieldsFindsLibrary as ffLib
+
+
+def main():
+	"""Rebuild all snapshots"""
+
+	parser = argparse.ArgumentParser(description='Rebuild the fields and finds area snapshot files')
+	parser.add_argument('snapshotDir',help='folder to write the snapshots to')
+	parser.add_argument('--sqlite',default=None,help='read from this SQLite stand-in database rather than Oracle')
+	args = parser.parse_args()
+
+	if not os.path.isdir(args.snapshotDir):
+		os.makedirs(args.snapshotDir)
+
+	db = ffLib.DbFieldsFindsSqlite(args.sqlite) if args.sqlite != None else ffLib.DbFieldsFinds()
+	db.openConnection()
+	count = db.rebuildSnapshots(args.snapshotDir)
+	db.closeConnection()
+	print('Wrote ' + str(count) + ' area snapshots to ' + args.snapshotDir)
+
+if __name__ == '__main__':
+	main()
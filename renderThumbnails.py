@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+""" Render thumbnails of every map area
+
+Renders a simplified svg thumbnail of every map area in a process pool and writes an
+index.html overview page beside them, e.g. for a nightly report.
+
+Usage:
+	python renderThumbnails.py outDir [--source oracle|sqlite:<file>|snapshot:<folder>]
+								[--processes N] [--size 200] [--max-finds 500]
+"""
+
+import argparse
+import time
+
+#FieldsFindsLibrary is the main library for generating the website
+import fieldsFindsLibrary as ffLib
+
+
+def main():
+	"""Render all thumbnails and print a summary"""
+
+	parser = argparse.ArgumentParser(description='Render thumbnails of every map area')
+	parser.add_argument('outDir',help='folder to write the thumbnails and index.html to')
+	parser.add_argument('--source',default='oracle',help='oracle, sqlite:<database file> or snapshot:<snapshot folder>')
+	parser.add_argument('--processes',type=int,default=None,help='worker processes, one per core by default')
+	parser.add_argument('--size',type=int,default=200,help='thumbnail width and height in pixels')
+	parser.add_argument('--max-finds',type=int,default=500,help='most finds drawn per thumbnail')
+	args = parser.parse_args()
+
+	start = time.perf_counter()
+	results = ffLib.renderThumbnails(args.source,args.outDir,args.processes,args.size,args.max_finds)
+	for result in results:
+		print('%-30s %6d fields %8d finds %8.3fs' % (result['areaName'],result['fields'],result['finds'],result['seconds']))
+	print('Rendered ' + str(len(results)) + ' thumbnails in %.2fs' % (time.perf_counter() - start))
+
+if __name__ == '__main__':
+	main()
@@ -1,7 +1,7 @@
 CREATE TABLE FF_AREA
 (AREA_ID NUMBER(2) NOT NULL,
 AREA_NAME VARCHAR(50),
-MAX_X NUMBER(4) CHECK (MAX_X>0),
-MAX_Y NUMBER(4) CHECK (MAX_Y>0),
+MAX_X NUMBER(6) CHECK (MAX_X>0),
+MAX_Y NUMBER(6) CHECK (MAX_Y>0),
 IMAGE_PATH VARCHAR(1000),
 PRIMARY KEY (AREA_ID));
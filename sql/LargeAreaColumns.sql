@@ -0,0 +1,20 @@
+-- Widen coordinate and id columns of an existing schema for large-area mode
+-- New installs get these column sizes from the Create scripts
+ALTER TABLE FF_AREA MODIFY (MAX_X NUMBER(6), MAX_Y NUMBER(6));
+
+-- Drop the old 0 to 50 coordinate and area checks (system generated names)
+BEGIN
+	FOR C IN (SELECT TABLE_NAME, CONSTRAINT_NAME FROM USER_CONSTRAINTS
+			WHERE CONSTRAINT_TYPE = 'C'
+			AND TABLE_NAME IN ('FF_FIELDS_NEW','FF_FINDS_NEW')
+			AND REGEXP_LIKE(SEARCH_CONDITION_VC,'^(LOWX|LOWY|HIX|HIY|AREA|XCOORD|YCOORD) BETWEEN')) LOOP
+		EXECUTE IMMEDIATE 'ALTER TABLE ' || C.TABLE_NAME || ' DROP CONSTRAINT ' || C.CONSTRAINT_NAME;
+	END LOOP;
+END;
+/
+
+ALTER TABLE FF_FIELDS_NEW MODIFY (FIELD_ID NUMBER(10), LOWX NUMBER(6), LOWY NUMBER(6), HIX NUMBER(6), HIY NUMBER(6), AREA NUMBER(13,2));
+ALTER TABLE FF_FIELDS_NEW ADD (CHECK (LOWX BETWEEN 0 AND 100000), CHECK (LOWY BETWEEN 0 AND 100000), CHECK (HIX BETWEEN 1 AND 100000), CHECK (HIY BETWEEN 1 AND 100000), CHECK (AREA BETWEEN 0 AND 10000000000));
+
+ALTER TABLE FF_FINDS_NEW MODIFY (FIND_ID NUMBER(10), XCOORD NUMBER(6), YCOORD NUMBER(6));
+ALTER TABLE FF_FINDS_NEW ADD (CHECK (XCOORD BETWEEN 0 AND 100000), CHECK (YCOORD BETWEEN 0 AND 100000));
@@ -1,10 +1,10 @@
 CREATE TABLE FF_FIELDS_NEW
-(FIELD_ID NUMBER(2) NOT NULL,
-LOWX NUMBER(2) CHECK (LOWX BETWEEN 0 AND 50),
-LOWY NUMBER(2) CHECK (LOWY BETWEEN 0 AND 50),
-HIX NUMBER(2) CHECK (HIX BETWEEN 1 AND 50),
-HIY NUMBER(2) CHECK (HIY BETWEEN 1 AND 50),
-AREA NUMBER(5,2) CHECK (AREA BETWEEN 0 AND 2500), 
+(FIELD_ID NUMBER(10) NOT NULL,
+LOWX NUMBER(6) CHECK (LOWX BETWEEN 0 AND 100000),
+LOWY NUMBER(6) CHECK (LOWY BETWEEN 0 AND 100000),
+HIX NUMBER(6) CHECK (HIX BETWEEN 1 AND 100000),
+HIY NUMBER(6) CHECK (HIY BETWEEN 1 AND 100000),
+AREA NUMBER(13,2) CHECK (AREA BETWEEN 0 AND 10000000000), 
 OWNER VARCHAR(50),
 CROP NUMBER(4),
 AREA_ID NUMBER(2) NOT NULL,
@@ -1,7 +1,7 @@
 CREATE TABLE FF_FINDS_NEW
-(FIND_ID NUMBER(4) NOT NULL,
-XCOORD NUMBER(2) CHECK (XCOORD BETWEEN 0 AND 50),
-YCOORD NUMBER(2) CHECK (YCOORD BETWEEN 0 AND 50),
+(FIND_ID NUMBER(10) NOT NULL,
+XCOORD NUMBER(6) CHECK (XCOORD BETWEEN 0 AND 100000),
+YCOORD NUMBER(6) CHECK (YCOORD BETWEEN 0 AND 100000),
 TYPE NUMBER(4),
 DEPTH NUMBER(4,2) CHECK (DEPTH BETWEEN 0 AND 30), 
 FIELD_NOTES VARCHAR(100),
@@ -0,0 +1,4 @@
+-- One find per coordinate in an area, as checked by _checkFindCoord
+-- The unique index replaces the non-unique coordinate index from 001
+DROP INDEX FF_FINDS_NEW_AREA_XY_IDX;
+ALTER TABLE FF_FINDS_NEW ADD CONSTRAINT FF_FINDS_NEW_AREA_XY_UK UNIQUE (AREA_ID, XCOORD, YCOORD);
@@ -0,0 +1,89 @@
+-- Views without ORDER BY and combined with UNION ALL so per-area predicates reach the table indexes
+-- Legacy and new ids never overlap so UNION ALL returns the same rows. Queries order their own results
+
+CREATE OR REPLACE VIEW VIEW_FIELDS AS
+SELECT
+	A.FIELD_ID AS "FIELD_ID",
+	A.LOWX AS "LOW_X",
+	A.HIX AS "HI_X",
+	A.LOWY AS "LOW_Y",
+	A.HIY AS "HI_Y",
+	A.AREA AS "FIELD_AREA",
+	B.NAME AS "CROP_NAME",
+	B.START_OF_SEASON AS "CROP_START",
+	B.END_OF_SEASON AS "CROP_END",
+	A.OWNER AS "OWNER",
+	1 AS "AREA_ID",
+	C.IMAGE_PATH AS "OWNER_IMAGE",
+	D.IMAGE_PATH AS "CROP_IMAGE"
+	FROM GISTEACH.FIELDS A
+	LEFT JOIN GISTEACH.CROPS B ON A.CROP = B.CROP
+	LEFT JOIN S1783947.FF_FARMERS C ON A.OWNER = C.FARMER_NAME
+	LEFT JOIN S1783947.FF_CROP_IMAGES D ON A.CROP = D.CROP_ID;
+
+CREATE OR REPLACE VIEW VIEW_FIELDS_NEW AS
+SELECT
+	A.FIELD_ID AS "FIELD_ID",
+	A.LOWX AS "LOW_X",
+	A.HIX AS "HI_X",
+	A.LOWY AS "LOW_Y",
+	A.HIY AS "HI_Y",
+	A.AREA AS "FIELD_AREA",
+	B.NAME AS "CROP_NAME",
+	B.START_OF_SEASON AS "CROP_START",
+	B.END_OF_SEASON AS "CROP_END",
+	A.OWNER AS "OWNER",
+	A.AREA_ID AS "AREA_ID",
+	C.IMAGE_PATH AS "OWNER_IMAGE",
+	B.IMAGE_PATH AS "CROP_IMAGE"
+	FROM S1783947.FF_FIELDS_NEW A
+	LEFT JOIN S1783947.VIEW_CROP_COMB B ON A.CROP = B.CROP
+	LEFT JOIN S1783947.FF_FARMERS C ON A.OWNER = C.FARMER_NAME;
+
+CREATE OR REPLACE VIEW VIEW_FIELDS_COMB
+AS
+SELECT * FROM VIEW_FIELDS
+UNION ALL
+SELECT * FROM VIEW_FIELDS_NEW;
+
+CREATE OR REPLACE VIEW VIEW_FINDS
+AS
+SELECT
+	A.FIND_ID AS "OBJECT_ID",
+	A.XCOORD AS "X",
+	A.YCOORD AS "Y",
+	A.DEPTH AS "DEPTH",
+	A.FIELD_NOTES AS "FIELD_NOTES",
+	B.NAME AS "TYPE",
+	B.PERIOD AS "PERIOD",
+	B.USE AS "USE",
+	1 AS "AREA_ID",
+	C.COLOUR AS "COLOUR",
+	D.IMAGE_PATH AS "FIND_IMAGE"
+	FROM GISTEACH.FINDS A
+	LEFT JOIN GISTEACH.CLASS B ON A.TYPE = B.TYPE
+	LEFT JOIN S1783947.FF_FIND_COLOUR C ON B.TYPE = C.TYPE_ID
+	LEFT JOIN S1783947.FF_FIND_IMAGES D ON A.FIND_ID = D.FIND_ID;
+
+CREATE OR REPLACE VIEW VIEW_FINDS_NEW
+AS
+SELECT
+	A.FIND_ID AS "OBJECT_ID",
+	A.XCOORD AS "X",
+	A.YCOORD AS "Y",
+	A.DEPTH AS "DEPTH",
+	A.FIELD_NOTES AS "FIELD_NOTES",
+	B.NAME AS "TYPE",
+	B.PERIOD AS "PERIOD",
+	B.USE AS "USE",
+	A.AREA_ID AS "AREA_ID",
+	B.COLOUR AS "COLOUR",
+	A.IMAGE_PATH AS "FIND_IMAGE"
+	FROM S1783947.FF_FINDS_NEW A
+	LEFT JOIN S1783947.VIEW_CLASS_COMB B ON A.TYPE = B.TYPE;
+
+CREATE OR REPLACE VIEW VIEW_FINDS_COMB
+AS
+SELECT * FROM VIEW_FINDS
+UNION ALL
+SELECT * FROM VIEW_FINDS_NEW;
@@ -0,0 +1,44 @@
+-- Denormalized copies of VIEW_FIELDS_COMB and VIEW_FINDS_COMB read by the website
+-- Materialized views would need fast refresh logs on the GISTEACH tables so DbFieldsFinds keeps them current from its add and delete methods, checkMaterialized compares them with the views
+CREATE TABLE FF_FIELDS_MAT
+(FIELD_ID NUMBER(10) NOT NULL,
+LOW_X NUMBER(6),
+HI_X NUMBER(6),
+LOW_Y NUMBER(6),
+HI_Y NUMBER(6),
+FIELD_AREA NUMBER(13,2),
+CROP_NAME VARCHAR(30),
+CROP_START DATE,
+CROP_END DATE,
+OWNER VARCHAR(50),
+AREA_ID NUMBER(2) NOT NULL,
+OWNER_IMAGE VARCHAR(1000),
+CROP_IMAGE VARCHAR(1000),
+PRIMARY KEY (FIELD_ID));
+
+CREATE TABLE FF_FINDS_MAT
+(OBJECT_ID NUMBER(10) NOT NULL,
+X NUMBER(6),
+Y NUMBER(6),
+DEPTH NUMBER(4,2),
+FIELD_NOTES VARCHAR(100),
+TYPE VARCHAR(30),
+PERIOD VARCHAR(30),
+USE VARCHAR(50),
+AREA_ID NUMBER(2) NOT NULL,
+COLOUR VARCHAR(50),
+FIND_IMAGE VARCHAR(1000),
+PRIMARY KEY (OBJECT_ID));
+
+INSERT INTO FF_FIELDS_MAT (FIELD_ID, LOW_X, HI_X, LOW_Y, HI_Y, FIELD_AREA, CROP_NAME, CROP_START, CROP_END, OWNER, AREA_ID, OWNER_IMAGE, CROP_IMAGE)
+SELECT FIELD_ID, LOW_X, HI_X, LOW_Y, HI_Y, FIELD_AREA, CROP_NAME, CROP_START, CROP_END, OWNER, AREA_ID, OWNER_IMAGE, CROP_IMAGE FROM VIEW_FIELDS_COMB;
+
+INSERT INTO FF_FINDS_MAT (OBJECT_ID, X, Y, DEPTH, FIELD_NOTES, TYPE, PERIOD, USE, AREA_ID, COLOUR, FIND_IMAGE)
+SELECT OBJECT_ID, X, Y, DEPTH, FIELD_NOTES, TYPE, PERIOD, USE, AREA_ID, COLOUR, FIND_IMAGE FROM VIEW_FINDS_COMB;
+
+-- Same access paths as the base table indexes
+CREATE INDEX FF_FIELDS_MAT_AREA_ID_IDX ON FF_FIELDS_MAT (AREA_ID, FIELD_ID);
+CREATE INDEX FF_FIELDS_MAT_AREA_BOX_IDX ON FF_FIELDS_MAT (AREA_ID, LOW_X, HI_X, LOW_Y, HI_Y);
+CREATE INDEX FF_FINDS_MAT_AREA_ID_IDX ON FF_FINDS_MAT (AREA_ID, OBJECT_ID);
+CREATE INDEX FF_FINDS_MAT_AREA_TYPE_IDX ON FF_FINDS_MAT (AREA_ID, TYPE, DEPTH);
+CREATE INDEX FF_FINDS_MAT_AREA_XY_IDX ON FF_FINDS_MAT (AREA_ID, X, Y);
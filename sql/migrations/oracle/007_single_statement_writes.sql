@@ -0,0 +1,116 @@
+-- Single round trip field and find inserts for DbFieldsFinds.addField and addFind
+-- Each procedure checks the area bounds, conflicts and the crop or class, inserts the new row and its denormalized copy and returns the new id and area id, or the error message naming any conflicting ids
+CREATE OR REPLACE PROCEDURE FF_ADD_FIELD
+(P_AREA_NAME IN VARCHAR2,
+P_LOWX IN NUMBER,
+P_HIX IN NUMBER,
+P_LOWY IN NUMBER,
+P_HIY IN NUMBER,
+P_AREA IN NUMBER,
+P_OWNER IN VARCHAR2,
+P_CROP_NAME IN VARCHAR2,
+P_FIELD_ID OUT NUMBER,
+P_AREA_ID OUT NUMBER,
+P_ERROR OUT VARCHAR2)
+AS
+	V_MAX_X NUMBER;
+	V_MAX_Y NUMBER;
+	V_CROP NUMBER;
+	V_COUNT NUMBER;
+	V_CONFLICTS VARCHAR2(4000);
+BEGIN
+	BEGIN
+		SELECT AREA_ID, MAX_X, MAX_Y INTO P_AREA_ID, V_MAX_X, V_MAX_Y FROM FF_AREA WHERE AREA_NAME = P_AREA_NAME;
+	EXCEPTION
+		WHEN NO_DATA_FOUND THEN
+			P_ERROR := 'Cannot Find Requested Map Area';
+			RETURN;
+		WHEN TOO_MANY_ROWS THEN
+			P_ERROR := 'Duplicate Map Areas Returned';
+			RETURN;
+	END;
+	IF P_HIX > V_MAX_X OR P_HIY > V_MAX_Y THEN
+		P_ERROR := 'X coordinate must be within area bounds';
+		RETURN;
+	END IF;
+	SELECT LISTAGG(FIELD_ID, ', ') WITHIN GROUP (ORDER BY FIELD_ID) INTO V_CONFLICTS FROM FF_FIELDS_MAT
+		WHERE AREA_ID = P_AREA_ID AND ((P_LOWX + 0.1 > LOW_X AND P_LOWX + 0.1 < HI_X AND P_LOWY + 0.1 > LOW_Y AND P_LOWY + 0.1 < HI_Y)
+		OR (P_HIX - 0.1 > LOW_X AND P_HIX - 0.1 < HI_X AND P_LOWY + 0.1 > LOW_Y AND P_LOWY + 0.1 < HI_Y)
+		OR (P_LOWX + 0.1 > LOW_X AND P_LOWX + 0.1 < HI_X AND P_HIY - 0.1 > LOW_Y AND P_HIY - 0.1 < HI_Y)
+		OR (P_HIX - 0.1 > LOW_X AND P_HIX - 0.1 < HI_X AND P_HIY - 0.1 > LOW_Y AND P_HIY - 0.1 < HI_Y));
+	IF V_CONFLICTS IS NOT NULL THEN
+		P_ERROR := 'Cannot intersect with other fields. This field would intersect with ' || V_CONFLICTS;
+		RETURN;
+	END IF;
+	SELECT COUNT(*), MAX(CROP) INTO V_COUNT, V_CROP FROM VIEW_CROP_COMB WHERE NAME = P_CROP_NAME;
+	IF V_COUNT = 0 THEN
+		P_ERROR := 'Crop does not exist: ' || P_CROP_NAME;
+		RETURN;
+	ELSIF V_COUNT > 1 THEN
+		P_ERROR := 'Duplicate crop in database: ' || P_CROP_NAME;
+		RETURN;
+	END IF;
+	SELECT NVL(MAX(FIELD_ID), 0) + 1 INTO P_FIELD_ID FROM FF_FIELDS_MAT;
+	INSERT INTO FF_FIELDS_NEW (FIELD_ID, LOWX, HIX, LOWY, HIY, AREA, OWNER, CROP, AREA_ID)
+		VALUES (P_FIELD_ID, P_LOWX, P_HIX, P_LOWY, P_HIY, P_AREA, P_OWNER, V_CROP, P_AREA_ID);
+	INSERT INTO FF_FIELDS_MAT (FIELD_ID, LOW_X, HI_X, LOW_Y, HI_Y, FIELD_AREA, CROP_NAME, CROP_START, CROP_END, OWNER, AREA_ID, OWNER_IMAGE, CROP_IMAGE)
+		SELECT FIELD_ID, LOW_X, HI_X, LOW_Y, HI_Y, FIELD_AREA, CROP_NAME, CROP_START, CROP_END, OWNER, AREA_ID, OWNER_IMAGE, CROP_IMAGE FROM VIEW_FIELDS_COMB WHERE FIELD_ID = P_FIELD_ID;
+END;
+/
+
+CREATE OR REPLACE PROCEDURE FF_ADD_FIND
+(P_AREA_NAME IN VARCHAR2,
+P_X IN NUMBER,
+P_Y IN NUMBER,
+P_TYPE_NAME IN VARCHAR2,
+P_DEPTH IN NUMBER,
+P_NOTES IN VARCHAR2,
+P_IMAGE_PATH IN VARCHAR2,
+P_FIND_ID OUT NUMBER,
+P_AREA_ID OUT NUMBER,
+P_ERROR OUT VARCHAR2)
+AS
+	V_MAX_X NUMBER;
+	V_MAX_Y NUMBER;
+	V_TYPE NUMBER;
+	V_COUNT NUMBER;
+	V_CONFLICTS VARCHAR2(4000);
+BEGIN
+	BEGIN
+		SELECT AREA_ID, MAX_X, MAX_Y INTO P_AREA_ID, V_MAX_X, V_MAX_Y FROM FF_AREA WHERE AREA_NAME = P_AREA_NAME;
+	EXCEPTION
+		WHEN NO_DATA_FOUND THEN
+			P_ERROR := 'Cannot Find Requested Map Area';
+			RETURN;
+		WHEN TOO_MANY_ROWS THEN
+			P_ERROR := 'Duplicate Map Areas Returned';
+			RETURN;
+	END;
+	IF P_X > V_MAX_X THEN
+		P_ERROR := 'X coordinate must be within area bounds';
+		RETURN;
+	ELSIF P_Y > V_MAX_Y THEN
+		P_ERROR := 'Y coordinate must be within area bounds';
+		RETURN;
+	END IF;
+	SELECT LISTAGG(OBJECT_ID, ', ') WITHIN GROUP (ORDER BY OBJECT_ID) INTO V_CONFLICTS FROM FF_FINDS_MAT
+		WHERE AREA_ID = P_AREA_ID AND X = P_X AND Y = P_Y;
+	IF V_CONFLICTS IS NOT NULL THEN
+		P_ERROR := 'Cannot have same coordinate as existing find. This find has the same as ' || V_CONFLICTS;
+		RETURN;
+	END IF;
+	SELECT COUNT(*), MAX(TYPE) INTO V_COUNT, V_TYPE FROM VIEW_CLASS_COMB WHERE NAME = P_TYPE_NAME;
+	IF V_COUNT = 0 THEN
+		P_ERROR := 'Type does not exist: ' || P_TYPE_NAME;
+		RETURN;
+	ELSIF V_COUNT > 1 THEN
+		P_ERROR := 'Duplicate Type in database: ' || P_TYPE_NAME;
+		RETURN;
+	END IF;
+	SELECT NVL(MAX(OBJECT_ID), 0) + 1 INTO P_FIND_ID FROM FF_FINDS_MAT;
+	INSERT INTO FF_FINDS_NEW (FIND_ID, XCOORD, YCOORD, TYPE, DEPTH, FIELD_NOTES, AREA_ID, IMAGE_PATH)
+		VALUES (P_FIND_ID, P_X, P_Y, V_TYPE, P_DEPTH, P_NOTES, P_AREA_ID, P_IMAGE_PATH);
+	INSERT INTO FF_FINDS_MAT (OBJECT_ID, X, Y, DEPTH, FIELD_NOTES, TYPE, PERIOD, USE, AREA_ID, COLOUR, FIND_IMAGE)
+		SELECT OBJECT_ID, X, Y, DEPTH, FIELD_NOTES, TYPE, PERIOD, USE, AREA_ID, COLOUR, FIND_IMAGE FROM VIEW_FINDS_COMB WHERE OBJECT_ID = P_FIND_ID;
+END;
+/
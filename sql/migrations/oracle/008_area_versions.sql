@@ -0,0 +1,66 @@
+-- Per area data version and change log for DbFieldsFinds.getAreaVersion and getChangesSince
+-- Row triggers bump the area version and log the change inside the transaction of every field and find insert and delete
+CREATE TABLE FF_AREA_VERSION
+(AREA_ID NUMBER(2) NOT NULL,
+VERSION NUMBER(10) NOT NULL,
+PRIMARY KEY (AREA_ID));
+
+CREATE TABLE FF_CHANGE_LOG
+(AREA_ID NUMBER(2) NOT NULL,
+VERSION NUMBER(10) NOT NULL,
+KIND VARCHAR2(5) NOT NULL,
+OBJECT_ID NUMBER(10) NOT NULL,
+CHANGE VARCHAR2(6) NOT NULL,
+PRIMARY KEY (AREA_ID, VERSION));
+
+INSERT INTO FF_AREA_VERSION (AREA_ID, VERSION) SELECT AREA_ID, 0 FROM FF_AREA;
+
+CREATE OR REPLACE TRIGGER FF_FIELDS_NEW_VERSION_TRG AFTER INSERT OR DELETE ON FF_FIELDS_NEW FOR EACH ROW
+DECLARE
+	V_AREA NUMBER;
+	V_ID NUMBER;
+	V_CHANGE VARCHAR2(6);
+	V_VERSION NUMBER;
+BEGIN
+	IF INSERTING THEN
+		V_AREA := :NEW.AREA_ID;
+		V_ID := :NEW.FIELD_ID;
+		V_CHANGE := 'insert';
+	ELSE
+		V_AREA := :OLD.AREA_ID;
+		V_ID := :OLD.FIELD_ID;
+		V_CHANGE := 'delete';
+	END IF;
+	UPDATE FF_AREA_VERSION SET VERSION = VERSION + 1 WHERE AREA_ID = V_AREA RETURNING VERSION INTO V_VERSION;
+	IF SQL%ROWCOUNT = 0 THEN
+		V_VERSION := 1;
+		INSERT INTO FF_AREA_VERSION (AREA_ID, VERSION) VALUES (V_AREA, V_VERSION);
+	END IF;
+	INSERT INTO FF_CHANGE_LOG (AREA_ID, VERSION, KIND, OBJECT_ID, CHANGE) VALUES (V_AREA, V_VERSION, 'field', V_ID, V_CHANGE);
+END;
+/
+
+CREATE OR REPLACE TRIGGER FF_FINDS_NEW_VERSION_TRG AFTER INSERT OR DELETE ON FF_FINDS_NEW FOR EACH ROW
+DECLARE
+	V_AREA NUMBER;
+	V_ID NUMBER;
+	V_CHANGE VARCHAR2(6);
+	V_VERSION NUMBER;
+BEGIN
+	IF INSERTING THEN
+		V_AREA := :NEW.AREA_ID;
+		V_ID := :NEW.FIND_ID;
+		V_CHANGE := 'insert';
+	ELSE
+		V_AREA := :OLD.AREA_ID;
+		V_ID := :OLD.FIND_ID;
+		V_CHANGE := 'delete';
+	END IF;
+	UPDATE FF_AREA_VERSION SET VERSION = VERSION + 1 WHERE AREA_ID = V_AREA RETURNING VERSION INTO V_VERSION;
+	IF SQL%ROWCOUNT = 0 THEN
+		V_VERSION := 1;
+		INSERT INTO FF_AREA_VERSION (AREA_ID, VERSION) VALUES (V_AREA, V_VERSION);
+	END IF;
+	INSERT INTO FF_CHANGE_LOG (AREA_ID, VERSION, KIND, OBJECT_ID, CHANGE) VALUES (V_AREA, V_VERSION, 'find', V_ID, V_CHANGE);
+END;
+/
@@ -0,0 +1,10 @@
+-- Indexes supporting the find filter predicates pushed into VIEW_FINDS_COMB
+-- Class and depth filters within an area
+CREATE INDEX FF_FINDS_NEW_AREA_TYPE_IDX ON FF_FINDS_NEW (AREA_ID, TYPE, DEPTH);
+
+-- Bounding box and field filters within an area
+CREATE INDEX FF_FINDS_NEW_AREA_XY_IDX ON FF_FINDS_NEW (AREA_ID, XCOORD, YCOORD);
+
+-- Period and use filters resolve to class types
+CREATE INDEX FF_CLASS_NEW_PERIOD_IDX ON FF_CLASS_NEW (PERIOD);
+CREATE INDEX FF_CLASS_NEW_USE_IDX ON FF_CLASS_NEW (USE);
@@ -0,0 +1,7 @@
+-- Composite indexes for the per-area queries
+-- Fields in an area and the intersect check
+CREATE INDEX FF_FIELDS_NEW_AREA_BOX_IDX ON FF_FIELDS_NEW (AREA_ID, LOWX, HIX, LOWY, HIY);
+
+-- Ordered id lists for the delete forms
+CREATE INDEX FF_FIELDS_NEW_AREA_ID_IDX ON FF_FIELDS_NEW (AREA_ID, FIELD_ID);
+CREATE INDEX FF_FINDS_NEW_AREA_ID_IDX ON FF_FINDS_NEW (AREA_ID, FIND_ID);
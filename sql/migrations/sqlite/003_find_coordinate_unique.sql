@@ -0,0 +1,5 @@
+-- One find per coordinate in an area, as checked by _checkFindCoord
+-- The unique index replaces the non-unique coordinate index from 001
+-- SQLite cannot add a table constraint so a unique index is used
+DROP INDEX FF_FINDS_NEW_AREA_XY_IDX;
+CREATE UNIQUE INDEX FF_FINDS_NEW_AREA_XY_UK ON FF_FINDS_NEW (AREA_ID, XCOORD, YCOORD);
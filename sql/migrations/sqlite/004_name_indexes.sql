@@ -0,0 +1,4 @@
+-- Name lookups used by getMapArea and the add checks
+CREATE UNIQUE INDEX FF_AREA_NAME_UK ON FF_AREA (AREA_NAME);
+CREATE INDEX FF_CLASS_NEW_NAME_IDX ON FF_CLASS_NEW (NAME);
+CREATE INDEX FF_CROPS_NEW_NAME_IDX ON FF_CROPS_NEW (NAME);
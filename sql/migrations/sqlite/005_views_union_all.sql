@@ -0,0 +1,95 @@
+-- Views without ORDER BY and combined with UNION ALL so per-area predicates reach the table indexes
+-- Legacy and new ids never overlap so UNION ALL returns the same rows. Queries order their own results
+DROP VIEW VIEW_FIELDS_COMB;
+DROP VIEW VIEW_FINDS_COMB;
+DROP VIEW VIEW_FIELDS;
+DROP VIEW VIEW_FIELDS_NEW;
+DROP VIEW VIEW_FINDS;
+DROP VIEW VIEW_FINDS_NEW;
+
+CREATE VIEW VIEW_FIELDS AS
+SELECT
+	A.FIELD_ID AS "FIELD_ID",
+	A.LOWX AS "LOW_X",
+	A.HIX AS "HI_X",
+	A.LOWY AS "LOW_Y",
+	A.HIY AS "HI_Y",
+	A.AREA AS "FIELD_AREA",
+	B.NAME AS "CROP_NAME",
+	B.START_OF_SEASON AS "CROP_START",
+	B.END_OF_SEASON AS "CROP_END",
+	A.OWNER AS "OWNER",
+	CAST(1 AS NUMBER) AS "AREA_ID",
+	C.IMAGE_PATH AS "OWNER_IMAGE",
+	D.IMAGE_PATH AS "CROP_IMAGE"
+	FROM FIELDS A
+	LEFT JOIN CROPS B ON A.CROP = B.CROP
+	LEFT JOIN FF_FARMERS C ON A.OWNER = C.FARMER_NAME
+	LEFT JOIN FF_CROP_IMAGES D ON A.CROP = D.CROP_ID;
+
+CREATE VIEW VIEW_FIELDS_NEW AS
+SELECT
+	A.FIELD_ID AS "FIELD_ID",
+	A.LOWX AS "LOW_X",
+	A.HIX AS "HI_X",
+	A.LOWY AS "LOW_Y",
+	A.HIY AS "HI_Y",
+	A.AREA AS "FIELD_AREA",
+	B.NAME AS "CROP_NAME",
+	B.START_OF_SEASON AS "CROP_START",
+	B.END_OF_SEASON AS "CROP_END",
+	A.OWNER AS "OWNER",
+	A.AREA_ID AS "AREA_ID",
+	C.IMAGE_PATH AS "OWNER_IMAGE",
+	B.IMAGE_PATH AS "CROP_IMAGE"
+	FROM FF_FIELDS_NEW A
+	LEFT JOIN VIEW_CROP_COMB B ON A.CROP = B.CROP
+	LEFT JOIN FF_FARMERS C ON A.OWNER = C.FARMER_NAME;
+
+CREATE VIEW VIEW_FIELDS_COMB
+AS
+SELECT * FROM VIEW_FIELDS
+UNION ALL
+SELECT * FROM VIEW_FIELDS_NEW;
+
+CREATE VIEW VIEW_FINDS
+AS
+SELECT
+	A.FIND_ID AS "OBJECT_ID",
+	A.XCOORD AS "X",
+	A.YCOORD AS "Y",
+	A.DEPTH AS "DEPTH",
+	A.FIELD_NOTES AS "FIELD_NOTES",
+	B.NAME AS "TYPE",
+	B.PERIOD AS "PERIOD",
+	B.USE AS "USE",
+	CAST(1 AS NUMBER) AS "AREA_ID",
+	C.COLOUR AS "COLOUR",
+	D.IMAGE_PATH AS "FIND_IMAGE"
+	FROM FINDS A
+	LEFT JOIN CLASS B ON A.TYPE = B.TYPE
+	LEFT JOIN FF_FIND_COLOUR C ON B.TYPE = C.TYPE_ID
+	LEFT JOIN FF_FIND_IMAGES D ON A.FIND_ID = D.FIND_ID;
+
+CREATE VIEW VIEW_FINDS_NEW
+AS
+SELECT
+	A.FIND_ID AS "OBJECT_ID",
+	A.XCOORD AS "X",
+	A.YCOORD AS "Y",
+	A.DEPTH AS "DEPTH",
+	A.FIELD_NOTES AS "FIELD_NOTES",
+	B.NAME AS "TYPE",
+	B.PERIOD AS "PERIOD",
+	B.USE AS "USE",
+	A.AREA_ID AS "AREA_ID",
+	B.COLOUR AS "COLOUR",
+	A.IMAGE_PATH AS "FIND_IMAGE"
+	FROM FF_FINDS_NEW A
+	LEFT JOIN VIEW_CLASS_COMB B ON A.TYPE = B.TYPE;
+
+CREATE VIEW VIEW_FINDS_COMB
+AS
+SELECT * FROM VIEW_FINDS
+UNION ALL
+SELECT * FROM VIEW_FINDS_NEW;
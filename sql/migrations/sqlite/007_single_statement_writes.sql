@@ -0,0 +1,15 @@
+-- Single statement field and find inserts for DbFieldsFindsSqlite.addField and addFind
+-- SQLite has no stored procedures so the guarded Insert Select Returning is in the python and these triggers copy new rows into the denormalized tables
+CREATE TRIGGER FF_FIELDS_NEW_MAT_TRG AFTER INSERT ON FF_FIELDS_NEW
+BEGIN
+	INSERT INTO FF_FIELDS_MAT (FIELD_ID, LOW_X, HI_X, LOW_Y, HI_Y, FIELD_AREA, CROP_NAME, CROP_START, CROP_END, OWNER, AREA_ID, OWNER_IMAGE, CROP_IMAGE)
+		SELECT FIELD_ID, LOW_X, HI_X, LOW_Y, HI_Y, FIELD_AREA, CROP_NAME, CROP_START, CROP_END, OWNER, AREA_ID, OWNER_IMAGE, CROP_IMAGE FROM VIEW_FIELDS_COMB WHERE FIELD_ID = NEW.FIELD_ID;
+END;
+/
+
+CREATE TRIGGER FF_FINDS_NEW_MAT_TRG AFTER INSERT ON FF_FINDS_NEW
+BEGIN
+	INSERT INTO FF_FINDS_MAT (OBJECT_ID, X, Y, DEPTH, FIELD_NOTES, TYPE, PERIOD, USE, AREA_ID, COLOUR, FIND_IMAGE)
+		SELECT OBJECT_ID, X, Y, DEPTH, FIELD_NOTES, TYPE, PERIOD, USE, AREA_ID, COLOUR, FIND_IMAGE FROM VIEW_FINDS_COMB WHERE OBJECT_ID = NEW.FIND_ID;
+END;
+/
@@ -0,0 +1,48 @@
+-- Per area data version and change log for DbFieldsFinds.getAreaVersion and getChangesSince
+-- Triggers bump the area version and log the change inside the transaction of every field and find insert and delete
+CREATE TABLE FF_AREA_VERSION
+(AREA_ID NUMBER(2) NOT NULL,
+VERSION NUMBER(10) NOT NULL,
+PRIMARY KEY (AREA_ID));
+
+CREATE TABLE FF_CHANGE_LOG
+(AREA_ID NUMBER(2) NOT NULL,
+VERSION NUMBER(10) NOT NULL,
+KIND VARCHAR(5) NOT NULL,
+OBJECT_ID NUMBER(10) NOT NULL,
+CHANGE VARCHAR(6) NOT NULL,
+PRIMARY KEY (AREA_ID, VERSION));
+
+INSERT INTO FF_AREA_VERSION (AREA_ID, VERSION) SELECT AREA_ID, 0 FROM FF_AREA;
+
+CREATE TRIGGER FF_FIELDS_NEW_INS_VERSION_TRG AFTER INSERT ON FF_FIELDS_NEW
+BEGIN
+	INSERT OR IGNORE INTO FF_AREA_VERSION (AREA_ID, VERSION) VALUES (NEW.AREA_ID, 0);
+	UPDATE FF_AREA_VERSION SET VERSION = VERSION + 1 WHERE AREA_ID = NEW.AREA_ID;
+	INSERT INTO FF_CHANGE_LOG (AREA_ID, VERSION, KIND, OBJECT_ID, CHANGE) SELECT AREA_ID, VERSION, 'field', NEW.FIELD_ID, 'insert' FROM FF_AREA_VERSION WHERE AREA_ID = NEW.AREA_ID;
+END;
+/
+
+CREATE TRIGGER FF_FIELDS_NEW_DEL_VERSION_TRG AFTER DELETE ON FF_FIELDS_NEW
+BEGIN
+	INSERT OR IGNORE INTO FF_AREA_VERSION (AREA_ID, VERSION) VALUES (OLD.AREA_ID, 0);
+	UPDATE FF_AREA_VERSION SET VERSION = VERSION + 1 WHERE AREA_ID = OLD.AREA_ID;
+	INSERT INTO FF_CHANGE_LOG (AREA_ID, VERSION, KIND, OBJECT_ID, CHANGE) SELECT AREA_ID, VERSION, 'field', OLD.FIELD_ID, 'delete' FROM FF_AREA_VERSION WHERE AREA_ID = OLD.AREA_ID;
+END;
+/
+
+CREATE TRIGGER FF_FINDS_NEW_INS_VERSION_TRG AFTER INSERT ON FF_FINDS_NEW
+BEGIN
+	INSERT OR IGNORE INTO FF_AREA_VERSION (AREA_ID, VERSION) VALUES (NEW.AREA_ID, 0);
+	UPDATE FF_AREA_VERSION SET VERSION = VERSION + 1 WHERE AREA_ID = NEW.AREA_ID;
+	INSERT INTO FF_CHANGE_LOG (AREA_ID, VERSION, KIND, OBJECT_ID, CHANGE) SELECT AREA_ID, VERSION, 'find', NEW.FIND_ID, 'insert' FROM FF_AREA_VERSION WHERE AREA_ID = NEW.AREA_ID;
+END;
+/
+
+CREATE TRIGGER FF_FINDS_NEW_DEL_VERSION_TRG AFTER DELETE ON FF_FINDS_NEW
+BEGIN
+	INSERT OR IGNORE INTO FF_AREA_VERSION (AREA_ID, VERSION) VALUES (OLD.AREA_ID, 0);
+	UPDATE FF_AREA_VERSION SET VERSION = VERSION + 1 WHERE AREA_ID = OLD.AREA_ID;
+	INSERT INTO FF_CHANGE_LOG (AREA_ID, VERSION, KIND, OBJECT_ID, CHANGE) SELECT AREA_ID, VERSION, 'find', OLD.FIND_ID, 'delete' FROM FF_AREA_VERSION WHERE AREA_ID = OLD.AREA_ID;
+END;
+/
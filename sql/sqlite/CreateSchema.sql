@@ -0,0 +1,217 @@
+-- SQLite stand-in for the Oracle fields and finds schema
+-- Mirrors the sql folder scripts before the sql/migrations/sqlite migrations are applied. The GISTEACH teaching tables are recreated locally as FIELDS, FINDS, CROPS and CLASS
+
+-- Original teaching tables
+CREATE TABLE FIELDS
+(FIELD_ID NUMBER(2) NOT NULL,
+LOWX NUMBER(2),
+LOWY NUMBER(2),
+HIX NUMBER(2),
+HIY NUMBER(2),
+AREA NUMBER(5,2),
+OWNER VARCHAR(50),
+CROP NUMBER(4),
+PRIMARY KEY (FIELD_ID));
+
+CREATE TABLE FINDS
+(FIND_ID NUMBER(4) NOT NULL,
+XCOORD NUMBER(2),
+YCOORD NUMBER(2),
+TYPE NUMBER(4),
+DEPTH NUMBER(4,2),
+FIELD_NOTES VARCHAR(100),
+PRIMARY KEY (FIND_ID));
+
+CREATE TABLE CROPS
+(CROP NUMBER(4) NOT NULL,
+NAME VARCHAR(30),
+START_OF_SEASON DATE,
+END_OF_SEASON DATE,
+PRIMARY KEY (CROP));
+
+CREATE TABLE CLASS
+(TYPE NUMBER(4) NOT NULL,
+NAME VARCHAR(30),
+PERIOD VARCHAR(30),
+USE VARCHAR(50),
+PRIMARY KEY (TYPE));
+
+-- Fields and finds tables
+CREATE TABLE FF_AREA
+(AREA_ID NUMBER(2) NOT NULL,
+AREA_NAME VARCHAR(50),
+MAX_X NUMBER(6) CHECK (MAX_X>0),
+MAX_Y NUMBER(6) CHECK (MAX_Y>0),
+IMAGE_PATH VARCHAR(1000),
+PRIMARY KEY (AREA_ID));
+
+CREATE TABLE FF_CROP_IMAGES
+(CROP_ID NUMBER(4) NOT NULL,
+IMAGE_PATH VARCHAR(1000),
+PRIMARY KEY (CROP_ID));
+
+CREATE TABLE FF_FARMERS
+(FARMER_NAME VARCHAR(50) NOT NULL,
+IMAGE_PATH VARCHAR(1000),
+PRIMARY KEY (FARMER_NAME));
+
+CREATE TABLE FF_FIND_COLOUR
+(TYPE_ID NUMBER(2) NOT NULL,
+COLOUR VARCHAR(50),
+PRIMARY KEY (TYPE_ID));
+
+CREATE TABLE FF_FIND_IMAGES
+(FIND_ID NUMBER(4) NOT NULL,
+IMAGE_PATH VARCHAR(1000),
+PRIMARY KEY (FIND_ID));
+
+CREATE TABLE FF_CROPS_NEW
+(CROP NUMBER(4) NOT NULL,
+NAME VARCHAR(30),
+START_OF_SEASON DATE,
+END_OF_SEASON DATE,
+IMAGE_PATH VARCHAR(1000),
+PRIMARY KEY (CROP));
+
+CREATE TABLE FF_CLASS_NEW
+(TYPE NUMBER(4) NOT NULL,
+NAME VARCHAR(30),
+PERIOD VARCHAR(30),
+USE VARCHAR(50),
+COLOUR VARCHAR(50),
+PRIMARY KEY (TYPE));
+
+CREATE TABLE FF_FIELDS_NEW
+(FIELD_ID NUMBER(10) NOT NULL,
+LOWX NUMBER(6) CHECK (LOWX BETWEEN 0 AND 100000),
+LOWY NUMBER(6) CHECK (LOWY BETWEEN 0 AND 100000),
+HIX NUMBER(6) CHECK (HIX BETWEEN 1 AND 100000),
+HIY NUMBER(6) CHECK (HIY BETWEEN 1 AND 100000),
+AREA NUMBER(13,2) CHECK (AREA BETWEEN 0 AND 10000000000),
+OWNER VARCHAR(50),
+CROP NUMBER(4),
+AREA_ID NUMBER(2) NOT NULL,
+PRIMARY KEY (FIELD_ID),
+FOREIGN KEY (AREA_ID) REFERENCES FF_AREA(AREA_ID),
+FOREIGN KEY (OWNER) REFERENCES FF_FARMERS(FARMER_NAME));
+
+CREATE TABLE FF_FINDS_NEW
+(FIND_ID NUMBER(10) NOT NULL,
+XCOORD NUMBER(6) CHECK (XCOORD BETWEEN 0 AND 100000),
+YCOORD NUMBER(6) CHECK (YCOORD BETWEEN 0 AND 100000),
+TYPE NUMBER(4),
+DEPTH NUMBER(4,2) CHECK (DEPTH BETWEEN 0 AND 30),
+FIELD_NOTES VARCHAR(100),
+AREA_ID NUMBER(2) NOT NULL,
+IMAGE_PATH VARCHAR(1000),
+PRIMARY KEY (FIND_ID),
+FOREIGN KEY (AREA_ID) REFERENCES FF_AREA(AREA_ID));
+
+-- Views
+CREATE VIEW VIEW_CROP_COMB
+AS
+SELECT CROP,NAME,START_OF_SEASON,END_OF_SEASON,IMAGE_PATH
+	FROM CROPS B
+	LEFT JOIN FF_CROP_IMAGES D ON B.CROP = D.CROP_ID
+UNION
+SELECT CROP,NAME,START_OF_SEASON,END_OF_SEASON,IMAGE_PATH
+	FROM FF_CROPS_NEW;
+
+CREATE VIEW VIEW_CLASS_COMB
+AS
+SELECT TYPE,NAME,PERIOD,USE,COLOUR
+	FROM CLASS B
+	LEFT JOIN FF_FIND_COLOUR C ON B.TYPE = C.TYPE_ID
+UNION
+SELECT TYPE,NAME,PERIOD,USE,COLOUR FROM FF_CLASS_NEW;
+
+CREATE VIEW VIEW_FIELDS AS
+SELECT
+	A.FIELD_ID AS "FIELD_ID",
+	A.LOWX AS "LOW_X",
+	A.HIX AS "HI_X",
+	A.LOWY AS "LOW_Y",
+	A.HIY AS "HI_Y",
+	A.AREA AS "FIELD_AREA",
+	B.NAME AS "CROP_NAME",
+	B.START_OF_SEASON AS "CROP_START",
+	B.END_OF_SEASON AS "CROP_END",
+	A.OWNER AS "OWNER",
+	CAST(1 AS NUMBER) AS "AREA_ID",
+	C.IMAGE_PATH AS "OWNER_IMAGE",
+	D.IMAGE_PATH AS "CROP_IMAGE"
+	FROM FIELDS A
+	LEFT JOIN CROPS B ON A.CROP = B.CROP
+	LEFT JOIN FF_FARMERS C ON A.OWNER = C.FARMER_NAME
+	LEFT JOIN FF_CROP_IMAGES D ON A.CROP = D.CROP_ID
+	ORDER BY A.FIELD_ID;
+
+CREATE VIEW VIEW_FIELDS_NEW AS
+SELECT
+	A.FIELD_ID AS "FIELD_ID",
+	A.LOWX AS "LOW_X",
+	A.HIX AS "HI_X",
+	A.LOWY AS "LOW_Y",
+	A.HIY AS "HI_Y",
+	A.AREA AS "FIELD_AREA",
+	B.NAME AS "CROP_NAME",
+	B.START_OF_SEASON AS "CROP_START",
+	B.END_OF_SEASON AS "CROP_END",
+	A.OWNER AS "OWNER",
+	A.AREA_ID AS "AREA_ID",
+	C.IMAGE_PATH AS "OWNER_IMAGE",
+	B.IMAGE_PATH AS "CROP_IMAGE"
+	FROM FF_FIELDS_NEW A
+	LEFT JOIN VIEW_CROP_COMB B ON A.CROP = B.CROP
+	LEFT JOIN FF_FARMERS C ON A.OWNER = C.FARMER_NAME
+	ORDER BY A.FIELD_ID;
+
+CREATE VIEW VIEW_FIELDS_COMB
+AS
+SELECT * FROM VIEW_FIELDS
+UNION
+SELECT * FROM VIEW_FIELDS_NEW;
+
+CREATE VIEW VIEW_FINDS
+AS
+SELECT
+	A.FIND_ID AS "OBJECT_ID",
+	A.XCOORD AS "X",
+	A.YCOORD AS "Y",
+	A.DEPTH AS "DEPTH",
+	A.FIELD_NOTES AS "FIELD_NOTES",
+	B.NAME AS "TYPE",
+	B.PERIOD AS "PERIOD",
+	B.USE AS "USE",
+	CAST(1 AS NUMBER) AS "AREA_ID",
+	C.COLOUR AS "COLOUR",
+	D.IMAGE_PATH AS "FIND_IMAGE"
+	FROM FINDS A
+	LEFT JOIN CLASS B ON A.TYPE = B.TYPE
+	LEFT JOIN FF_FIND_COLOUR C ON B.TYPE = C.TYPE_ID
+	LEFT JOIN FF_FIND_IMAGES D ON A.FIND_ID = D.FIND_ID
+	ORDER BY A.FIND_ID;
+
+CREATE VIEW VIEW_FINDS_NEW
+AS
+SELECT
+	A.FIND_ID AS "OBJECT_ID",
+	A.XCOORD AS "X",
+	A.YCOORD AS "Y",
+	A.DEPTH AS "DEPTH",
+	A.FIELD_NOTES AS "FIELD_NOTES",
+	B.NAME AS "TYPE",
+	B.PERIOD AS "PERIOD",
+	B.USE AS "USE",
+	A.AREA_ID AS "AREA_ID",
+	B.COLOUR AS "COLOUR",
+	A.IMAGE_PATH AS "FIND_IMAGE"
+	FROM FF_FINDS_NEW A
+	LEFT JOIN VIEW_CLASS_COMB B ON A.TYPE = B.TYPE
+	ORDER BY A.FIND_ID;
+
+CREATE VIEW VIEW_FINDS_COMB
+AS
+SELECT * FROM VIEW_FINDS
+UNION
+SELECT * FROM VIEW_FINDS_NEW;
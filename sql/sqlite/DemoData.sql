@@ -0,0 +1,57 @@
+-- Demo data for the SQLite stand-in
+-- The Default area holds the original 8 teaching fields and finds
+
+INSERT INTO CROPS (CROP,NAME,START_OF_SEASON,END_OF_SEASON) VALUES
+(1,'WHEAT','2018-03-01','2018-09-01'),
+(2,'BARLEY','2018-03-15','2018-08-15'),
+(3,'TURNIPS','2018-05-01','2018-11-01'),
+(4,'POTATOES','2018-04-01','2018-10-01');
+
+INSERT INTO CLASS (TYPE,NAME,PERIOD,USE) VALUES
+(1,'SHERD','ROMAN','COOKING'),
+(2,'COIN','ROMAN','CURRENCY'),
+(3,'FLINT','NEOLITHIC','TOOL'),
+(4,'BROOCH','VIKING','ADORNMENT');
+
+INSERT INTO FF_FIND_COLOUR (TYPE_ID,COLOUR) VALUES
+(1,'red'),(2,'gold'),(3,'grey'),(4,'blue');
+
+INSERT INTO FF_FARMERS (FARMER_NAME,IMAGE_PATH) VALUES
+('MR MCDONALD',''),('MRS BROWN',''),('MR SMITH','');
+
+INSERT INTO FIELDS (FIELD_ID,LOWX,LOWY,HIX,HIY,AREA,OWNER,CROP) VALUES
+(1,0,0,4,4,16,'MR MCDONALD',1),
+(2,4,0,8,3,12,'MRS BROWN',2),
+(3,8,0,12,4,16,'MR SMITH',3),
+(4,12,0,16,5,20,'MR MCDONALD',4),
+(5,0,4,3,9,15,'MRS BROWN',1),
+(6,3,4,9,8,24,'MR SMITH',2),
+(7,9,5,16,10,35,'MR MCDONALD',3),
+(8,0,10,6,16,36,'MRS BROWN',4);
+
+INSERT INTO FINDS (FIND_ID,XCOORD,YCOORD,TYPE,DEPTH,FIELD_NOTES) VALUES
+(1,2,2,1,0.5,'RIM SHERD'),
+(2,5,1,2,1.2,'WORN COIN'),
+(3,10,3,3,0.8,'SCRAPER'),
+(4,14,2,4,1.5,'PENANNULAR BROOCH'),
+(5,1,6,1,0.3,'BODY SHERD'),
+(6,6,6,3,2.1,'FLAKE'),
+(7,12,8,2,0.9,'DENARIUS'),
+(8,3,13,4,1.1,'PIN');
+
+INSERT INTO FF_AREA (AREA_ID,AREA_NAME,MAX_X,MAX_Y,IMAGE_PATH) VALUES
+(1,'Default',16,16,''),
+(2,'Demo Kindrogan',30,20,''),
+(3,'Demo Large',50,50,'');
+
+INSERT INTO FF_FIELDS_NEW (FIELD_ID,LOWX,HIX,LOWY,HIY,AREA,OWNER,CROP,AREA_ID) VALUES
+(9,0,10,0,10,100,'MR SMITH',1,2),
+(10,10,30,0,20,400,'MRS BROWN',2,2),
+(11,0,25,0,25,625,'MR MCDONALD',3,3),
+(12,25,50,25,50,625,'MR SMITH',4,3);
+
+INSERT INTO FF_FINDS_NEW (FIND_ID,XCOORD,YCOORD,TYPE,DEPTH,FIELD_NOTES,AREA_ID,IMAGE_PATH) VALUES
+(9,5,5,1,1.0,'SHERD',2,''),
+(10,20,10,2,0.5,'COIN',2,''),
+(11,10,10,3,1.5,'FLINT',3,''),
+(12,40,40,4,2.0,'BROOCH',3,'');
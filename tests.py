@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
 from nose.tools import assert_equals, assert_raises
 import fieldsFindsLibrary as ffLib
+import base64
+import json
+import numpy as np
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from datetime import date
 
 class TestHTML:
 	def test_noElement(self):
@@ -133,6 +143,41 @@ class TestGeoObjects:
 		assert geo[-9:] == '</circle>'
 		assert info[-6:] == '</svg>'
 		ff.closeConnection()
+	
+	def test_fragmentOnlyAttached(self):
+		""" Fragment render holds only the attached objects without layers """
+		area = ffLib.MapArea(1,'Small',16,16,'')
+		find = ffLib.Find(7,10,12,1.0,'','Pot','Roman','Cook',1,'red','')
+		area.addFinds([find],'find')
+		fragment = area.renderFragment()
+		assert_equals(fragment['fieldGeo'],'')
+		assert fragment['findGeo'].startswith('<text id="Find7Label"')
+		assert fragment['findInfo'].startswith('<svg id="Find7Info"')
+		assert 'FindLayer' not in fragment['findGeo']
+		assert 'id="FindLayer"' in area.renderMap(500,500)
+	
+	def test_packData(self):
+		""" Packed data holds typed arrays and name dictionaries """
+		area = ffLib.MapArea(1,'Small',16,16,'')
+		area.addFields([ffLib.Field(3,1,4,2,6,12,'WHEAT',date(2018,1,1),date(2018,6,1),'ME',1,'','')],'field')
+		area.addFinds([ffLib.Find(7,10,12,1.5,'','Pot','Roman','Cook',1,'red',''),ffLib.Find(9,2,3,0.5,'','Coin','Roman','Trade',1,'gold','')],'find')
+		data = area.packData()
+		assert_equals(np.frombuffer(base64.b64decode(data['fields']['box']),'<i4').tolist(),[1,2,4,6])
+		assert_equals(np.frombuffer(base64.b64decode(data['finds']['point']),'<i4').tolist(),[10,12,2,3])
+		assert_equals(np.frombuffer(base64.b64decode(data['finds']['depth']),'<f4').tolist(),[1.5,0.5])
+		assert_equals(np.frombuffer(base64.b64decode(data['finds']['class']),'<u2').tolist(),[0,1])
+		assert_equals(data['classes'],[['Pot','red'],['Coin','gold']])
+		assert_equals(data['crops'],['WHEAT'])
+
+	def test_packLargeIds(self):
+		""" Ids above the int32 range are packed exactly """
+		area = ffLib.MapArea(1,'Small',16,16,'')
+		area.addFields([ffLib.Field(3000000000,1,4,2,6,12,'WHEAT',date(2018,1,1),date(2018,6,1),'ME',1,'','')],'field')
+		area.addFinds([ffLib.Find(9999999999,10,12,1.5,'','Pot','Roman','Cook',1,'red','')],'find')
+		data = area.packData()
+		assert_equals(data['idType'],'float64')
+		assert_equals(np.frombuffer(base64.b64decode(data['fields']['id']),'<f8').tolist(),[3000000000])
+		assert_equals(np.frombuffer(base64.b64decode(data['finds']['id']),'<f8').tolist(),[9999999999])
 		
 
 class TestWebObjects:
@@ -150,6 +195,11 @@ class TestWebObjects:
 		expectedResult = '<li><a href="https://www.geos.ed.ac.uk/~s1783947/cgi-bin/webmapping/main.py?MapArea=aa">aa</a></li><li><a href="https://www.geos.ed.ac.uk/~s1783947/cgi-bin/webmapping/main.py?MapArea=bb">bb</a></li>'
 		assert_equals(str(obj),expectedResult)
 	
+	def test_mapListSearch(self):
+		""" Area dropdown adds a search box when more areas exist """
+		obj = ffLib.AreaDropDown(['aa'],lambda area: area + '.html',True)
+		assert_equals(str(obj),'<li><a href="aa.html">aa</a></li><li class="areaSearch"><input type="text" class="form-control" placeholder="Search maps" onInput="SearchAreas(this)" onClick="event.stopPropagation()"/></li>')
+	
 	def test_statusSuccess(self):
 		""" Check success status html """
 		obj = ffLib.Status('Success','Happy Days')
@@ -166,4 +216,841 @@ class TestWebObjects:
 		""" Check filter status html """
 		obj = ffLib.Status('Filter Applied','Happy Days')
 		expectedResult = '<div class="alert alert-warning"><strong>Filter Applied</strong> Happy Days</div>'
-		assert_equals(str(obj),expectedResult)
\ No newline at end of file
+		assert_equals(str(obj),expectedResult)
+
+class TestLargeArea:
+	def test_smallAreaNotLarge(self):
+		""" Areas up to 50 keep the normal rendering """
+		area = ffLib.MapArea(1,'Small',50,50,'')
+		assert not area.largeArea
+		assert 'translate(1,1)' in area.renderMap(500,500)
+
+	def test_largeAreaRender(self):
+		""" Large area scales the margin and drops find numbers but keeps popups """
+		area = ffLib.MapArea(1,'Large',2000,1000,'')
+		find = ffLib.Find(7,10,20,1.0,'','Pot','Roman','Cook',1,'red','')
+		area.addFinds([find],'find')
+		svgMap = area.renderMap('100%','100%')
+		assert area.largeArea
+		assert 'viewBox="0 0 2080.0 1080.0"' in svgMap
+		assert '<title>Find 7</title>' in svgMap
+		assert '>7</text>' not in svgMap
+
+	def test_niceTicks(self):
+		""" Large area axis ticks fall on 1, 2 or 5 multiples """
+		area = ffLib.MapArea(1,'Large',2000,1000,'')
+		svgMap = area.renderMap('100%','100%')
+		assert '>1500</text>' in svgMap
+		assert '>400</text>' in svgMap
+		assert '>250</text>' not in svgMap
+
+
+class TestSqliteDatabase:
+	def test_canLoadDefaultArea(self):
+		""" Stand-in loads the demo default area """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		area = ff.getMapArea('Default')
+		assert_equals(area.maxX,16)
+		assert len(ff.getFields(area.areaId)) == 8
+		assert len(ff.getFinds(area.areaId,'COIN')) == 2
+		
+	def test_addAndDeleteFind(self):
+		""" Stand-in runs the add checks and deletes """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		assert_equals(ff.addFind('Demo Large',5,6,'COIN',1.5,'note',''),'Find 13 added')
+		assert_raises(Exception,ff.addFind,'Demo Large',5,6,'COIN',1.5,'note','')
+		assert_equals(ff.delFind(13),'Find 13 deleted')
+		
+	def test_intersectCheck(self):
+		""" Stand-in rejects intersecting fields """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		assert_raises(Exception,ff.addField,'Default',1,3,1,3,'MR SMITH','WHEAT')
+		
+	def test_website(self):
+		""" Website renders a full page from the stand-in """
+		ff = ffLib.DbFieldsFindsSqlite()
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Kindrogan'),ff)
+		website.run()
+		page = str(website)
+		assert page.startswith('Content-Type: text/html')
+		assert 'id="Find10"' in page
+	
+	def test_clientRender(self):
+		""" Client rendered pages load a packed data feed far smaller than the svg """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		for x in range(100):
+			ff.addFind('Demo Large',x//2,30+x%2,'COIN',1,'','')
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Large&Render=client&FilterClass=COIN'),ff)
+		website.run()
+		page = str(website)
+		assert 'id="Find11"' not in page
+		assert 'dataQuery = "MapArea=Demo+Large&FilterClass=COIN"' in page
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Large&Format=data'),ff)
+		website.run()
+		payload = str(website).split('\n\n',1)[1]
+		data = json.loads(payload)
+		ff.openConnection()
+		area = ff.getMapArea('Demo Large')
+		area.addFields(ff.getFields(area.areaId),'field')
+		area.addFinds(ff.getFinds(area.areaId),'find')
+		assert_equals(data['finds']['count'],len(ff.getFinds(area.areaId)))
+		fragment = area.renderFragment()
+		assert len(payload) * 10 < len(fragment['fieldGeo'] + fragment['findGeo'])
+
+	def test_changesSince(self):
+		""" Adds and deletes raise the area version and are returned by the changes feed """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		assert_equals(ff.getAreaVersion(3),0)
+		ff.addFind('Demo Large',5,6,'COIN',1.5,'note','')
+		ff.addFind('Demo Large',7,8,'COIN',1.5,'note','')
+		ff.addField('Demo Large',30,40,0,10,'MR SMITH','WHEAT')
+		ff.delFind(13)
+		assert_equals(ff.getAreaVersion(3),4)
+		assert_equals(ff.getAreaVersion(1),0)
+		changes = ff.getChangesSince(3,1)
+		assert_equals(changes['version'],4)
+		assert_equals([find.packValues()[0] for find in changes['finds']],[14])
+		assert_equals([field.packValues()[0] for field in changes['fields']],[13])
+		assert_equals(changes['deletedFinds'],[13])
+		assert_equals(ff.getChangesSince(3,4)['finds'],[])
+		assert_raises(Exception,ff.getChangesSince,3,5)
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Large&Format=changes&Since=2'),ff)
+		website.run()
+		data = json.loads(str(website).split('\n\n',1)[1])
+		assert_equals((data['since'],data['version'],data['deleted']),(2,4,{'fields':[],'finds':[13]}))
+		assert_equals(np.frombuffer(base64.b64decode(data['fields']['id']),'<u4').tolist(),[13])
+		assert_equals(data['finds']['count'],0)
+
+	def test_rejectedAddReleasesLock(self):
+		""" Closing after a rejected add lets other connections to a file database write """
+		path = os.path.join(tempfile.mkdtemp(),'ff.db')
+		first = ffLib.DbFieldsFindsSqlite(path)
+		first.openConnection()
+		assert_raises(Exception,first.addFind,'Default',5,1,'COIN',1,'','')
+		first.closeConnection()
+		second = ffLib.DbFieldsFindsSqlite(path)
+		second.openConnection()
+		second.addFind('Default',5,2,'COIN',1,'','')
+		assert_equals(second.lastInsertId,13)
+		second.closeConnection()
+
+
+class TestTiming:
+	def test_disabled(self):
+		""" Disabled timer records nothing and adds no header """
+		timer = ffLib.RequestTimer(False)
+		with timer.span('x'):
+			pass
+		assert_equals(timer.serverTiming(),'')
+		assert_equals(timer.totals,{})
+
+	def test_serverTimingHeader(self):
+		""" Spans are summed per name in the header """
+		timer = ffLib.RequestTimer()
+		with timer.span('getFields'):
+			pass
+		with timer.span('getFields'):
+			pass
+		header = timer.serverTiming()
+		assert header.startswith('Server-Timing: getFields;dur=')
+		assert 'desc="2 call(s)"' in header
+		assert ', total;dur=' in header
+
+	def test_logLine(self):
+		""" One json line is appended per request """
+		logPath = os.path.join(tempfile.mkdtemp(),'timing.log')
+		timer = ffLib.RequestTimer(True,logPath)
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default'),ffLib.DbFieldsFindsSqlite(),timer)
+		website.run()
+		page = str(website)
+		timer.writeLog('MapArea=Default')
+		assert 'Server-Timing: openConnection;dur=' in page
+		with open(logPath) as logFile:
+			line = json.loads(logFile.readline())
+		assert_equals(line['request'],'MapArea=Default')
+		assert_equals(line['spans']['getFields']['count'],1)
+		assert 'templateRender' in line['spans']
+
+
+class TestQueryLog:
+	def test_pageStatementBudget(self):
+		""" A full page runs one statement per query and no repeats """
+		log = ffLib.QueryLog()
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.setQueryLog(log)
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Kindrogan'),ff)
+		website.run()
+		summary = log.summary()
+		assert summary['statements'] <= 9
+		assert_equals(summary['byMethod']['getFinds']['statements'],1)
+		assert_equals(summary['byMethod']['getFinds']['rows'],2)
+		assert_equals(summary['repeated'],[])
+		assert_equals(summary['nPlusOne'],[])
+
+	def test_repeatedAndSlow(self):
+		""" Repeated statements and slow statements are flagged and logged """
+		logPath = os.path.join(tempfile.mkdtemp(),'query.log')
+		log = ffLib.QueryLog(-1,logPath,2)
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.setQueryLog(log)
+		ff.openConnection()
+		ff.getFinds(1)
+		ff.getFinds(1)
+		ff.getFinds(2)
+		summary = log.summary()
+		assert_equals(summary['repeated'][0]['count'],2)
+		assert_equals(summary['nPlusOne'][0]['distinctBinds'],2)
+		assert_equals(len(summary['slow']),3)
+		with open(logPath) as logFile:
+			types = [json.loads(line)['type'] for line in logFile]
+		assert_equals(types.count('repeated'),1)
+		assert_equals(types.count('slow'),3)
+
+	def test_singleStatementWrites(self):
+		""" Adds are one statement and a commit, rejected adds still name the problem """
+		log = ffLib.QueryLog()
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.setQueryLog(log)
+		ff.openConnection()
+		assert_equals(ff.addField('Demo Large',30,40,0,10,'MR SMITH','WHEAT'),'Field 13 added')
+		assert_equals(ff.addFind('Demo Large',5,6,'COIN',1.5,'note',''),'Find 13 added')
+		summary = log.summary()
+		assert_equals(summary['byMethod']['addField']['statements'],1)
+		assert_equals(summary['byMethod']['addFind']['statements'],1)
+		assert_equals(summary['roundTrips'],4)
+		for args,message in [
+				(('Demo Large',30,40,0,10,'MR SMITH','WHEAT'),'Cannot intersect with other fields. This field would intersect with 13'),
+				(('Demo Large',30,40,0,200,'MR SMITH','WHEAT'),'X coordinate must be within area bounds'),
+				(('Demo Large',40,50,0,10,'MR SMITH','RYE'),'Crop does not exist: RYE'),
+				(('Nowhere',1,2,1,2,'MR SMITH','WHEAT'),'Cannot Find Requested Map Area')]:
+			try:
+				ff.addField(*args)
+				assert False
+			except Exception as e:
+				assert_equals(str(e),message)
+		try:
+			ff.addFind('Demo Large',5,6,'COIN',1.5,'note','')
+			assert False
+		except Exception as e:
+			assert_equals(str(e),'Cannot have same coordinate as existing find. This find has the same as 13')
+
+
+class TestSnapshot:
+	def test_pageMatchesDatabase(self):
+		""" Page served from snapshots matches the database page """
+		snapshotDir = tempfile.mkdtemp()
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		assert_equals(ff.rebuildSnapshots(snapshotDir),3)
+		ff.closeConnection()
+		query = 'MapArea=Demo+Kindrogan&FilterClass=COIN'
+		dbPage = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery(query),ff)
+		dbPage.run()
+		snapshotPage = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery(query),ffLib.DbFieldsFindsSnapshot(snapshotDir))
+		snapshotPage.run()
+		assert_equals(str(snapshotPage),str(dbPage))
+
+	def test_rewrittenAfterWrite(self):
+		""" Writes rewrite the area snapshot and the snapshot database is read only """
+		snapshotDir = tempfile.mkdtemp()
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		ff.rebuildSnapshots(snapshotDir)
+		ff.setSnapshotDir(snapshotDir)
+		snap = ffLib.DbFieldsFindsSnapshot(snapshotDir)
+		snap.openConnection()
+		ff.addFind('Demo Large',5,6,'COIN',1.5,'note','')
+		assert_equals(snap.getFindIdList(3),[11,12,13])
+		ff.delFind(13)
+		assert_equals(snap.getFindIdList(3),[11,12])
+		assert_raises(Exception,snap.addFind,'Demo Large',5,6,'COIN',1.5,'note','')
+
+
+class TestConcurrentFetch:
+	def test_matchesSerial(self):
+		""" Concurrent page queries give the same page as the serial path """
+		ff = ffLib.DbFieldsFindsSqlite()
+		serial = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Kindrogan&FilterClass=COIN'),ff)
+		serial.run()
+		concurrent = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Kindrogan&FilterClass=COIN'),ff,None,True)
+		concurrent.run()
+		assert_equals(str(concurrent),str(serial))
+
+	def test_errorReleasesSessions(self):
+		""" A failing query is raised after every session is released """
+		released = []
+		class FailingDb(ffLib.DbFieldsFindsSqlite):
+			def getCropList(self):
+				raise Exception('Crop query failed')
+			def closeSession(self):
+				released.append(1)
+				ffLib.DbFieldsFindsSqlite.closeSession(self)
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default'),FailingDb(),None,True)
+		assert_raises(Exception,website.run)
+		assert_equals(len(released),7)
+
+
+class TestThumbnails:
+	def test_thumbnail(self):
+		""" Thumbnails drop labels and thin the finds """
+		area = ffLib.MapArea(1,'Thumb',20,20,'')
+		area.addFinds([ffLib.Find(i,i,i,1,'','COIN','','',1,'red','') for i in range(10)],'find')
+		svgThumb = area.renderThumbnail(200,200,5)
+		assert svgThumb.startswith('<svg xmlns="http://www.w3.org/2000/svg"')
+		assert_equals(svgThumb.count('<circle'),5)
+		assert 'Label' not in svgThumb
+
+	def test_renderAll(self):
+		""" Every area gets a thumbnail and an index entry """
+		tmpDir = tempfile.mkdtemp()
+		ff = ffLib.DbFieldsFindsSqlite(os.path.join(tmpDir,'ff.db'))
+		ff.openConnection()
+		ff.closeConnection()
+		outDir = os.path.join(tmpDir,'thumbs')
+		results = ffLib.renderThumbnails('sqlite:' + os.path.join(tmpDir,'ff.db'),outDir,2)
+		assert_equals([result['areaName'] for result in results],['Default','Demo Kindrogan','Demo Large'])
+		assert os.path.exists(os.path.join(outDir,'area_2.svg'))
+		with open(os.path.join(outDir,'index.html')) as indexFile:
+			assert 'src="area_3.svg"' in indexFile.read()
+
+
+class TestStaticSite:
+	def test_areaDropDownLinks(self):
+		""" Area dropdown can link to static pages """
+		dropDown = ffLib.AreaDropDown(['Default'],lambda area: ffLib.staticPageName(1))
+		assert_equals(str(dropDown),'<li><a href="area_1.html">Default</a></li>')
+		assert ffLib.staticPageName(1,'ROMAN COIN').startswith('area_1_ROMAN_COIN_')
+
+	def test_incremental(self):
+		""" Incremental runs only re-render changed areas """
+		tmpDir = tempfile.mkdtemp()
+		dbPath = os.path.join(tmpDir,'ff.db')
+		ff = ffLib.DbFieldsFindsSqlite(dbPath)
+		ff.openConnection()
+		outDir = os.path.join(tmpDir,'site')
+		assert_equals(ffLib.prerenderSite('sqlite:' + dbPath,outDir,2,True)['pages'],15)
+		assert_equals(ffLib.prerenderSite('sqlite:' + dbPath,outDir,2,True)['renderedAreas'],0)
+		ff.addFind('Demo Large',5,6,'COIN',1.5,'note','')
+		assert_equals(ffLib.prerenderSite('sqlite:' + dbPath,outDir,2,True)['renderedAreas'],1)
+		with open(os.path.join(outDir,'area_3.html')) as page:
+			assert 'id="Find13"' in page.read()
+
+
+class TestFindFilter:
+	def test_where(self):
+		""" Filter compiles to bound predicates """
+		findFilter = ffLib.FindFilter(['COIN','SHERD'],depthMax=2,bbox=(0,0,8,8))
+		predicates,binds = findFilter.where()
+		assert_equals(predicates,'TYPE in (:Class0,:Class1) and DEPTH<=:DepthMax and X between :MinX and :MaxX and Y between :MinY and :MaxY')
+		assert_equals(binds,{'Class0':'COIN','Class1':'SHERD','DepthMax':2.0,'MinX':0.0,'MinY':0.0,'MaxX':8.0,'MaxY':8.0})
+		assert_raises(Exception,ffLib.FindFilter,None,None,None,None,'deep')
+
+	def test_databaseFilter(self):
+		""" Filters run in the database and match the snapshot filter """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		findFilter = ffLib.FindFilter(['COIN','SHERD'],bbox=(0,0,8,8))
+		assert_equals(len(ff.getFinds(1,None,findFilter)),3)
+		assert_equals(len(ff.getFinds(2,None,ffLib.FindFilter(fieldId=10))),1)
+		snapshotDir = tempfile.mkdtemp()
+		ff.rebuildSnapshots(snapshotDir)
+		snap = ffLib.DbFieldsFindsSnapshot(snapshotDir)
+		snap.openConnection()
+		assert_equals(len(snap.getFinds(1,None,findFilter)),3)
+		assert_equals(len(snap.getFinds(2,None,ffLib.FindFilter(fieldId=10))),1)
+
+	def test_websiteParams(self):
+		""" Website reads filter parameters from the query string """
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&FilterClass=COIN&FilterClass=SHERD&DepthMin=1'),ffLib.DbFieldsFindsSqlite())
+		website.run()
+		page = str(website)
+		assert 'Class = COIN, SHERD, Depth >= 1' in page
+		assert 'id="Find2"' in page
+		assert 'id="Find1"' not in page
+
+	def test_classNameComma(self):
+		""" A class name containing a comma filters as one exact class """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		ff.addFindClass('POT, ROMAN','ROMAN','COOKING','ff0000')
+		ff.addFind('Default',5,6,'POT, ROMAN',1,'','')
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&FilterClass=POT%2C+ROMAN&Format=data'),ff)
+		website.run()
+		data = json.loads(str(website).split('\n\n',1)[1])
+		assert_equals(data['finds']['count'],1)
+		assert_equals(ffLib.FindFilter.fromParams(ffLib.paramsFromQuery('FilterClass=POT%2C+ROMAN&FilterClass=COIN')).classes,['POT, ROMAN','COIN'])
+
+
+class TestMigrations:
+	def test_migrate(self):
+		""" Migrations apply once in version order """
+		ff = ffLib.DbFieldsFindsSqlite(migrate=False)
+		ff.openConnection()
+		assert_equals(ff.migrateSchema(2),[(1,'find_filter_indexes'),(2,'area_indexes')])
+		versions = [m[0] for m in ffLib.listMigrations('sqlite')]
+		assert_equals(ff.migrateSchema(),[(m[0],m[1]) for m in ffLib.listMigrations('sqlite')[2:]])
+		assert_equals(ff.getSchemaVersions(),versions)
+		assert_equals(ff.migrateSchema(),[])
+
+	def test_migratedSchema(self):
+		""" Migrated stand-in keeps results and rejects duplicate find coordinates """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		rows = ff._selectFinds('AREA_ID=:AreaId',AreaId=2)
+		assert_equals([row[0] for row in rows],sorted([row[0] for row in rows]))
+		assert_raises(Exception,ff.loadRows,'FF_FINDS_NEW',['FIND_ID','XCOORD','YCOORD','TYPE','DEPTH','AREA_ID'],[(999,rows[0][1],rows[0][2],1,1.0,2)])
+
+	def test_materialized(self):
+		""" Denormalized tables follow adds and deletes and the checker finds differences """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		consistent = {'missing':[],'extra':[],'different':[]}
+		ff.addFind('Demo Large',5,6,'COIN',1.5,'note','')
+		ff.addField('Demo Large',30,40,0,10,'MR SMITH','WHEAT')
+		assert_equals(ff.checkMaterialized(),{'field':consistent,'find':consistent})
+		assert_equals(len(ff.getFields(3)),3)
+		ff.delField(ff.lastInsertId)
+		assert_equals(ff.checkMaterialized(),{'field':consistent,'find':consistent})
+		ff.setMaterialized(False)
+		ff.delFind(13)
+		assert_equals(ff.checkMaterialized()['find']['extra'],[13])
+		ff.refreshMaterialized()
+		ff.setMaterialized(True)
+		assert_equals(ff.checkMaterialized(),{'field':consistent,'find':consistent})
+
+
+class TestIdLookup:
+	def test_lookupIds(self):
+		""" Id lookups match prefixes and page with the last value """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		for x in range(12):
+			ff.addFind('Demo Large',x,40,'COIN',1,'','')
+		assert_equals(ff.lookupIds('find',3,'1',None,5),([11,12,13,14,15],True))
+		assert_equals(ff.lookupIds('find',3,'1',15,5),([16,17,18,19],False))
+		assert_equals(ff.lookupIds('find',3,'2'),([20,21,22,23,24],False))
+		assert_equals(ff.lookupIds('area',None,'Demo'),(['Demo Kindrogan','Demo Large'],False))
+		ff.addNewArea('Demo Extra',10,10,'')
+		assert_equals(ff.lookupIds('delArea',None,''),(['Demo Extra'],False))
+		assert_raises(Exception,ff.lookupIds,'find',3,'x')
+		snapshotDir = tempfile.mkdtemp()
+		ff.rebuildSnapshots(snapshotDir)
+		snap = ffLib.DbFieldsFindsSnapshot(snapshotDir)
+		snap.openConnection()
+		assert_equals(snap.lookupIds('find',3,'1',15,5),([16,17,18,19],False))
+		assert_equals(snap.lookupIds('area',None,'',None,1),(['Default'],True))
+		assert_equals(snap.lookupIds('delArea',None,'Demo'),(['Demo Extra'],False))
+		assert_raises(Exception,snap.lookupIds,'find',3,'','12345678901')
+
+	def test_lookupEndpoint(self):
+		""" Pages look up delete form ids on demand """
+		ff = ffLib.DbFieldsFindsSqlite()
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Large&Format=ids&Lookup=find&Prefix=1'),ff)
+		website.run()
+		assert_equals(json.loads(str(website).split('\n\n',1)[1]),{'values':[11,12],'more':False})
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Large&Format=ids&Lookup=crop'),ff)
+		website.run()
+		assert 'error' in str(website)
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Large&Format=ids&Lookup=find&After=x1'),ff)
+		website.run()
+		assert_equals(json.loads(str(website).split('\n\n',1)[1]),{'values':[],'more':False,'error':'After must be an id'})
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Large'),ff)
+		website.run()
+		assert '<option>11</option>' not in str(website)
+
+
+class TestRaster:
+	def test_rasterize(self):
+		""" Raster pixels and ids follow the svg layout and the png decodes """
+		area = ffLib.MapArea(1,'Small',16,16,'')
+		area.addFields([ffLib.Field(3,0,4,0,4,16,'WHEAT',date(2018,1,1),date(2018,6,1),'ME',1,'','')],'field')
+		area.addFinds([ffLib.Find(7,2,2,1.5,'','Pot','Roman','Cook',1,'red','')],'find')
+		rgba,ids = ffLib.rasterizeMap(area,160,160)
+		assert_equals(rgba[140,20].tolist(),[255,0,0,255])
+		assert_equals(ids[140,20],7)
+		assert_equals(ids[130,10],-3)
+		assert_equals(ids[20,20],0)
+		png = ffLib.encodePng(rgba)
+		assert png.startswith(b'\x89PNG')
+		idat = png.index(b'IDAT')
+		length = int.from_bytes(png[idat-4:idat],'big')
+		raw = np.frombuffer(zlib.decompress(png[idat+4:idat+4+length]),dtype=np.uint8).reshape(160,161*4-3)
+		assert_equals(raw[:,1:].reshape(160,160,4).tolist(),rgba.tolist())
+
+	def test_rasterizeLargeIds(self):
+		""" The id image holds ids above the int32 range """
+		area = ffLib.MapArea(1,'Small',16,16,'')
+		area.addFields([ffLib.Field(3000000000,0,4,0,4,16,'WHEAT',date(2018,1,1),date(2018,6,1),'ME',1,'','')],'field')
+		area.addFinds([ffLib.Find(9999999999,2,2,1.5,'','Pot','Roman','Cook',1,'red','')],'find')
+		rgba,ids = ffLib.rasterizeMap(area,160,160)
+		assert_equals(ids[140,20],9999999999)
+		assert_equals(ids[130,10],-3000000000)
+
+	def test_rasterWebsite(self):
+		""" Dense maps link a cached png with hover lookups, cleared by writes """
+		ff = ffLib.DbFieldsFindsSqlite()
+		cache = ffLib.RasterCache(tempfile.mkdtemp())
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default'),ff)
+		website.setRaster(10,cache)
+		website.run()
+		page = str(website)
+		assert 'href="main.py?MapArea=Default&Format=png"' in page
+		assert 'id="Find1"' not in page
+		png = cache.get('1',0,'',1000,1000)[0]
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&Format=png'),ff)
+		website.setRaster(10,cache)
+		website.run()
+		assert website.binary
+		assert bytes(website).startswith(b'Content-Type: image/png\n')
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&Format=hit&Px=125&Py=875'),ff)
+		website.setRaster(10,cache)
+		website.run()
+		assert_equals(json.loads(str(website).split('\n\n',1)[1])['htmlId'],'Find1')
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&Action=AddFind&X=15&Y=15&Type=COIN&Depth=1'),ff)
+		website.setRaster(10,cache)
+		website.run()
+		assert cache.get('1',1,'',1000,1000)[0] != png
+		assert_equals(cache.get('1',0,'',1000,1000),None)
+
+	def test_rasterVersions(self):
+		""" Writes to an area from another page or outside the website draw its map again """
+		ff = ffLib.DbFieldsFindsSqlite()
+		cache = ffLib.RasterCache(tempfile.mkdtemp())
+		for query in ['MapArea=Demo+Kindrogan&Format=png','MapArea=Default&Action=DelFind&Id=9','MapArea=Demo+Kindrogan&Format=png']:
+			website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery(query),ff)
+			website.setRaster(0,cache)
+			website.run()
+		ff.openConnection()
+		assert_equals(ff.getAreaVersion(2),1)
+		assert cache.get('2',1,'',1000,667) != None
+		assert_equals(cache.get('2',0,'',1000,667),None)
+		ff.addFind('Demo Kindrogan',3,4,'COIN',1,'','')
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Kindrogan&Format=hit&Px=100&Py=534'),ff)
+		website.setRaster(0,cache)
+		website.run()
+		assert_equals(json.loads(str(website).split('\n\n',1)[1])['htmlId'],'Find13')
+		assert_equals(cache.get('2',1,'',1000,667),None)
+
+
+class TestImageCache:
+	def test_resolverHook(self):
+		""" Renderers draw the links returned by the image resolver """
+		ffLib.setImageResolver(lambda href,width,height,fit: href + '#' + str(width) + 'x' + str(height) + fit)
+		try:
+			field = ffLib.Field(3,0,4,0,4,16,'WHEAT',date(2018,1,1),date(2018,6,1),'ME',1,'http://x/owner.jpg','')
+			info = field.renderInfo()
+			svgMap = ffLib.MapArea(1,'Small',16,8,'http://x/map.jpg').renderMap(500,500)
+		finally:
+			ffLib.setImageResolver(None)
+		assert 'href="http://x/owner.jpg#140x155meet"' in info
+		assert 'href=""' in info
+		assert 'href="http://x/map.jpg#1000x500none"' in svgMap
+
+	def test_derivatives(self):
+		""" Local images resolve to content hashed derivatives when PIL is installed """
+		sourceDir = tempfile.mkdtemp()
+		with open(os.path.join(sourceDir,'peas.png'),'wb') as imageFile:
+			imageFile.write(ffLib.encodePng(np.full((300,400,4),200,dtype=np.uint8)))
+		cache = ffLib.ImageCache(tempfile.mkdtemp(),[('http://x/ex/',sourceDir)])
+		assert_equals(cache.resolve('http://y/peas.png',140,140),'http://y/peas.png')
+		assert_equals(cache.resolve('http://x/ex/../peas.png',140,140),'http://x/ex/../peas.png')
+		link = cache.resolve('http://x/ex/peas.png',140,140)
+		if ffLib.imageCache.Image == None:
+			assert_equals(link,'http://x/ex/peas.png')
+		else:
+			name = link[len('images.py?Name='):]
+			assert name.endswith('_140x140_none.png')
+			assert_equals(cache.read(name)[0],'image/png')
+		assert_equals(cache.read('../index.json'),None)
+
+	def test_unwritableFolder(self):
+		""" A folder that cannot be written leaves links unchanged """
+		cacheDir = os.path.join(tempfile.mkdtemp(),'cache')
+		sourceDir = tempfile.mkdtemp()
+		with open(os.path.join(sourceDir,'peas.png'),'wb') as imageFile:
+			imageFile.write(ffLib.encodePng(np.full((30,40,4),200,dtype=np.uint8)))
+		cache = ffLib.ImageCache(cacheDir,[('http://x/ex/',sourceDir)])
+		os.rmdir(cacheDir)
+		cache._indexChanged = True
+		assert_equals(cache.resolve('http://x/ex/peas.png',140,140),'http://x/ex/peas.png')
+		assert cache._indexChanged
+
+
+class TestSpatialIndex:
+	def test_queriesMatchBruteForce(self):
+		""" Radius, nearest and box queries match a scan of every find """
+		rng = np.random.RandomState(3)
+		points = rng.randint(0,200,(5000,2))
+		ids = np.arange(1,5001)
+		index = ffLib.FindIndex(ids,points)
+		distance = np.hypot(points[:,0]-50.5,points[:,1]-70)
+		inside = distance <= 9
+		order = np.lexsort((ids[inside],distance[inside]))
+		assert_equals([findId for findId,d in index.within(50.5,70,9)],ids[inside][order].tolist())
+		assert_equals([findId for findId,d in index.nearest(50.5,70,7)],ids[np.lexsort((ids,distance))[:7]].tolist())
+		box = (points[:,0] >= 10) & (points[:,0] <= 30) & (points[:,1] >= 100) & (points[:,1] <= 105)
+		assert_equals(index.inBox(10,100,30,105),ids[box].tolist())
+		assert_equals(ffLib.FindIndex([],[]).nearest(1,1,3),[])
+
+	def test_cachedAndHighlighted(self):
+		""" Indexes are rebuilt after writes and query results are ringed on the map """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		index = ff.getFindIndex(1)
+		assert ff.getFindIndex(1) is index
+		ff.addFind('Default',5,4,'COIN',1,'','')
+		assert ff.getFindIndex(1) is not index
+		assert_equals(ff.getFindIndex(1,ffLib.FindFilter(classes=['COIN'])).nearest(5,5,2),[(13,1.0),(2,4.0)])
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&Near=5,5&Radius=4'),ff)
+		website.run()
+		page = str(website)
+		assert_equals(page.count('class="highlight"'),3)
+		assert '3 finds within 4 of 5,5: 13, 6, 2' in page
+		assert 'Query Results' in page
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default'),ff)
+		website.run()
+		assert 'Current Selection' in str(website)
+		assert 'Query Results' not in str(website)
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&Near=5&Nearest=2&Format=spatial'),ff)
+		website.run()
+		assert_equals(json.loads(str(website).split('\n\n',1)[1])['error'],'Near must be x,y')
+
+class TestIntegrity:
+	def test_overlapsMatchBruteForce(self):
+		""" Sweep line finds the same overlapping pairs as comparing every field """
+		rng = np.random.RandomState(5)
+		lows = rng.randint(0,100,(400,2))
+		boxes = np.concatenate([lows,lows + rng.randint(0,15,(400,2))],axis=1)
+		ids = np.arange(1,401)
+		expected = []
+		for i in range(400):
+			for j in range(i + 1,400):
+				a,b = boxes[i],boxes[j]
+				if a[2] > a[0] and a[3] > a[1] and b[2] > b[0] and b[3] > b[1] and a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+					expected.append((ids[i],ids[j]))
+		assert_equals(ffLib.overlappingFields(ids,boxes),expected)
+		#Fields sharing an edge or corner do not overlap
+		assert_equals(ffLib.overlappingFields([1,2,3],[[0,0,10,10],[10,0,20,10],[10,10,20,20]]),[])
+
+	def test_scanReport(self):
+		""" Report lists overlaps, objects out of bounds and duplicate find coordinates """
+		mapArea = ffLib.MapArea(7,'Test',20,20,'')
+		report = ffLib.scanArea(mapArea,[1,2,3,4],[[0,0,10,10],[5,5,12,12],[15,15,25,18],[3,3,3,8]],
+								[5,6,7,8],[[1,1],[21,2],[1,1],[4,4]])
+		assert_equals(report['overlappingFields'],[[1,2]])
+		assert_equals(report['fieldBounds'],[{'id':3,'problem':'outside'},{'id':4,'problem':'empty'}])
+		assert_equals(report['findBounds'],[{'id':6,'problem':'outside'}])
+		assert_equals(report['duplicateFinds'],[{'x':1,'y':1,'ids':[5,7]}])
+		assert_equals(report['problems'],5)
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		report = ffLib.scanDatabase(ff)
+		ff.closeConnection()
+		assert_equals([(area['areaName'],area['fields'],area['problems']) for area in report['areas']],
+					[('Default',8,0),('Demo Kindrogan',2,0),('Demo Large',2,0)])
+		json.dumps(report)
+
+class TestMetrics:
+	def test_prometheusText(self):
+		""" Histograms are cumulative buckets with sum and count, unknown labels become other """
+		metrics = ffLib.MetricsRegistry()
+		metrics.recordPage('AddFind','fragment',0.02,3000)
+		metrics.recordPage('AddFind','fragment',0.3,5000)
+		metrics.recordPage('Hack<script>',None,0.001,10)
+		metrics.recordCache('raster',False)
+		text = metrics.render()
+		assert 'ff_page_seconds_bucket{action="AddFind",format="fragment",le="0.025"} 1\n' in text
+		assert 'ff_page_seconds_bucket{action="AddFind",format="fragment",le="0.5"} 2\n' in text
+		assert 'ff_page_seconds_bucket{action="AddFind",format="fragment",le="+Inf"} 2\n' in text
+		assert 'ff_page_bytes_sum{format="fragment"} 8000\n' in text
+		assert 'ff_page_seconds_count{action="other",format="page"} 1\n' in text
+		assert 'ff_cache_requests_total{cache="raster",result="miss"} 1\n' in text
+		assert '# TYPE ff_db_rows histogram\n' in text
+		assert_raises(Exception,metrics.inc,'ff_page_seconds',{'action':'view','format':'page'})
+
+	def test_sharedFile(self):
+		""" Processes add their values to the shared file and the library caches record lookups """
+		path = os.path.join(tempfile.mkdtemp(),'metrics.json')
+		first = ffLib.MetricsRegistry(True,path)
+		second = ffLib.MetricsRegistry(True,path)
+		first.recordCache('snapshot',True)
+		first.flush()
+		second.recordCache('snapshot',True)
+		second.flush()
+		second.recordCache('snapshot',False)
+		assert 'ff_cache_requests_total{cache="snapshot",result="hit"} 2\n' in first.render()
+		assert 'ff_cache_requests_total{cache="snapshot",result="miss"} 1\n' in second.render()
+		ffLib.setMetrics(first)
+		try:
+			ff = ffLib.DbFieldsFindsSqlite()
+			ff.openConnection()
+			ff.getFindIndex(1)
+			ff.getFindIndex(1)
+		finally:
+			ffLib.setMetrics(None)
+		assert 'ff_cache_requests_total{cache="findIndex",result="hit"} 1\n' in first.render()
+		assert 'ff_cache_requests_total{cache="findIndex",result="miss"} 1\n' in first.render()
+
+class TestSingleFlight:
+	def _race(self,flights,compute):
+		""" Start the first flight's run blocked in compute then the others, returning threads and results """
+		results = []
+		threads = [threading.Thread(target=lambda flight=flight: results.append(flight.run(('Default','',0),compute))) for flight in flights]
+		threads[0].start()
+		time.sleep(0.05)
+		for thread in threads[1:]:
+			thread.start()
+		return threads,results
+
+	def test_coalescesThreadsAndProcesses(self):
+		""" Followers in this process and in other processes share the leader's result once """
+		release = threading.Event()
+		calls = []
+		def compute():
+			calls.append(1)
+			release.wait(5)
+			return b'page'
+		folder = tempfile.mkdtemp()
+		leader = ffLib.SingleFlight(folder)
+		#Separate objects stand in for other processes sharing the lock files
+		flights = [leader,leader,leader,ffLib.SingleFlight(folder),ffLib.SingleFlight(folder)]
+		threads,results = self._race(flights,compute)
+		time.sleep(0.05)
+		release.set()
+		for thread in threads:
+			thread.join()
+		assert_equals((len(calls),results),(1,[b'page']*5))
+		#Results of finished renders are not reused
+		assert_equals(ffLib.SingleFlight(folder).run(('Default','',0),lambda: b'new'),b'new')
+
+	def test_failedOrSlowLeader(self):
+		""" Followers render themselves when the leader fails or passes the timeout """
+		def failing():
+			time.sleep(0.1)
+			raise Exception('Database offline')
+		flight = ffLib.SingleFlight(None,timeout=5)
+		leader = threading.Thread(target=lambda: assert_raises(Exception,flight.run,'key',failing))
+		leader.start()
+		time.sleep(0.02)
+		assert_equals(flight.run('key',lambda: b'own'),b'own')
+		leader.join()
+		folder = tempfile.mkdtemp()
+		slow = threading.Thread(target=lambda: ffLib.SingleFlight(folder).run('key',lambda: time.sleep(1) or b'slow'))
+		slow.start()
+		time.sleep(0.05)
+		start = time.time()
+		assert_equals(ffLib.SingleFlight(folder,timeout=0.2).run('key',lambda: b'own'),b'own')
+		assert time.time() - start < 0.8
+		slow.join()
+
+	def test_websiteShares(self):
+		""" Coalesced views return the same page as an uncoalesced render """
+		ff = ffLib.DbFieldsFindsSqlite()
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&FilterClass=COIN'),ff)
+		website.run()
+		expected = str(website)
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&FilterClass=COIN'),ff)
+		website.setCoalescer(ffLib.SingleFlight())
+		website.run()
+		assert_equals(str(website),expected)
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Default&Format=data'),ff)
+		website.setCoalescer(ffLib.SingleFlight())
+		website.run()
+		assert_equals(json.loads(str(website).split('\n\n',1)[1])['version'],0)
+
+class TestAreaStatistics:
+	def test_groupedCounts(self):
+		""" Finds are counted by class, period and use and fields totalled by crop and owner """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		stats = ff.getAreaStatistics(1)
+		assert_equals([(row['name'],row['count']) for row in stats['finds']['byClass']],[('BROOCH',2),('COIN',2),('FLINT',2),('SHERD',2)])
+		assert_equals(stats['finds']['byPeriod'],[{'name':'NEOLITHIC','count':2},{'name':'ROMAN','count':4},{'name':'VIKING','count':2}])
+		assert_equals(stats['finds']['depth']['count'],8)
+		assert_equals(sum([row['count'] for row in stats['finds']['depth']['histogram']]),8)
+		assert_equals((stats['fields']['count'],stats['fields']['area']),(8,174.0))
+		assert_equals(stats['fields']['coverage'],174.0 / 256)
+		assert_equals(sum([row['area'] for row in stats['fields']['byOwner']]),174.0)
+		#Cached until a write raises the area version
+		assert ff.getAreaStatistics(1) is stats
+		ff.addFind('Default',3,4,'COIN',2.0,'note','')
+		assert_equals(ff.getAreaStatistics(1)['finds']['byClass'][1]['count'],3)
+		ff.closeConnection()
+
+	def test_snapshotMatchesDatabase(self):
+		""" Statistics grouped over snapshot columns match the database queries """
+		snapshotDir = tempfile.mkdtemp()
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		ff.rebuildSnapshots(snapshotDir)
+		snap = ffLib.DbFieldsFindsSnapshot(snapshotDir)
+		snap.openConnection()
+		for areaId in [1,2,3]:
+			assert_equals(snap.getAreaStatistics(areaId),ff.getAreaStatistics(areaId))
+		ff.closeConnection()
+
+	def test_filterCounts(self):
+		""" Filter dropdown shows the finds of each class and stats requests return json """
+		ff = ffLib.DbFieldsFindsSqlite()
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Kindrogan'),ff)
+		website.run()
+		page = str(website)
+		assert '<option value="COIN">COIN (1)</option><option value="FLINT">FLINT (0)</option>' in page
+		assert 'id="areaStatistics"><p>Finds: 2<br>Fields: 2' in page
+		website = ffLib.WebsiteFieldsFinds(ffLib.paramsFromQuery('MapArea=Demo+Kindrogan&Format=stats'),ff)
+		website.run()
+		stats = json.loads(str(website).split('\n\n',1)[1])
+		assert_equals((stats['areaName'],stats['finds']['count'],stats['fields']['area']),('Demo Kindrogan',2,500.0))
+
+class TestSyntheticArea:
+	def test_packedFieldsDoNotOverlap(self):
+		""" Packed fields lie inside the area without overlapping, down to one field per cell """
+		for maxX,maxY,numFields in [(300,200,2000),(16,16,256),(50,50,1)]:
+			boxes,owners = ffLib.packFields(maxX,maxY,numFields,3,np.random.RandomState(4))
+			assert_equals(len(boxes),numFields)
+			assert_equals(ffLib.overlappingFields(np.arange(numFields),boxes),[])
+			assert (boxes[:,:2] >= 0).all() and (boxes[:,2] <= maxX).all() and (boxes[:,3] <= maxY).all()
+			assert (boxes[:,2:] > boxes[:,:2]).all()
+		assert_raises(Exception,ffLib.packFields,16,16,257,3,np.random.RandomState(4))
+
+	def test_reproducibleFromSeed(self):
+		""" The same seed gives the same rows at unique find coordinates of the reference classes """
+		tables = ffLib.generateArea(9,'Synthetic',400,300,50,5000,seed=3)
+		assert_equals(tables,ffLib.generateArea(9,'Synthetic',400,300,50,5000,seed=3))
+		assert tables != ffLib.generateArea(9,'Synthetic',400,300,50,5000,seed=4)
+		finds = tables[2][2]
+		assert_equals(len(set([(row[1],row[2]) for row in finds])),5000)
+		assert_equals(set([row[3] for row in finds]),set([1,2,3,4]))
+		assert set([row[7] for row in tables[1][2]]) <= set([1,2,3,4])
+		#Neolithic flints lie deeper than Viking brooches
+		depths = dict([(classId,np.mean([row[4] for row in finds if row[3] == classId])) for classId in [3,4]])
+		assert depths[3] > depths[4]
+
+	def test_loadedArea(self):
+		""" Sql and direct loads give the same area, which passes the integrity scan """
+		ff = ffLib.DbFieldsFindsSqlite()
+		ff.openConnection()
+		tables = ffLib.generateArea(9,'Synthetic',400,300,50,2000,ff.getReferenceRows())
+		ffLib.loadArea(ff,tables)
+		report = ffLib.scanDatabase(ff,['Synthetic'])
+		assert_equals((report['areas'][0]['fields'],report['areas'][0]['finds'],report['problems']),(50,2000,0))
+		stats = ff.getAreaStatistics(9)
+		ff.closeConnection()
+		folder = tempfile.mkdtemp()
+		with open(os.path.join(folder,'area.sql'),'w') as outFile:
+			ffLib.writeSql(tables,outFile,'sqlite')
+		ff = ffLib.DbFieldsFindsSqlite(os.path.join(folder,'ff.db'))
+		ff.openConnection()
+		ff.closeConnection()
+		conn = sqlite3.connect(os.path.join(folder,'ff.db'))
+		with open(os.path.join(folder,'area.sql')) as sqlFile:
+			conn.executescript(sqlFile.read())
+		conn.close()
+		ff.openConnection()
+		assert_equals(ff.getAreaStatistics(9),stats)
+		ff.closeConnection()